@@ -0,0 +1,184 @@
+import math
+import threading
+
+from array import array
+from collections import deque
+from typing import Deque, Dict, List, Optional, Set, Tuple
+
+from buda import schemas
+
+NAN = float('nan')
+
+
+class MarketAnalytics:
+    """
+        Cross-market analytics computed from the tickers of every market.
+
+        - Spread in basis points relative to the mid price, and its z-score against the last history_size
+          distinct spreads of the market.
+        - Triangular arbitrage: every cycle of three currencies linked by markets, i.e. clp -> btc -> eth -> clp,
+          with the return of trading through it at the current bid and ask prices, before fees.
+
+        Prices are stored by column in arrays indexed by market. The currency graph and the cycles are built
+        once per set of markets, and each refresh only recomputes the markets whose bid or ask changed and the
+        cycles that go through them.
+
+        Usage:
+
+        ```
+        analytics = MarketAnalytics()
+        analytics.refresh(tickers)
+        data = analytics.snapshot()
+        ```
+    """
+
+    def __init__(self, history_size: int = 100):
+        self.history_size = history_size
+        self.markets: List[str] = []
+        self._lock = threading.Lock()
+        self._build([])
+
+    def _build(self, markets: List[str]) -> None:
+        """
+            Builds the columns, the currency graph and the cycles for a new set of markets, with the format
+            {base_currency}-{quote_currency}
+        """
+        self.markets = markets
+        self._market_index: Dict[str, int] = {market_id: index for index, market_id in enumerate(markets)}
+        size: int = len(markets)
+        self.bid = array('d', [NAN]) * size
+        self.ask = array('d', [NAN]) * size
+        self.spread_bps = array('d', [NAN]) * size
+        self.zscore = array('d', [NAN]) * size
+        self._history: List[Deque[float]] = [deque(maxlen=self.history_size) for _ in range(size)]
+        self._history_sum = array('d', [0.0]) * size
+        self._history_sum_sq = array('d', [0.0]) * size
+
+        self.currencies: List[str] = sorted({currency for market_id in markets for currency in market_id.split('-')})
+        edges: Dict[frozenset, int] = {
+            frozenset(market_id.split('-')): index for index, market_id in enumerate(markets)
+        }
+        # A leg is (market index, True if the first currency is sold at the bid, False if the second one is bought at the ask)
+        self.cycles: List[Tuple[Tuple[str, str, str], Tuple[Tuple[int, bool], ...]]] = []
+        for first_index, first in enumerate(self.currencies):
+            for second_index in range(first_index + 1, len(self.currencies)):
+                second: str = self.currencies[second_index]
+                if frozenset((first, second)) not in edges:
+                    continue
+                for third in self.currencies[second_index + 1:]:
+                    if frozenset((second, third)) in edges and frozenset((third, first)) in edges:
+                        for path in ((first, second, third), (first, third, second)):
+                            self.cycles.append((path, tuple(
+                                self._leg(edges, path[leg], path[(leg + 1) % 3]) for leg in range(3)
+                            )))
+
+        self.cycle_return_bps = array('d', [NAN]) * len(self.cycles)
+        self._market_cycles: List[List[int]] = [[] for _ in range(size)]
+        for cycle_index, (_, legs) in enumerate(self.cycles):
+            for market_index, _ in legs:
+                self._market_cycles[market_index].append(cycle_index)
+
+    def _leg(self, edges: Dict[frozenset, int], source: str, target: str) -> Tuple[int, bool]:
+        market_index: int = edges[frozenset((source, target))]
+        return market_index, self.markets[market_index].split('-')[0] == source
+
+    def _update_market(self, index: int, bid: float, ask: float) -> None:
+        self.bid[index] = bid
+        self.ask[index] = ask
+        mid: float = (bid + ask) / 2
+        spread_bps: float = (ask - bid) / mid * 10000 if mid > 0 else NAN
+        self.spread_bps[index] = spread_bps
+
+        history: Deque[float] = self._history[index]
+        count: int = len(history)
+        zscore: float = NAN
+        if count >= 2 and not math.isnan(spread_bps):
+            mean: float = self._history_sum[index] / count
+            variance: float = max(0.0, self._history_sum_sq[index] / count - mean * mean)
+            if variance > 0:
+                zscore = (spread_bps - mean) / math.sqrt(variance)
+        self.zscore[index] = zscore
+
+        if not math.isnan(spread_bps):
+            if count == history.maxlen:
+                evicted: float = history[0]
+                self._history_sum[index] -= evicted
+                self._history_sum_sq[index] -= evicted * evicted
+            history.append(spread_bps)
+            self._history_sum[index] += spread_bps
+            self._history_sum_sq[index] += spread_bps * spread_bps
+
+    def _update_cycle(self, cycle_index: int) -> None:
+        growth: float = 1.0
+        for market_index, sell in self.cycles[cycle_index][1]:
+            rate: float = self.bid[market_index] if sell else 1 / self.ask[market_index] if self.ask[market_index] > 0 else NAN
+            growth *= rate
+        self.cycle_return_bps[cycle_index] = (growth - 1) * 10000
+
+    def refresh(self, tickers: Dict[str, schemas.Ticker], markets: Optional[List[str]] = None) -> dict:
+        """
+            Updates the analytics with the tickers of the markets, by market id {base_currency}-{quote_currency}.
+            Returns how many markets and cycles were recomputed.
+
+            markets is the catalogue of every market, the tickers of the markets when it isn't given. Markets of
+            the catalogue without a ticker, i.e. because it couldn't be fetched, keep their previous values instead
+            of rebuilding the analytics and losing the spread history of every market.
+        """
+        with self._lock:
+            market_ids: List[str] = sorted(market_id.lower() for market_id in (tickers if markets is None else markets))
+            if market_ids != self.markets:
+                self._build(market_ids)
+
+            changed_cycles: Set[int] = set()
+            changed_markets: int = 0
+            for market_id, ticker in tickers.items():
+                index: Optional[int] = self._market_index.get(market_id.lower())
+                if index is None:
+                    continue
+                bid, ask = float(ticker.max_bid[0]), float(ticker.min_ask[0])
+                if bid == self.bid[index] and ask == self.ask[index]:
+                    continue
+                self._update_market(index, bid, ask)
+                changed_cycles.update(self._market_cycles[index])
+                changed_markets += 1
+
+            for cycle_index in changed_cycles:
+                self._update_cycle(cycle_index)
+
+            return {'markets': changed_markets, 'cycles': len(changed_cycles)}
+
+    def snapshot(self, min_return_bps: float = 0) -> dict:
+        """
+            Returns the analytics of every market and the arbitrage cycles with a return above min_return_bps
+        """
+        def number(value: float) -> Optional[float]:
+            return None if math.isnan(value) else value
+
+        with self._lock:
+            markets: List[dict] = [
+                {
+                    'market': market_id,
+                    'bid': number(self.bid[index]),
+                    'ask': number(self.ask[index]),
+                    'mid': number((self.bid[index] + self.ask[index]) / 2),
+                    'spread_bps': number(self.spread_bps[index]),
+                    'zscore': number(self.zscore[index])
+                } for index, market_id in enumerate(self.markets)
+            ]
+            arbitrage: List[dict] = [
+                {
+                    'path': list(self.cycles[cycle_index][0]) + [self.cycles[cycle_index][0][0]],
+                    'markets': [self.markets[market_index] for market_index, _ in self.cycles[cycle_index][1]],
+                    'return_bps': return_bps
+                }
+                for cycle_index, return_bps in enumerate(self.cycle_return_bps)
+                if return_bps > min_return_bps
+            ]
+
+        arbitrage.sort(key=lambda cycle: cycle['return_bps'], reverse=True)
+        return {
+            'markets': markets,
+            'currencies': list(self.currencies),
+            'cycles': len(self.cycles),
+            'arbitrage': arbitrage
+        }
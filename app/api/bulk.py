@@ -0,0 +1,406 @@
+import io
+import re
+import csv
+import math
+import sys
+import struct
+
+from array import array
+from operator import itemgetter
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+from sqlalchemy import String, select, type_coerce
+from sqlalchemy.orm import Session
+
+import settings
+from api.constants import AlertStatus, AlertType
+from api.models import Alert as AlertModel
+from notifications.destinations import check_destination
+
+# Columns of the exported files, in order. Imported files need every column but id, which is ignored.
+COLUMNS: Tuple[str, ...] = ('id', 'type', 'currency', 'market', 'spread', 'webhook_url')
+IMPORT_COLUMNS: Tuple[str, ...] = COLUMNS[1:]
+
+CSV_FORMAT = 'csv'
+COLUMNAR_FORMAT = 'columnar'
+FORMATS: Tuple[str, ...] = (CSV_FORMAT, COLUMNAR_FORMAT)
+
+# Columnar format
+#
+# The file starts with COLUMNAR_MAGIC and is followed by blocks of up to a few thousand alerts. Every block is:
+#
+#   rows         uint32               Number of alerts. A block with 0 rows ends the file
+#   markets      uint16               Number of markets in the block, followed by every market as a uint16 length
+#                                     and its utf-8 {currency}-{market}
+#   id           rows x int64
+#   spread       rows x float64
+#   market       rows x uint16        Index of the market of every alert in the block markets
+#   type         rows x uint8         Index of the type of every alert in COLUMNAR_TYPES
+#   webhook_url  rows x uint32        Length of the utf-8 webhook url of every alert (0 if it has none),
+#                                     followed by all the urls
+#
+# All numbers are little endian.
+COLUMNAR_MAGIC = b'BUDAALERTS1\n'
+COLUMNAR_TYPES: Tuple[str, ...] = (AlertType.above.value, AlertType.under.value)
+_COLUMNAR_TYPE_INDEX: Dict[str, int] = {alert_type: index for index, alert_type in enumerate(COLUMNAR_TYPES)}
+_LITTLE_ENDIAN: bool = sys.byteorder == 'little'
+MAX_REPORTED_ERRORS = 1000
+_WEBHOOK_URL = re.compile(r'https?://[^/\s?#]+\S*\Z')
+# Columns written by the importer, in the order of the validated rows
+_INSERT_COLUMNS: Tuple[str, ...] = ('type', 'currency', 'market', 'spread', 'status', 'webhook_url')
+
+
+def _to_bytes(column: array) -> bytes:
+    if not _LITTLE_ENDIAN:
+        column = array(column.typecode, column)
+        column.byteswap()
+    return column.tobytes()
+
+
+def _from_bytes(typecode: str, data: bytes) -> array:
+    column = array(typecode)
+    column.frombytes(data)
+    if not _LITTLE_ENDIAN:
+        column.byteswap()
+    return column
+
+
+def _iter_alert_rows(db: Session, chunk_size: int) -> Iterator[List[tuple]]:
+    """
+    Yields the alerts as lists of (id, type, currency, market, spread, webhook_url) tuples of up to chunk_size,
+    ordered by id, so memory usage doesn't depend on the number of alerts.
+    Rows are read with a core query and type as its stored string, without building ORM objects nor enums.
+    """
+    table = AlertModel.__table__
+    query = select(
+        table.c.id, type_coerce(table.c.type, String), table.c.currency, table.c.market, table.c.spread,
+        table.c.webhook_url
+    ).order_by(table.c.id).limit(chunk_size)
+    connection = db.connection()
+    after_id: int = 0
+    while True:
+        rows: List[tuple] = connection.execute(query.where(table.c.id > after_id)).fetchall()
+        if rows:
+            yield rows
+        if len(rows) < chunk_size:
+            return
+        after_id = rows[-1][0]
+
+
+def export_alerts_csv(db: Session, chunk_size: Optional[int] = None) -> Iterator[str]:
+    """
+    Yields the alerts as a csv file with a header row, in pieces of chunk_size alerts
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(COLUMNS)
+    for rows in _iter_alert_rows(db, chunk_size or settings.ALERTS_STREAM_CHUNK_SIZE):
+        writer.writerows(
+            (alert_id, alert_type, currency, market, repr(spread), webhook_url or '')
+            for alert_id, alert_type, currency, market, spread, webhook_url in rows
+        )
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+
+def _encode_block(rows: List[tuple]) -> bytes:
+    markets: Dict[str, int] = {}
+    market_column = array('H')
+    type_column = array('B')
+    url_lengths = array('I')
+    urls: List[bytes] = []
+    for _, alert_type, currency, market, _, webhook_url in rows:
+        market_column.append(markets.setdefault(f'{currency}-{market}', len(markets)))
+        type_column.append(_COLUMNAR_TYPE_INDEX[alert_type])
+        url: bytes = webhook_url.encode() if webhook_url else b''
+        url_lengths.append(len(url))
+        urls.append(url)
+
+    parts: List[bytes] = [struct.pack('<IH', len(rows), len(markets))]
+    for market_id in markets:
+        encoded: bytes = market_id.encode()
+        parts.append(struct.pack('<H', len(encoded)) + encoded)
+    parts.append(_to_bytes(array('q', (row[0] for row in rows))))
+    parts.append(_to_bytes(array('d', (row[4] for row in rows))))
+    parts.append(_to_bytes(market_column))
+    parts.append(_to_bytes(type_column))
+    parts.append(_to_bytes(url_lengths))
+    parts.extend(urls)
+    return b''.join(parts)
+
+
+def export_alerts_columnar(db: Session, chunk_size: Optional[int] = None) -> Iterator[bytes]:
+    """
+    Yields the alerts in the columnar format, a block of chunk_size alerts at a time
+    """
+    yield COLUMNAR_MAGIC
+    for rows in _iter_alert_rows(db, chunk_size or settings.ALERTS_STREAM_CHUNK_SIZE):
+        yield _encode_block(rows)
+    yield struct.pack('<I', 0)
+
+
+class CSVAlertReader:
+    """
+        Incremental csv parser. Feed it the bytes of the file as they arrive and it returns the complete rows as
+        tuples of the IMPORT_COLUMNS values, whatever the order of the columns in the file.
+    """
+
+    def __init__(self):
+        self._pending: bytes = b''
+        self._columns: Optional[itemgetter] = None
+        self._width: int = 0
+
+    def _parse(self, data: bytes) -> List[tuple]:
+        lines: List[str] = data.decode('utf-8-sig' if self._columns is None else 'utf-8').splitlines()
+        reader = csv.reader(lines)
+        if self._columns is None:
+            header: List[str] = [column.strip() for column in next(reader, [])]
+            missing: Set[str] = set(IMPORT_COLUMNS) - set(header)
+            if missing:
+                raise ValueError(f'Missing columns: {", ".join(sorted(missing))}')
+            self._columns = itemgetter(*(header.index(column) for column in IMPORT_COLUMNS))
+            self._width = len(header)
+        columns: itemgetter = self._columns
+        width: int = self._width
+        # Rows without the trailing empty values are padded to the header before picking the columns
+        return [
+            columns(values if len(values) >= width else values + [''] * (width - len(values)))
+            for values in reader if values
+        ]
+
+    def feed(self, data: bytes) -> List[tuple]:
+        data = self._pending + data
+        # Only complete lines are parsed. Quoted values with line breaks are not supported
+        end: int = data.rfind(b'\n') + 1
+        self._pending = data[end:]
+        return self._parse(data[:end]) if end else []
+
+    def close(self) -> List[tuple]:
+        data, self._pending = self._pending, b''
+        return self._parse(data) if data.strip() else []
+
+
+class ColumnarAlertReader:
+    """
+        Incremental parser of the columnar format. Feed it the bytes of the file as they arrive and it returns the
+        rows of every complete block as tuples of the IMPORT_COLUMNS values.
+    """
+
+    def __init__(self):
+        self._buffer = bytearray()
+        self._started: bool = False
+        self._finished: bool = False
+
+    def _read_block(self) -> Optional[List[tuple]]:
+        buffer = self._buffer
+        if len(buffer) < 4:
+            return None
+        rows: int = struct.unpack_from('<I', buffer)[0]
+        if rows == 0:
+            self._finished = True
+            del buffer[:4]
+            return None
+        if len(buffer) < 6:
+            return None
+
+        offset: int = 6
+        markets: List[Tuple[str, str]] = []
+        for _ in range(struct.unpack_from('<H', buffer, 4)[0]):
+            if len(buffer) < offset + 2:
+                return None
+            length: int = struct.unpack_from('<H', buffer, offset)[0]
+            if len(buffer) < offset + 2 + length:
+                return None
+            currency, _, market = bytes(buffer[offset + 2:offset + 2 + length]).decode().partition('-')
+            markets.append((currency, market))
+            offset += 2 + length
+
+        columns_end: int = offset + rows * (8 + 8 + 2 + 1 + 4)
+        if len(buffer) < columns_end:
+            return None
+        spreads: array = _from_bytes('d', bytes(buffer[offset + rows * 8:offset + rows * 16]))
+        market_column: array = _from_bytes('H', bytes(buffer[offset + rows * 16:offset + rows * 18]))
+        type_column: bytes = bytes(buffer[offset + rows * 18:offset + rows * 19])
+        url_lengths: array = _from_bytes('I', bytes(buffer[offset + rows * 19:columns_end]))
+        block_end: int = columns_end + sum(url_lengths)
+        if len(buffer) < block_end:
+            return None
+
+        urls: List[Optional[str]] = []
+        url_offset: int = columns_end
+        for url_length in url_lengths:
+            urls.append(bytes(buffer[url_offset:url_offset + url_length]).decode() if url_length else None)
+            url_offset += url_length
+        block: List[tuple] = [
+            (COLUMNAR_TYPES[alert_type], *markets[market_index], spread, url)
+            for alert_type, market_index, spread, url in zip(type_column, market_column, spreads, urls)
+        ]
+        del buffer[:block_end]
+        return block
+
+    def feed(self, data: bytes) -> List[tuple]:
+        if self._finished:
+            return []
+        self._buffer += data
+        if not self._started:
+            if len(self._buffer) < len(COLUMNAR_MAGIC):
+                return []
+            if bytes(self._buffer[:len(COLUMNAR_MAGIC)]) != COLUMNAR_MAGIC:
+                raise ValueError('The file is not in the columnar alerts format')
+            del self._buffer[:len(COLUMNAR_MAGIC)]
+            self._started = True
+
+        rows: List[tuple] = []
+        while not self._finished:
+            block: Optional[List[tuple]] = self._read_block()
+            if block is None:
+                break
+            rows.extend(block)
+        return rows
+
+    def close(self) -> List[tuple]:
+        if not self._finished:
+            raise ValueError('The columnar file is truncated')
+        return []
+
+
+def create_reader(file_format: str):
+    """
+    Creates the incremental reader of an import file format: csv or columnar
+    """
+    if file_format == CSV_FORMAT:
+        return CSVAlertReader()
+    if file_format == COLUMNAR_FORMAT:
+        return ColumnarAlertReader()
+    raise ValueError(f'Unknown format: {file_format}')
+
+
+class AlertImportError(ValueError):
+    """
+    The import file can't be read past some point, i.e. it is truncated or isn't valid utf-8. report has the rows
+    read until then, which were imported as usual: a retry should skip the first report['rows'] alerts.
+    """
+
+    def __init__(self, message: str, report: dict):
+        super().__init__(message)
+        self.report = report
+
+
+class AlertImporter:
+    """
+        Validates and inserts alerts in batches.
+
+        Every row is checked against the markets catalogue, fetched once, instead of asking Buda for every alert.
+        Valid rows are inserted with a single statement and commit per batch_size rows. Invalid rows are skipped and
+        reported with their number (1 is the first alert of the file) and error. If the file can't be read to the
+        end, abort commits the rows read so far and returns an AlertImportError with the report.
+
+        Usage:
+
+        ```
+        importer = AlertImporter(db, markets)
+        importer.add(rows)
+        report = importer.finish()
+        ```
+    """
+
+    def __init__(self, db: Session, markets: List[str], batch_size: int = 10000):
+        self.db = db
+        self.markets: Set[str] = set(markets)
+        self.batch_size = batch_size
+        self.rows: int = 0
+        self.imported: int = 0
+        self.errors: List[dict] = []
+        self.error_count: int = 0
+        self._batch: List[tuple] = []
+        self._types: Set[str] = {alert_type.value for alert_type in AlertType}
+        self._status: str = AlertStatus.undefined.value
+        self._insert: Optional[Tuple[str, bool]] = None
+
+    def _validate(self, row: tuple) -> tuple:
+        """
+            Returns the values of _INSERT_COLUMNS for a row of IMPORT_COLUMNS values
+        """
+        alert_type, currency, market, spread, webhook_url = row
+        alert_type = (alert_type or '').strip().lower()
+        if alert_type not in self._types:
+            raise ValueError(f'Invalid type: {row[0]}')
+        currency = (currency or '').strip().lower()
+        market = (market or '').strip().lower()
+        if f'{currency}-{market}' not in self.markets:
+            raise ValueError(f'The market {currency}-{market} does not exist in Buda')
+        try:
+            spread = float(spread)
+        except (TypeError, ValueError):
+            raise ValueError(f'Invalid spread: {row[3]}')
+        if not math.isfinite(spread):
+            raise ValueError(f'Invalid spread: {row[3]}')
+        if spread <= 0:
+            # Same as the PositiveFloat of POST /alert/
+            raise ValueError(f'The spread must be greater than 0: {row[3]}')
+        webhook_url = (webhook_url or '').strip() or None
+        if webhook_url is not None:
+            if not _WEBHOOK_URL.match(webhook_url):
+                raise ValueError(f'Invalid webhook url: {webhook_url}')
+            check_destination(webhook_url)
+        return alert_type, currency, market, spread, self._status, webhook_url
+
+    def add(self, rows: List[tuple]) -> None:
+        for row in rows:
+            self.rows += 1
+            try:
+                self._batch.append(self._validate(row))
+            except ValueError as e:
+                self.error_count += 1
+                if len(self.errors) < MAX_REPORTED_ERRORS:
+                    self.errors.append({'row': self.rows, 'error': str(e)})
+            if len(self._batch) >= self.batch_size:
+                self.flush()
+
+    def _insert_statement(self) -> Tuple[str, bool]:
+        """
+            Compiles the insert once for the database dialect. Returns the sql and whether it takes positional
+            parameters in the order of _INSERT_COLUMNS, or named ones.
+        """
+        if self._insert is None:
+            compiled = AlertModel.__table__.insert().compile(
+                dialect=self.db.get_bind().dialect, column_keys=list(_INSERT_COLUMNS)
+            )
+            positional: bool = bool(compiled.positional) and tuple(compiled.positiontup) == _INSERT_COLUMNS
+            if compiled.positional and not positional:
+                raise RuntimeError(f'Unexpected insert parameters: {compiled.positiontup}')
+            self._insert = (str(compiled), positional)
+        return self._insert
+
+    def flush(self) -> None:
+        """
+            Inserts the validated rows with the driver executemany, as they are already the stored values of the
+            columns, skipping the per row parameter processing of SQLAlchemy
+        """
+        if self._batch:
+            sql, positional = self._insert_statement()
+            parameters: list = self._batch if positional else [dict(zip(_INSERT_COLUMNS, row)) for row in self._batch]
+            self.db.connection().exec_driver_sql(sql, parameters)
+            self.db.commit()
+            self.imported += len(self._batch)
+            self._batch = []
+
+    def abort(self, error: ValueError) -> AlertImportError:
+        """
+            Inserts the remaining rows and returns the error to raise, with the report of the rows read before it
+        """
+        return AlertImportError(str(error), self.finish())
+
+    def finish(self) -> dict:
+        """
+            Inserts the remaining rows and returns the report. Only the first MAX_REPORTED_ERRORS errors are listed.
+        """
+        self.flush()
+        return {
+            'rows': self.rows,
+            'imported': self.imported,
+            'error_count': self.error_count,
+            'errors': self.errors
+        }
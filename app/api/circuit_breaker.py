@@ -0,0 +1,145 @@
+import time
+import threading
+
+from typing import Dict, List, Optional
+
+import settings
+
+
+class CircuitState:
+    """
+    State of a circuit breaker
+    """
+    closed = 'closed'
+    open = 'open'
+    half_open = 'half_open'
+
+
+class CircuitOpenError(Exception):
+    """
+        The circuit of the endpoint is open, so the request was not sent.
+        The exception string contains the endpoint and when it will be retried.
+    """
+    pass
+
+
+class CircuitBreaker:
+    """
+        Stops calling an endpoint that keeps failing, so callers fail fast instead of waiting for its timeout.
+
+        - closed: requests are sent. After failure_threshold consecutive failures the circuit opens.
+        - open: requests fail with CircuitOpenError without being sent, for recovery_timeout seconds.
+        - half_open: a single probe request is sent. If it succeeds the circuit closes, otherwise it opens again.
+
+        Thread-safe, a breaker is shared by every thread calling the endpoint.
+
+        Usage:
+
+        ```
+        breaker.before_call()
+        try:
+            response = send()
+        except requests.RequestException:
+            breaker.record_failure()
+            raise
+        breaker.record_success()
+        ```
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = settings.CIRCUIT_FAILURE_THRESHOLD,
+        recovery_timeout: float = settings.CIRCUIT_RECOVERY_TIMEOUT
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.state: str = CircuitState.closed
+        self.failures: int = 0
+        self.opened_at: Optional[float] = None
+        self.rejected: int = 0
+        self._probing: bool = False
+        self._lock = threading.Lock()
+
+    def before_call(self) -> None:
+        """
+            Raises CircuitOpenError if the request must not be sent
+        """
+        with self._lock:
+            if self.state == CircuitState.open:
+                if time.monotonic() - self.opened_at < self.recovery_timeout:
+                    self.rejected += 1
+                    raise CircuitOpenError(
+                        f'Circuit of {self.name} is open, retrying in '
+                        f'{self.recovery_timeout - (time.monotonic() - self.opened_at):.1f}s'
+                    )
+                self.state = CircuitState.half_open
+                self._probing = False
+            if self.state == CircuitState.half_open:
+                if self._probing:
+                    self.rejected += 1
+                    raise CircuitOpenError(f'Circuit of {self.name} is half open and already probing')
+                self._probing = True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.state = CircuitState.closed
+            self.failures = 0
+            self.opened_at = None
+            self._probing = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self.state == CircuitState.half_open or self.failures >= self.failure_threshold:
+                self.state = CircuitState.open
+                self.opened_at = time.monotonic()
+            self._probing = False
+
+    def release(self) -> None:
+        """
+            Ends a call that doesn't tell whether the endpoint is healthy, i.e. cut short by the deadline of the
+            caller. Nothing is counted, and a half open circuit can send another probe.
+        """
+        with self._lock:
+            self._probing = False
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'name': self.name,
+                'state': self.state,
+                'failures': self.failures,
+                'rejected': self.rejected,
+                'open_for': None if self.opened_at is None else round(time.monotonic() - self.opened_at, 3)
+            }
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_circuit_breaker(name: str) -> CircuitBreaker:
+    """
+    Returns the breaker of an endpoint, created on first use. Breakers are shared by every SDK instance.
+    """
+    breaker: Optional[CircuitBreaker] = _breakers.get(name)
+    if breaker is None:
+        with _breakers_lock:
+            breaker = _breakers.setdefault(name, CircuitBreaker(name))
+    return breaker
+
+
+def get_circuit_breakers_stats() -> List[dict]:
+    with _breakers_lock:
+        breakers: List[CircuitBreaker] = sorted(_breakers.values(), key=lambda breaker: breaker.name)
+    return [breaker.stats() for breaker in breakers]
+
+
+def reset_circuit_breakers() -> None:
+    """
+    Removes every breaker, so all the circuits start closed
+    """
+    with _breakers_lock:
+        _breakers.clear()
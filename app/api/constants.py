@@ -15,7 +15,7 @@ class AlertStatus(str, Enum):
     An spread can be under or above a threshold, if the condition is met, alert status changes to fullfil,
     in any other case is pending.
 
-    Undefined status is not used yet.
+    Undefined is the status of an alert that has not been evaluated yet.
     """
     fulfill = 'fulfill'
     pending = 'pending'
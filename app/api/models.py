@@ -1,17 +1,47 @@
 from database import Base
-from sqlalchemy import Column, Integer, String, Float
-from sqlalchemy_utils.types.choice import ChoiceType
-from api.constants import AlertType
+from sqlalchemy import Column, Integer, String, Float, DateTime, Index, Enum, event
+from sqlalchemy.orm.attributes import NEVER_SET, NO_VALUE
+from api.constants import AlertType, AlertStatus
+
+
+def enum_values(enum) -> list:
+    # Store the values of the enum members, i.e. 'above', instead of their names
+    return [member.value for member in enum]
 
 
 class Alert(Base):
     """
     Alert main model used for check if a market price is above or under a threshold
+
+    The status is persisted with the market spread used to evaluate it, so it is only evaluated again
+    when that spread changes, or when the type or target spread of the alert change.
+    fulfilled_at is the last time the status changed to fulfill.
     """
     __tablename__ = 'alerts'
+    __table_args__ = (
+        Index('ix_alerts_currency_market_id', 'currency', 'market', 'id'),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
-    type = Column(ChoiceType(AlertType, impl=String()))
+    type = Column(Enum(AlertType, native_enum=False, values_callable=enum_values))
     currency = Column(String)
     market = Column(String)
     spread = Column(Float)
+    status = Column(Enum(AlertStatus, native_enum=False, values_callable=enum_values), default=AlertStatus.undefined)
+    last_evaluated_at = Column(DateTime)
+    last_spread = Column(Float)
+    fulfilled_at = Column(DateTime)
+    webhook_url = Column(String)
+
+
+@event.listens_for(Alert.type, 'set', active_history=True)
+@event.listens_for(Alert.spread, 'set', active_history=True)
+def invalidate_alert_status(alert: Alert, value, old_value, initiator) -> None:
+    """
+    Forgets the evaluation of an alert when its type or target spread change, so its stored status is not
+    considered fresh and it is evaluated again with the next market spread, even if the spread didn't change
+    """
+    if old_value in (NEVER_SET, NO_VALUE) or value == old_value:
+        return
+    alert.last_spread = None
+    alert.last_evaluated_at = None
@@ -0,0 +1,250 @@
+import time
+import heapq
+import logging
+import threading
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+import settings
+import api.services as services
+from database import SessionLocal
+
+app_logger = logging.getLogger('app')
+
+
+class MarketSchedule:
+    """
+        Evaluation state of a market with alerts
+    """
+
+    __slots__ = ('market_id', 'due_at', 'spread', 'evaluated_at', 'volatility', 'distance')
+
+    def __init__(self, market_id: str, due_at: float):
+        self.market_id = market_id
+        self.due_at = due_at
+        self.spread: Optional[float] = None
+        self.evaluated_at: Optional[float] = None
+        # Moving average of the spread change per second
+        self.volatility: Optional[float] = None
+        # Distance between the spread and the closest alert target spread
+        self.distance: Optional[float] = None
+
+
+class AlertScheduler:
+    """
+        Re-evaluates the stored alert statuses of every market with alerts in the background.
+
+        Markets are kept in a priority queue by the time of their next evaluation. After a market is evaluated, its
+        next evaluation is scheduled at half the time its spread would take to reach the closest alert target at its
+        recent speed (distance / volatility), between min_delay and max_delay. So markets close to a threshold, or
+        moving fast, are evaluated often, and the rest rarely.
+
+        Every cycle evaluates at most budget due markets, the most overdue first, fetching their spreads at the same
+        time. How late the evaluations are compared to their schedule is reported by stats as lag.
+
+        Usage:
+
+        ```
+        scheduler = AlertScheduler()
+        scheduler.start()
+        ...
+        scheduler.stop()
+        ```
+    """
+
+    VOLATILITY_SMOOTHING = 0.3
+
+    def __init__(
+        self,
+        session_factory: Callable = SessionLocal,
+        interval: float = settings.ALERT_SCHEDULER_INTERVAL,
+        budget: int = settings.ALERT_SCHEDULER_BUDGET,
+        min_delay: float = settings.ALERT_SCHEDULER_MIN_DELAY,
+        max_delay: float = settings.ALERT_SCHEDULER_MAX_DELAY,
+        markets_interval: float = settings.ALERT_SCHEDULER_MARKETS_INTERVAL,
+        concurrency: int = settings.SPREADS_STREAM_CONCURRENCY,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.session_factory = session_factory
+        self.interval = interval
+        self.budget = budget
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.markets_interval = markets_interval
+        self.concurrency = concurrency
+        self.clock = clock
+        self.markets: Dict[str, MarketSchedule] = {}
+        self._queue: List[Tuple[float, str]] = []
+        self._markets_fetched_at: Optional[float] = None
+        # _cycle_lock allows a single cycle at a time, _lock protects the queue and stats, which stats reads
+        self._cycle_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._stats: dict = {
+            'cycles': 0,
+            'evaluations': 0,
+            'failures': 0,
+            'last_cycle_evaluated': 0,
+            'last_cycle_duration': 0.0,
+            'last_lag': 0.0,
+            'max_lag': 0.0,
+            'total_lag': 0.0
+        }
+
+    def next_delay(self, schedule: MarketSchedule) -> float:
+        """
+            Seconds until the next evaluation of a market
+        """
+        if schedule.distance is None:
+            return self.max_delay
+        if schedule.volatility is None:
+            # The speed of the spread is unknown until the market is evaluated twice
+            return self.min_delay
+        if schedule.volatility <= 0:
+            return self.min_delay if schedule.distance <= 0 else self.max_delay
+        return min(self.max_delay, max(self.min_delay, schedule.distance / schedule.volatility / 2))
+
+    def _refresh_markets(self, db, now: float) -> None:
+        markets: List[str] = services.get_alert_markets(db)
+        with self._lock:
+            for market_id in markets:
+                if market_id not in self.markets:
+                    self.markets[market_id] = MarketSchedule(market_id, now)
+                    heapq.heappush(self._queue, (now, market_id))
+            for market_id in set(self.markets) - set(markets):
+                # Its queue entry is discarded when it is popped
+                del self.markets[market_id]
+        self._markets_fetched_at = now
+
+    def _pop_due(self, now: float) -> List[MarketSchedule]:
+        due: List[MarketSchedule] = []
+        while self._queue and self._queue[0][0] <= now and len(due) < self.budget:
+            due_at, market_id = heapq.heappop(self._queue)
+            schedule: Optional[MarketSchedule] = self.markets.get(market_id)
+            if schedule is not None and schedule.due_at == due_at:
+                due.append(schedule)
+        return due
+
+    def _schedule(self, schedule: MarketSchedule, due_at: float) -> None:
+        schedule.due_at = due_at
+        heapq.heappush(self._queue, (due_at, schedule.market_id))
+
+    def _fetch_spread(self, market_id: str) -> Optional[dict]:
+        currency, market = market_id.split('-')
+        try:
+            spread: dict = services.get_market_spread(currency=currency, market=market, disable_check=True)
+        except Exception as e:
+            app_logger.warning(f'Alert scheduler could not get the spread of {market_id}: {e}')
+            return None
+        # The last known spread of an unavailable market is not used to change alert statuses
+        return None if spread.get('stale') else spread
+
+    def _update_schedule(self, db, schedule: MarketSchedule, spread: float, now: float) -> None:
+        if schedule.spread is not None and schedule.evaluated_at is not None and now > schedule.evaluated_at:
+            speed: float = abs(spread - schedule.spread) / (now - schedule.evaluated_at)
+            schedule.volatility = speed if schedule.volatility is None else (
+                self.VOLATILITY_SMOOTHING * speed + (1 - self.VOLATILITY_SMOOTHING) * schedule.volatility
+            )
+        schedule.spread = spread
+        schedule.evaluated_at = now
+        schedule.distance = services.get_nearest_alert_distance(db, schedule.market_id, spread)
+
+    def run_cycle(self) -> int:
+        """
+            Evaluates the alerts of up to budget due markets. Returns the number of markets evaluated.
+        """
+        with self._cycle_lock:
+            started_at: float = self.clock()
+            due: List[MarketSchedule] = []
+            db = self.session_factory()
+            try:
+                if self._markets_fetched_at is None or started_at - self._markets_fetched_at >= self.markets_interval:
+                    self._refresh_markets(db, started_at)
+
+                with self._lock:
+                    due = self._pop_due(started_at)
+                if not due:
+                    return 0
+                with ThreadPoolExecutor(max_workers=min(self.concurrency, len(due))) as executor:
+                    spreads: List[Optional[dict]] = list(
+                        executor.map(lambda schedule: self._fetch_spread(schedule.market_id), due)
+                    )
+                services.evaluate_alerts(db, [spread for spread in spreads if spread is not None])
+
+                now: float = self.clock()
+                for schedule, spread in zip(due, spreads):
+                    if spread is not None:
+                        self._update_schedule(db, schedule, spread['spread'], now)
+            except Exception:
+                # The popped markets must go back to the queue, or they would never be evaluated again
+                with self._lock:
+                    for schedule in due:
+                        self._schedule(schedule, self.clock() + self.min_delay)
+                raise
+            finally:
+                db.close()
+
+            lags: List[float] = [started_at - schedule.due_at for schedule in due]
+            with self._lock:
+                # Markets whose spread couldn't be fetched are retried soon
+                for schedule, spread in zip(due, spreads):
+                    self._schedule(schedule, now + (self.min_delay if spread is None else self.next_delay(schedule)))
+                self._stats['cycles'] += 1
+                self._stats['evaluations'] += len(due)
+                self._stats['failures'] += spreads.count(None)
+                self._stats['last_cycle_evaluated'] = len(due)
+                self._stats['last_cycle_duration'] = self.clock() - started_at
+                self._stats['last_lag'] = max(lags)
+                self._stats['max_lag'] = max(self._stats['max_lag'], max(lags))
+                self._stats['total_lag'] += sum(lags)
+            return len(due)
+
+    def stats(self) -> dict:
+        """
+            Scheduler metrics. lag is how many seconds after their scheduled time markets were evaluated (last_lag is
+            the largest one of the last cycle), and overdue the number of markets whose evaluation time already passed.
+        """
+        with self._lock:
+            now: float = self.clock()
+            stats: dict = dict(self._stats)
+            evaluations: int = stats.pop('evaluations')
+            total_lag: float = stats.pop('total_lag')
+            return {
+                'running': self._thread is not None,
+                'markets': len(self.markets),
+                'overdue': sum(1 for schedule in self.markets.values() if schedule.due_at <= now),
+                'evaluations': evaluations,
+                'avg_lag': total_lag / evaluations if evaluations else 0.0,
+                **stats
+            }
+
+    def _run(self) -> None:
+        while not self._stop_event.is_set():
+            try:
+                self.run_cycle()
+            except Exception as e:
+                app_logger.warning(f'Alert scheduler failed: {e}')
+            self._stop_event.wait(self.interval)
+
+    def start(self) -> None:
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name='alert-scheduler', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self._thread = None
+
+
+if __name__ == '__main__':
+    # Run the scheduler as a separate worker process: python -m api.scheduler
+    scheduler = AlertScheduler()
+    scheduler.start()
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        scheduler.stop()
@@ -1,6 +1,8 @@
-from pydantic import BaseModel
+from typing import Optional
+from pydantic import AnyHttpUrl, BaseModel, validator
 from pydantic.types import PositiveFloat
 from api.constants import AlertType
+from notifications.destinations import check_destination
 
 
 class Alert(BaseModel):
@@ -12,6 +14,13 @@ class Alert(BaseModel):
     currency: str
     market: str
     spread: PositiveFloat
+    webhook_url: Optional[AnyHttpUrl] = None
+
+    @validator('webhook_url')
+    def webhook_url_is_public(cls, webhook_url: Optional[AnyHttpUrl]) -> Optional[AnyHttpUrl]:
+        if webhook_url is not None:
+            check_destination(str(webhook_url))
+        return webhook_url
 
     class Config:
         orm_mode = True
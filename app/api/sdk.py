@@ -1,8 +1,14 @@
 import json
-import requests
 import logging
 
-from typing import Iterable
+from contextvars import ContextVar
+
+from typing import Any, Iterable, NamedTuple, TYPE_CHECKING
+
+from api.circuit_breaker import CircuitBreaker, CircuitOpenError, get_circuit_breaker
+
+if TYPE_CHECKING:
+    import requests
 
 app_logger = logging.getLogger('app')
 
@@ -22,6 +28,37 @@ class UnknownSchemaError(Exception):
     pass
 
 
+class UpstreamServiceError(Exception):
+    """
+        The service answered with a server error (5xx).
+        The exception string contains the error details.
+    """
+    pass
+
+
+def is_upstream_failure(error: Exception) -> bool:
+    """
+        Returns True if the error means the service is unavailable: open circuit, timeout, connection error or
+        server error. Errors about the request itself, like an unknown market, return False.
+    """
+    import requests
+
+    return isinstance(error, (CircuitOpenError, UpstreamServiceError, requests.RequestException))
+
+
+class RequestResult(NamedTuple):
+    """
+        Attribute    | Type               | Description
+
+        data         | [dict]             | Parsed json body, or None if the body is empty
+        status_code  | [int]              | Status code of the response
+        response     | [requests.Response]| Full response, for more details
+    """
+    data: Any
+    status_code: int
+    response: 'requests.Response'
+
+
 class BaseSDK:
     """
         The base class for SDK's. Implements basic common SDK initialization
@@ -32,6 +69,8 @@ class BaseSDK:
         otherwise an exception will be raised when an instance is created.
 
         if debug is activated, requests full verbose will be logged.
+
+        Instances don't keep any state of the requests, so a single instance can be shared by many threads.
     """
 
     NAME = 'Empty SDK'
@@ -39,12 +78,14 @@ class BaseSDK:
     PRODUCTION_BASE_URL = ''
     SANDBOX_BASE_URL = ''
     DEFAULT_TIMEOUT = 15
+    DEFAULT_POOL_SIZE = 32
 
     def __init__(
         self,
         sandbox: bool = False,
         debug: bool = False,
         global_timeout: int = DEFAULT_TIMEOUT,
+        pool_size: int = DEFAULT_POOL_SIZE,
     ):
         if self.NAME == 'Empty SDK':
             raise Exception('Please set a name for your SDK.')
@@ -53,9 +94,18 @@ class BaseSDK:
         if self.SANDBOX_BASE_URL == '':
             raise Exception('Please set a sandbox url for your SDK.')
         
-        self._last_response = None
+        # Only used by get_last_response. Every thread and asyncio task sees its own last response
+        self._last_response: ContextVar = ContextVar(f'{self.NAME} last response', default=None)
         
+        # requests is imported on first use, so processes that never call the API don't pay its import time
+        import requests
+
+        # The session is shared by every thread. It is only configured here, and its connection pool is sized
+        # for pool_size threads sending requests to the same host at the same time.
         self._rest_session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self._rest_session.mount('https://', adapter)
+        self._rest_session.mount('http://', adapter)
         self._base_url = self.SANDBOX_BASE_URL if sandbox else self.PRODUCTION_BASE_URL
         self._debug = debug
         self._default_timeout = global_timeout
@@ -88,7 +138,7 @@ class BaseSDK:
 
     
     @staticmethod
-    def response_validate_json(response: requests.Response):
+    def response_validate_json(response: 'requests.Response'):
         """
             Validates the response schema by raising the appropiate generic exception
             if the response cant be parsed to json. If the response is OK, returns the
@@ -120,11 +170,10 @@ class BaseSDK:
         form: dict = None,
         status_code_key: str = None,
         timeout: int = None,
+        circuit: str = None,
     ) -> dict:
         """
-            The generic procedure of any json request.
-            If success_codes is None, any code will be accepted. If not, if the returned
-            status code is not any of success_codes, exc will be raised.
+            The generic procedure of any json request. Same as json_request, but only returns the data.
 
             If status_code_key is not None, the status code will be added to the result data
             assigned to the provided key. Be careful with overriding some existing key in the
@@ -132,8 +181,58 @@ class BaseSDK:
 
             Returns None if response body is empty.
         """
-        self._last_response = None
-        
+        result: RequestResult = self.json_request(
+            method=method,
+            url=url,
+            headers=headers,
+            data=data,
+            optional_data=optional_data,
+            query_params=query_params,
+            auth=auth,
+            success_codes=success_codes,
+            error_exc=error_exc,
+            force_url=force_url,
+            form=form,
+            timeout=timeout,
+            circuit=circuit,
+        )
+
+        if result.data is not None and status_code_key is not None:
+            result.data[status_code_key] = result.status_code
+
+        return result.data
+
+    def json_request(
+        self,
+        method: str,
+        url: str,
+        headers: dict = None,
+        data: dict = None,
+        optional_data: dict = None,
+        query_params: dict = None,
+        auth=None,
+        success_codes: Iterable[int] = None,
+        error_exc: Exception = Exception,
+        force_url: str = None,
+        form: dict = None,
+        timeout: int = None,
+        circuit: str = None,
+    ) -> 'RequestResult':
+        """
+            Sends a json request and returns a RequestResult with the parsed data, status code and response.
+            If success_codes is None, any code will be accepted. If not, if the returned
+            status code is not any of success_codes, exc will be raised.
+
+            The arguments are not modified and the instance is only read, so the same instance can send
+            requests from many threads at the same time.
+
+            Every endpoint has a circuit breaker shared by all the instances of the SDK, named after the method
+            and circuit, or url if circuit is None. Use circuit to share a breaker between urls of the same endpoint,
+            i.e. 'markets/{market_id}/ticker'. Timeouts, connection errors and 5xx responses count as failures. When
+            the circuit is open, CircuitOpenError is raised without sending the request. 5xx responses raise
+            UpstreamServiceError. A timeout shorter than the default timeout of the SDK is the deadline of the caller,
+            so when it runs out it isn't counted as a failure of the endpoint.
+        """
         _raw_request_data = {
             'url': url,
             'auth': auth,
@@ -141,6 +240,7 @@ class BaseSDK:
 
         if data is not None:
             if optional_data is not None:
+                data = dict(data)
                 BaseSDK.insert_optional_dict(
                     data,
                     optional_data,
@@ -151,7 +251,7 @@ class BaseSDK:
         if query_params is not None:
             _raw_request_data['params'] = query_params
         if form is not None:
-            _raw_request_data['files'] = query_params
+            _raw_request_data['files'] = form
         
         _request_data = self.process_request_args(_raw_request_data)
 
@@ -169,34 +269,38 @@ class BaseSDK:
                     Method: {method}
                     Headers: {_request_data.get('headers')}
                     Data: {_request_data.get('data')}
-                    Form-data: {_request_data.get('form')}
+                    Form-data: {_request_data.get('files')}
                 """
             )
 
-        if method == 'get':
-            response = self._rest_session.get(
-                **_request_data
-            )
-        elif method == 'post':
-            response = self._rest_session.post(
-                **_request_data
-            )
-        elif method == 'put':
-            response = self._rest_session.put(
-                **_request_data
-            )
-        elif method == 'patch':
-            response = self._rest_session.patch(
+        if method not in ('get', 'post', 'put', 'patch', 'delete'):
+            raise UnsupportedMethodError(f'method {method} currently unsupported.')
+
+        self._last_response.set(None)
+        breaker: CircuitBreaker = get_circuit_breaker(f'{self.NAME} {method.upper()} {url if circuit is None else circuit}')
+        breaker.before_call()
+        try:
+            response = self._rest_session.request(
+                method,
                 **_request_data
             )
-        elif method == 'delete':
-            response = self._rest_session.delete(
-                **_request_data
+        except Exception as e:
+            import requests
+
+            if isinstance(e, requests.Timeout) and self._is_caller_deadline(_request_data['timeout']):
+                breaker.release()
+            else:
+                breaker.record_failure()
+            raise
+
+        self._last_response.set(response)
+
+        if response.status_code >= 500:
+            breaker.record_failure()
+            raise UpstreamServiceError(
+                f'{self.NAME} error. Status code: {response.status_code}. Returned data: {response.text}'
             )
-        else:
-            raise UnsupportedMethodError(f'method {method} currently unsupported.')
-        
-        self._last_response = response
+        breaker.record_success()
         
         if success_codes is not None and response.status_code not in success_codes:
             raise error_exc(
@@ -212,22 +316,28 @@ class BaseSDK:
                 """
             )
         
-        if response.text == '':
-            return None
-
-        result = BaseSDK.response_validate_json(response)
-
-        if status_code_key is not None:
-            result[status_code_key] = response.status_code
-        
-        return result
+        return RequestResult(
+            data=None if response.text == '' else BaseSDK.response_validate_json(response),
+            status_code=response.status_code,
+            response=response
+        )
     
-    def get_last_response(self) -> requests.Response:
+    def _is_caller_deadline(self, timeout) -> bool:
+        """
+            Returns True if timeout is shorter than the default timeout, so it was set by the deadline of the caller
+        """
+        if timeout is None or isinstance(timeout, tuple):
+            return False
+        return self._default_timeout is None or timeout < self._default_timeout
+
+    def get_last_response(self) -> 'requests.Response':
         """
-            Returns the last response object when calling json_endpoint.
-            Useful for more details when an exception occurs.
+            Returns the last response object received by the current thread or asyncio task when calling
+            json_endpoint. Useful for more details when an exception occurs. Requests run in another thread,
+            i.e. with run_in_threadpool, are not seen by the caller. Prefer the response of json_request,
+            which doesn't depend on the context.
         """
-        return self._last_response
+        return self._last_response.get()
 
     def in_sandbox_mode(self):
         """
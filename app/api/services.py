@@ -1,9 +1,29 @@
+import time
+import random
+import logging
+import threading
+import settings
+import api.sdk as sdk
 from buda import buda
-from typing import List, Tuple, Optional
+from itertools import islice
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Tuple, Optional, Union
+from api import bulk
+from api.analytics import MarketAnalytics
+from api.snapshot import SnapshotReader
+from api.spread_feed import VersionedSpreads
+from cache.decorators import cached
+from exchanges import aggregator
+from notifications.queue import enqueue_alert_notifications
 from api.schemas import Alert
 from api.constants import AlertStatus, AlertType
 from api.models import Alert as AlertModel
-from sqlalchemy.orm import Session
+from sqlalchemy import func, or_
+from sqlalchemy.orm import Query, Session
+
+
+app_logger = logging.getLogger('app')
 
 
 class InvalidRequest(Exception):
@@ -11,6 +31,28 @@ class InvalidRequest(Exception):
     pass
 
 
+snapshot_reader: Optional[SnapshotReader] = SnapshotReader(
+    settings.SHARED_SNAPSHOT_PATH,
+    max_age=settings.SNAPSHOT_MAX_AGE
+) if settings.SHARED_SNAPSHOT_PATH else None
+
+market_analytics = MarketAnalytics(history_size=settings.ANALYTICS_HISTORY_SIZE)
+_analytics_refreshed_at: float = float('-inf')
+_analytics_updated: dict = {'markets': 0, 'cycles': 0}
+# time.time() when the last known markets used by the last analytics refresh were fetched, None if they were current
+_analytics_markets_fetched_at: Optional[float] = None
+_analytics_lock = threading.Lock()
+
+# Without a shared snapshot, every worker starts at a random sequence, so a client that polled another worker gets
+# a full resync instead of wrong changes
+spread_feed = VersionedSpreads(max_deltas=settings.SPREADS_MAX_DELTAS, start=random.getrandbits(40))
+_spread_feed_refreshed_at: float = float('-inf')
+_spread_feed_lock = threading.Lock()
+
+# Last successful Buda response of every key, as (value, time), served while Buda is unavailable
+_last_known_good: Dict[str, Tuple[Any, float]] = {}
+
+
 def get_market_or_exception(currency: str, market: str, disable_check: bool) -> Tuple[str, str]:
     """
     Checks if the market exists and if so, returns a formatted tuple.
@@ -24,6 +66,53 @@ def get_market_or_exception(currency: str, market: str, disable_check: bool) ->
 
     return currency, market
 
+def with_last_known_good(key: str, fetch: Callable[[], Any]) -> Tuple[Any, Optional[float]]:
+    """
+    Calls fetch and stores its result as the last known good value of key.
+
+    If Buda is unavailable (open circuit, timeout, connection or server error), returns the last known good value
+    instead, if it isn't older than LAST_KNOWN_GOOD_MAX_AGE. Returns (value, age), where age is the number of
+    seconds since the value was fetched, or None if it was just fetched.
+    """
+    try:
+        value: Any = fetch()
+    except Exception as e:
+        if not sdk.is_upstream_failure(e):
+            raise
+        stored: Optional[Tuple[Any, float]] = _last_known_good.get(key)
+        if stored is None or time.time() - stored[1] > settings.LAST_KNOWN_GOOD_MAX_AGE:
+            raise
+        app_logger.warning(f'Buda is unavailable, serving the last known {key}: {e}')
+        return stored[0], time.time() - stored[1]
+
+    _last_known_good[key] = (value, time.time())
+    return value, None
+
+@cached(ttl=settings.MARKETS_CACHE_TTL, key=lambda: 'markets_with_fetch_time')
+def get_all_markets_with_fetch_time() -> Tuple[List[str], Optional[float]]:
+    """
+    Returns (markets, fetched_at). fetched_at is None for current markets, or the time.time() at which the last
+    known markets were fetched when Buda is unavailable, so their age is still right when read from the cache
+    """
+    if snapshot_reader is not None:
+        markets: Optional[List[str]] = snapshot_reader.get_markets()
+        if markets is not None:
+            return markets, None
+    markets, age = with_last_known_good(
+        'markets', lambda: [market.name for market in buda.get_client().get_markets().markets]
+    )
+    return markets, (time.time() - age if age is not None else None)
+
+def get_all_markets_with_age() -> Tuple[List[str], Optional[float]]:
+    """
+    Gets the available markets at Buda. See get_all_markets
+
+    Returns (markets, age). age is None for current markets, or the seconds since the markets were fetched when Buda
+    is unavailable and the last known markets are returned instead. See with_last_known_good
+    """
+    markets, fetched_at = get_all_markets_with_fetch_time()
+    return markets, (time.time() - fetched_at if fetched_at is not None else None)
+
 def get_all_markets() -> List[str]:
     """
     Get the available markets at Buda
@@ -33,27 +122,76 @@ def get_all_markets() -> List[str]:
 
     Example:
     ['btc-clp', 'btc-cop', 'eth-clp', 'eth-btc' ...]
+
+    If a shared snapshot is configured and fresh, the markets are read from it instead. If Buda is unavailable, the
+    last known markets are returned, use get_all_markets_with_age to know their age.
     """
-    return [market.name for market in buda.Buda().get_markets().markets]
+    return get_all_markets_with_age()[0]
 
-def get_market_spread(currency: str, market: str, disable_check: bool = False) -> dict:
+def get_market_ticker_with_age(currency: str, market: str) -> Tuple[buda.schemas.Ticker, Optional[float]]:
     """
-    Obtains the buying and selling prices of a currency in a market, if exists.
+    Gets the ticker of a market from the shared snapshot if available, otherwise from Buda.
 
-    This function simply calls the Buda SDK to get the ticker of a market and returns a dictionary with the bid and ask prices.
+    Returns (ticker, age). age is None for a current ticker, or the seconds since the ticker was fetched when Buda
+    is unavailable and the last known ticker is returned instead. See with_last_known_good
     """
-    currency, market = get_market_or_exception(currency, market, disable_check)
-    market_ticker: buda.schemas.Ticker = buda.Buda().get_ticker(currency=currency, market=market)
+    if snapshot_reader is not None:
+        ticker: Optional[buda.schemas.Ticker] = snapshot_reader.get_ticker(f'{currency}-{market}')
+        if ticker is not None:
+            return ticker, None
+    return with_last_known_good(
+        f'ticker:{currency}-{market}', lambda: buda.get_client().get_ticker(currency=currency, market=market)
+    )
+
+def get_market_ticker(currency: str, market: str) -> buda.schemas.Ticker:
+    """
+    Gets the ticker of a market from the shared snapshot if available, otherwise from Buda.
+    """
+    return get_market_ticker_with_age(currency=currency, market=market)[0]
+
+def get_ticker_spread(market_id: str, market_ticker: buda.schemas.Ticker) -> dict:
+    """
+    Builds the spread dictionary of a market, with the format {currency}-{market}, from its ticker.
+
+    The spread is computed exactly in units of the price precision of the quote currency, so markets with small
+    prices like eth-btc don't round to 0, from the exact prices of the ticker when it has them. If they have more
+    decimals than the precision of the currency, the spread is computed with their decimals instead. spread is the
+    float value and spread_exact its decimal string.
+    """
+    exact_prices: dict = market_ticker.exact_prices or {}
+    min_ask: Union[str, float] = exact_prices.get('min_ask', market_ticker.min_ask[0])
+    max_bid: Union[str, float] = exact_prices.get('max_bid', market_ticker.max_bid[0])
+    precision: int = buda.prices.widen_precision(
+        buda.prices.get_price_precision(market_ticker.max_bid[1]), min_ask, max_bid
+    )
+    spread: int = buda.prices.scaled_spread(min_ask, max_bid, precision)
     return {
         'bid': market_ticker.max_bid[0],
         'ask': market_ticker.min_ask[0],
-        'spread': round(
-            market_ticker.min_ask[0] - market_ticker.max_bid[0],
-            2
-        ),
-        'market': f'{currency}-{market}'
+        'spread': buda.prices.from_scaled(spread, precision),
+        'spread_exact': buda.prices.format_scaled(spread, precision),
+        'market': market_id
     }
 
+@cached(
+    ttl=settings.SPREAD_CACHE_TTL,
+    key=lambda currency, market, disable_check=False: f'spread:{currency.lower()}-{market.lower()}'
+)
+def get_market_spread(currency: str, market: str, disable_check: bool = False) -> dict:
+    """
+    Obtains the buying and selling prices of a currency in a market, if exists.
+
+    This function simply calls the Buda SDK to get the ticker of a market and returns a dictionary with the bid and ask prices.
+    If Buda is unavailable and the last known ticker is used, the dictionary also has stale=True and its age in seconds.
+    """
+    currency, market = get_market_or_exception(currency, market, disable_check)
+    market_ticker, age = get_market_ticker_with_age(currency=currency, market=market)
+    spread: dict = get_ticker_spread(f'{currency}-{market}', market_ticker)
+    if age is not None:
+        spread['stale'] = True
+        spread['age'] = round(age, 3)
+    return spread
+
 def get_all_markets_spread() -> List[dict]:
     """
     Get the latest asks and bids from all the markets in Buda.
@@ -70,6 +208,169 @@ def get_all_markets_spread() -> List[dict]:
         ) for market_data in available_markets
     ]
 
+def iter_all_markets_spread(concurrency: Optional[int] = None) -> Iterator[dict]:
+    """
+    Returns an iterator over the spread of every market in Buda, yielded as soon as it is fetched, in completion order.
+
+    The markets are fetched before returning, so a failure to get them is raised here and not while iterating, i.e.
+    after a streaming response has started. Up to concurrency markets (SPREADS_STREAM_CONCURRENCY by default) are
+    fetched at the same time, so a slow market doesn't delay the rest and memory usage doesn't depend on the number
+    of markets. If the spread of a market can't be fetched, an error record {'market': ..., 'error': ...} is yielded
+    instead.
+    """
+    return _iter_markets_spread(get_all_markets(), concurrency or settings.SPREADS_STREAM_CONCURRENCY)
+
+def _iter_markets_spread(market_ids: List[str], concurrency: int) -> Iterator[dict]:
+    markets: Iterator[str] = iter(market_ids)
+
+    def fetch(market_id: str) -> dict:
+        currency, market = market_id.split('-')
+        return get_market_spread(currency=currency, market=market, disable_check=True)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        in_flight: dict = {}
+        for market_id in islice(markets, concurrency):
+            in_flight[executor.submit(fetch, market_id)] = market_id
+
+        while in_flight:
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                market_id: str = in_flight.pop(future)
+                next_market: Optional[str] = next(markets, None)
+                if next_market is not None:
+                    in_flight[executor.submit(fetch, next_market)] = next_market
+                try:
+                    yield future.result()
+                except Exception as e:
+                    app_logger.warning(f'Could not get the spread of {market_id}: {e}')
+                    yield {'market': market_id, 'error': 'Could not get the spread of the market'}
+
+def refresh_spread_feed() -> int:
+    """
+    Updates the versioned spreads with the spread of every market, at most once every SPREAD_CACHE_TTL seconds.
+    A single caller refreshes at a time, the rest don't wait for it and get the current spreads, unless there are
+    none yet. Returns the current sequence.
+
+    With a fresh shared snapshot, the spreads are built from its tickers and versioned by its fetch time, so every
+    worker reading it has the same sequences. Otherwise they are fetched from Buda, and markets whose spread can't
+    be fetched keep their previous record. The age of stale spreads is left out of the records, since it changes on
+    every refresh and would make every stale market count as changed.
+    """
+    global _spread_feed_refreshed_at
+    if time.monotonic() - _spread_feed_refreshed_at < settings.SPREAD_CACHE_TTL:
+        return spread_feed.sequence
+    if not _spread_feed_lock.acquire(blocking=_spread_feed_refreshed_at == float('-inf')):
+        return spread_feed.sequence
+    try:
+        if time.monotonic() - _spread_feed_refreshed_at >= settings.SPREAD_CACHE_TTL:
+            snapshot: Optional[dict] = snapshot_reader.read() if snapshot_reader is not None else None
+            if snapshot is not None:
+                spread_feed.update(
+                    [get_ticker_spread(market_id, ticker) for market_id, ticker in snapshot['tickers'].items()],
+                    sequence=int(snapshot['fetched_at'] * 1000)
+                )
+            else:
+                spreads: List[dict] = list(iter_all_markets_spread())
+                records: List[dict] = [
+                    {name: value for name, value in spread.items() if name != 'age'}
+                    for spread in spreads if 'error' not in spread
+                ]
+                spread_feed.update(records, complete=len(records) == len(spreads))
+            _spread_feed_refreshed_at = time.monotonic()
+        return spread_feed.sequence
+    finally:
+        _spread_feed_lock.release()
+
+def get_spreads_changes(since: Optional[int] = None) -> bytes:
+    """
+    Gets the json body with the spreads of the markets that changed after sequence since, or of every market if
+    since is None or too old. See api/spread_feed.py
+    """
+    refresh_spread_feed()
+    return spread_feed.changes_since(since)
+
+def get_all_markets_ticker(markets: Optional[List[str]] = None) -> Dict[str, buda.schemas.Ticker]:
+    """
+    Gets the ticker of markets, or of every market in Buda, fetching SPREADS_STREAM_CONCURRENCY markets at the
+    same time. Markets whose ticker can't be fetched are left out.
+    """
+    def fetch(market_id: str) -> Optional[buda.schemas.Ticker]:
+        currency, market = market_id.split('-')
+        try:
+            return get_market_ticker(currency=currency, market=market)
+        except Exception as e:
+            app_logger.warning(f'Could not get the ticker of {market_id}: {e}')
+            return None
+
+    markets = get_all_markets() if markets is None else markets
+    with ThreadPoolExecutor(max_workers=settings.SPREADS_STREAM_CONCURRENCY) as executor:
+        tickers: List[Optional[buda.schemas.Ticker]] = list(executor.map(fetch, markets))
+    return {market_id: ticker for market_id, ticker in zip(markets, tickers) if ticker is not None}
+
+def refresh_market_analytics() -> dict:
+    """
+    Updates the cross-market analytics of this process with the current tickers, at most once every
+    SPREAD_CACHE_TTL seconds. Only the markets whose prices changed are recomputed.
+
+    A single caller refreshes at a time, the rest don't wait for it and get the current analytics, unless there
+    are none yet. Returns how many markets and arbitrage cycles the last refresh recomputed.
+    """
+    global _analytics_refreshed_at, _analytics_updated, _analytics_markets_fetched_at
+    if time.monotonic() - _analytics_refreshed_at < settings.SPREAD_CACHE_TTL:
+        return _analytics_updated
+    if not _analytics_lock.acquire(blocking=_analytics_refreshed_at == float('-inf')):
+        return _analytics_updated
+    try:
+        if time.monotonic() - _analytics_refreshed_at >= settings.SPREAD_CACHE_TTL:
+            markets, age = get_all_markets_with_age()
+            _analytics_markets_fetched_at = time.time() - age if age is not None else None
+            _analytics_updated = market_analytics.refresh(get_all_markets_ticker(markets), markets)
+            _analytics_refreshed_at = time.monotonic()
+        return _analytics_updated
+    finally:
+        _analytics_lock.release()
+
+def get_market_analytics(min_return_bps: float = 0) -> dict:
+    """
+    Gets the spread statistics of every market and the triangular arbitrage cycles with a return, before fees,
+    above min_return_bps. See api/analytics.py
+
+    If Buda was unavailable and the last known markets were used in the last refresh, the dictionary also has
+    stale=True and their age in seconds.
+    """
+    updated: dict = refresh_market_analytics()
+    analytics: dict = {
+        **market_analytics.snapshot(min_return_bps=min_return_bps),
+        'updated': updated
+    }
+    if _analytics_markets_fetched_at is not None:
+        analytics['stale'] = True
+        analytics['age'] = round(time.time() - _analytics_markets_fetched_at, 3)
+    return analytics
+
+def compare_exchange_spreads(market_ids: Optional[List[str]] = None) -> dict:
+    """
+    Gets the tickers of market_ids, or of every market, from the exchanges in settings.EXCHANGES in parallel and
+    compares their spreads. See exchanges/aggregator.py
+    Exchanges that fail or don't answer within settings.EXCHANGES_DEADLINE are listed with their error.
+    """
+    if market_ids is not None:
+        market_ids = [market_id.strip().lower() for market_id in market_ids]
+    results: List[aggregator.ExchangeResult] = aggregator.fetch_all_tickers(
+        aggregator.get_exchanges(), market_ids=market_ids, deadline=settings.EXCHANGES_DEADLINE
+    )
+    return {
+        'exchanges': [
+            {
+                'exchange': result.exchange,
+                'markets': len(result.tickers),
+                'elapsed': round(result.elapsed, 3),
+                'error': result.error
+            } for result in results
+        ],
+        'markets': aggregator.compare_spreads(results)
+    }
+
 def create_alert(db: Session, alert: Alert) -> AlertModel:
     """
     Create an alert and register in DB if market is valid
@@ -79,37 +380,279 @@ def create_alert(db: Session, alert: Alert) -> AlertModel:
         type=alert.type,
         currency=alert.currency,
         market=alert.market,
-        spread=alert.spread
+        spread=alert.spread,
+        status=AlertStatus.undefined,
+        webhook_url=str(alert.webhook_url) if alert.webhook_url else None
     )
     db.add(db_alert)
     db.commit()
     db.refresh(db_alert)
     return db_alert
 
+def compute_alert_status(alert_type: AlertType, target_spread: float, market_spread: float) -> AlertStatus:
+    """
+    Calculates the status of an alert of alert_type and target_spread for the given market spread.
+    """
+    if alert_type == AlertType.above and market_spread > target_spread or alert_type == AlertType.under and market_spread < target_spread:
+        return AlertStatus.fulfill
+    return AlertStatus.pending
+
 def get_alert_status(alert: Alert) -> AlertStatus:
     """
     Calculates the status of an alert depending on the type and current spread of the market.
     """
     market_spread: float = get_market_spread(currency=alert.currency, market=alert.market).get('spread')
-    if alert.type == AlertType.above and market_spread > alert.spread or alert.type == AlertType.under and market_spread < alert.spread:
-        return AlertStatus.fulfill
-    return AlertStatus.pending
+    return compute_alert_status(alert.type, alert.spread, market_spread)
+
+def evaluate_market_alerts(
+    db: Session,
+    market_id: str,
+    market_spread: float,
+    evaluated_at: Optional[datetime] = None
+) -> List[AlertModel]:
+    """
+    Updates the stored status of the alerts of a market, with the format {currency}-{market}.
+
+    Only the alerts evaluated with a different spread (or never evaluated) are checked again, the rest just get
+    their last_evaluated_at updated in a single statement. The session is not committed.
+
+    Returns the alerts whose status changed to fulfill.
+    """
+    evaluated_at = evaluated_at or datetime.utcnow()
+    currency, market = market_id.split('-')
+    market_filter = (AlertModel.currency == currency, AlertModel.market == market)
+
+    db.query(AlertModel).filter(
+        *market_filter,
+        AlertModel.last_spread == market_spread
+    ).update({AlertModel.last_evaluated_at: evaluated_at}, synchronize_session=False)
+
+    changed_alerts: List[AlertModel] = db.query(AlertModel).filter(
+        *market_filter,
+        or_(AlertModel.last_spread.is_(None), AlertModel.last_spread != market_spread)
+    ).all()
+
+    fulfilled_alerts: List[AlertModel] = []
+    for alert in changed_alerts:
+        status: AlertStatus = compute_alert_status(alert.type, alert.spread, market_spread)
+        if status == AlertStatus.fulfill and alert.status != AlertStatus.fulfill:
+            alert.fulfilled_at = evaluated_at
+            fulfilled_alerts.append(alert)
+        alert.status = status
+        alert.last_spread = market_spread
+        alert.last_evaluated_at = evaluated_at
+
+    return fulfilled_alerts
+
+def evaluate_alerts(db: Session, spreads: Iterable[dict]) -> List[AlertModel]:
+    """
+    Updates the stored status of the alerts of every market in spreads, a list of dicts as returned by
+    get_market_spread, and commits. Returns the alerts whose status changed to fulfill.
+
+    A webhook notification is queued for every fulfilled alert with a webhook_url, before committing, so
+    notifications are delivered at least once: receivers can tell repeated ones by alert_id and fulfilled_at.
+    """
+    evaluated_at: datetime = datetime.utcnow()
+    fulfilled_alerts: List[AlertModel] = []
+    for market_spread in spreads:
+        fulfilled_alerts.extend(
+            evaluate_market_alerts(db, market_spread['market'], market_spread['spread'], evaluated_at)
+        )
+    # Queued before the commit, so a crash in between sends the notification again instead of losing it
+    enqueue_alert_notifications(fulfilled_alerts)
+    db.commit()
+    return fulfilled_alerts
+
+def get_alert_markets(db: Session) -> List[str]:
+    """
+    Gets the markets with at least one alert, with the format {currency}-{market}
+    """
+    return [
+        f'{currency}-{market}'
+        for currency, market in db.query(AlertModel.currency, AlertModel.market).distinct()
+    ]
+
+def get_nearest_alert_distance(db: Session, market_id: str, market_spread: float) -> Optional[float]:
+    """
+    Gets the distance between the spread of a market, with the format {currency}-{market}, and the closest target
+    spread of its alerts. Returns None if the market has no alerts.
+    """
+    currency, market = market_id.split('-')
+    return db.query(func.min(func.abs(AlertModel.spread - market_spread))).filter(
+        AlertModel.currency == currency,
+        AlertModel.market == market
+    ).scalar()
+
+def is_alert_status_fresh(alert: AlertModel) -> bool:
+    """
+    Checks if the stored status of an alert was evaluated less than ALERT_STATUS_MAX_AGE seconds ago.
+    """
+    return (
+        alert.status not in (None, AlertStatus.undefined)
+        and alert.last_evaluated_at is not None
+        and datetime.utcnow() - alert.last_evaluated_at <= timedelta(seconds=settings.ALERT_STATUS_MAX_AGE)
+    )
+
+def refresh_alert_statuses(db: Session, alerts: Iterable[AlertModel]) -> bool:
+    """
+    Evaluates again the alerts whose stored status is not fresh, getting the spread once per market
+    instead of once per alert, and commits.
+
+    Like the alert scheduler, the last known spread of an unavailable market (see with_last_known_good) is not used
+    to change alert statuses: the alerts of that market keep their stored status, which stays not fresh.
+
+    Returns True if any alert was evaluated. The committed alerts are expired by the session.
+    """
+    stale_markets: set = {f'{alert.currency}-{alert.market}' for alert in alerts if not is_alert_status_fresh(alert)}
+
+    fulfilled_alerts: List[AlertModel] = []
+    evaluated: bool = False
+    for market_id in sorted(stale_markets):
+        currency, market = market_id.split('-')
+        market_spread: dict = get_market_spread(currency=currency, market=market, disable_check=True)
+        if market_spread.get('stale'):
+            app_logger.warning(f'Buda is unavailable, keeping the stored status of the alerts of {market_id}')
+            continue
+        fulfilled_alerts.extend(evaluate_market_alerts(db, market_id, market_spread['spread']))
+        evaluated = True
+    if not evaluated:
+        return False
+    enqueue_alert_notifications(fulfilled_alerts)
+    db.commit()
+    return True
+
+def serialize_alert(alert: AlertModel, include_status: bool = False) -> dict:
+    """
+    Builds the public representation of an alert. If include_status is True, the stored status fields are added.
+    """
+    alert_data: dict = {
+        'id': alert.id,
+        'market': f'{alert.currency}-{alert.market}',
+        'target_spread': alert.spread,
+        'type': alert.type
+    }
+    if include_status:
+        alert_data.update({
+            'status': (alert.status or AlertStatus.undefined).value,
+            'last_spread': alert.last_spread,
+            'last_evaluated_at': alert.last_evaluated_at,
+            'fulfilled_at': alert.fulfilled_at
+        })
+    return alert_data
 
 def get_alert(db: Session, alert_id: int) -> Optional[AlertModel]:
     """
     Gets the alert information and its status, if the id exists. Otherwise, it raises an InvalidRequest exception.
+
+    The stored status is returned while it is fresh. Otherwise, the alerts of the market are evaluated again
+    with the current spread before answering.
     """
     alert: AlertModel = db.query(AlertModel).filter(AlertModel.id == alert_id).first()
 
     if alert is None:
         raise InvalidRequest('Invalid alert_id')
 
+    refresh_alert_statuses(db, [alert])
+
     return {
-        'alert_data': {
-            'id': alert.id,
-            'market': f'{alert.currency}-{alert.market}',
-            'target_spread': alert.spread,
-            'type': alert.type
-        },
-        'status': get_alert_status(alert).value
+        'alert_data': serialize_alert(alert),
+        'status': alert.status.value,
+        'last_spread': alert.last_spread,
+        'last_evaluated_at': alert.last_evaluated_at,
+        'fulfilled_at': alert.fulfilled_at
     }
+
+def filter_alerts(
+    db: Session,
+    market: Optional[str] = None,
+    alert_type: Optional[AlertType] = None,
+    min_spread: Optional[float] = None,
+    max_spread: Optional[float] = None
+) -> Query:
+    """
+    Builds the query of the alerts matching the filters. market has the format {currency}-{market}, and the spread
+    range applies to the target spread of the alerts, including both ends.
+    """
+    query: Query = db.query(AlertModel)
+    if market is not None:
+        market_parts: List[str] = market.lower().split('-')
+        if len(market_parts) != 2:
+            raise InvalidRequest('The market must have the format {currency}-{market}')
+        query = query.filter(AlertModel.currency == market_parts[0], AlertModel.market == market_parts[1])
+    if alert_type is not None:
+        query = query.filter(AlertModel.type == alert_type)
+    if min_spread is not None:
+        query = query.filter(AlertModel.spread >= min_spread)
+    if max_spread is not None:
+        query = query.filter(AlertModel.spread <= max_spread)
+    return query
+
+def list_alerts(
+    db: Session,
+    after_id: int = 0,
+    limit: int = 100,
+    include_status: bool = False,
+    **filters
+) -> List[dict]:
+    """
+    Gets a page of alerts matching the filters (see filter_alerts), ordered by id.
+
+    Pagination uses the id of the last alert of the previous page as cursor (after_id), so the cost of a page
+    doesn't depend on its position. If include_status is True, the stale statuses of the page are evaluated
+    with one spread request per market.
+    """
+    page: Query = filter_alerts(db, **filters).filter(AlertModel.id > after_id).order_by(AlertModel.id).limit(limit)
+    alerts: List[AlertModel] = page.all()
+    if include_status and refresh_alert_statuses(db, alerts):
+        alerts = page.all()
+    return [serialize_alert(alert, include_status) for alert in alerts]
+
+def iter_alerts(
+    db: Session,
+    after_id: int = 0,
+    limit: Optional[int] = None,
+    include_status: bool = False,
+    chunk_size: Optional[int] = None,
+    **filters
+) -> Iterator[dict]:
+    """
+    Yields the alerts matching the filters, ordered by id, fetching them in pages of chunk_size
+    (ALERTS_STREAM_CHUNK_SIZE by default). The session is cleared after every page, so memory usage
+    doesn't grow with the number of alerts.
+    """
+    chunk_size = chunk_size or settings.ALERTS_STREAM_CHUNK_SIZE
+    remaining: Optional[int] = limit
+    while remaining is None or remaining > 0:
+        size: int = chunk_size if remaining is None else min(chunk_size, remaining)
+        alerts: List[dict] = list_alerts(db, after_id, size, include_status, **filters)
+        db.expunge_all()
+        yield from alerts
+        if len(alerts) < size:
+            return
+        after_id = alerts[-1]['id']
+        if remaining is not None:
+            remaining -= len(alerts)
+
+def create_alert_importer(db: Session) -> bulk.AlertImporter:
+    """
+    Creates an importer of alerts validated against the markets at Buda, fetched once for the whole import.
+    See api/bulk.py
+    """
+    return bulk.AlertImporter(db, get_all_markets(), batch_size=settings.ALERTS_IMPORT_BATCH_SIZE)
+
+def import_alerts(db: Session, chunks: Iterable[bytes], file_format: str) -> dict:
+    """
+    Imports the alerts of a csv or columnar file, read as chunks of bytes. Returns the number of rows read and
+    imported, and the errors of the invalid rows, which are skipped.
+    If the file can't be read to the end, raises bulk.AlertImportError with the report of the rows read before.
+    """
+    reader = bulk.create_reader(file_format)
+    importer: bulk.AlertImporter = create_alert_importer(db)
+    try:
+        for chunk in chunks:
+            importer.add(reader.feed(chunk))
+        importer.add(reader.close())
+    except ValueError as e:
+        raise importer.abort(e) from e
+    return importer.finish()
+
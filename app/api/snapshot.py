@@ -0,0 +1,151 @@
+import os
+import json
+import time
+import fcntl
+import logging
+
+from typing import Callable, Dict, List, Optional
+from buda import buda, schemas
+
+app_logger = logging.getLogger('app')
+
+
+def write_snapshot(path: str, markets: List[str], tickers: Dict[str, schemas.Ticker]) -> None:
+    """
+    Writes the markets and tickers snapshot to path.
+
+    The file is written to a temporary sibling and then renamed, so readers never see a partially written snapshot.
+    """
+    payload: dict = {
+        'fetched_at': time.time(),
+        'markets': markets,
+        'tickers': {market_id: list(ticker) for market_id, ticker in tickers.items()}
+    }
+    tmp_path: str = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'w') as snapshot_file:
+        json.dump(payload, snapshot_file, separators=(',', ':'))
+    os.replace(tmp_path, path)
+
+
+class SnapshotReader:
+    """
+        Reads the snapshot written by the fetcher process.
+
+        The parsed content is kept in memory and the file is only parsed again when its mtime or size changes,
+        so a read is a single stat call in the common case.
+    """
+
+    def __init__(self, path: str, max_age: float):
+        self._path = path
+        self._max_age = max_age
+        self._signature = None
+        self._snapshot = None
+
+    def _load(self) -> Optional[dict]:
+        try:
+            stat = os.stat(self._path)
+        except FileNotFoundError:
+            return None
+
+        signature = (stat.st_mtime_ns, stat.st_size)
+        if signature != self._signature:
+            try:
+                with open(self._path) as snapshot_file:
+                    data: dict = json.load(snapshot_file)
+            except (OSError, ValueError):
+                return None
+            self._snapshot = {
+                'fetched_at': data.get('fetched_at', 0),
+                'markets': data.get('markets', []),
+                'tickers': {
+                    market_id: schemas.Ticker(*ticker) for market_id, ticker in data.get('tickers', {}).items()
+                }
+            }
+            self._signature = signature
+        return self._snapshot
+
+    def read(self) -> Optional[dict]:
+        """
+            Returns the snapshot as a dict with fetched_at, markets and tickers keys.
+            Returns None if there is no snapshot or if it is older than max_age.
+        """
+        snapshot: Optional[dict] = self._load()
+        if snapshot is None or time.time() - snapshot['fetched_at'] > self._max_age:
+            return None
+        return snapshot
+
+    def get_markets(self) -> Optional[List[str]]:
+        snapshot: Optional[dict] = self.read()
+        return None if snapshot is None else snapshot['markets']
+
+    def get_ticker(self, market_id: str) -> Optional[schemas.Ticker]:
+        snapshot: Optional[dict] = self.read()
+        return None if snapshot is None else snapshot['tickers'].get(market_id)
+
+
+def acquire_fetcher_lock(path: str):
+    """
+    Tries to become the designated fetcher for the snapshot at path.
+
+    Returns the open lock file if the lock was acquired, None otherwise. The lock is released when the
+    returned file is closed or the process exits.
+    """
+    lock_file = open(f'{path}.lock', 'w')
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        lock_file.close()
+        return None
+    return lock_file
+
+
+def refresh_snapshot(path: str, markets: List[str], tickers: Dict[str, schemas.Ticker]) -> None:
+    """
+    Fetches the ticker of every market, updates tickers in place and writes the snapshot.
+    A market whose fetch fails keeps its previous ticker.
+    """
+    client = buda.get_client()
+    for market_id in markets:
+        currency, market = market_id.split('-')
+        try:
+            tickers[market_id] = client.get_ticker(currency=currency, market=market)
+        except Exception as e:
+            app_logger.warning(f'Snapshot fetcher could not refresh {market_id}: {e}')
+    write_snapshot(path, markets, tickers)
+
+
+def run_fetcher(
+    path: str,
+    interval: float,
+    markets_interval: float,
+    on_refresh: Optional[Callable[[Dict[str, schemas.Ticker]], None]] = None
+) -> None:
+    """
+    Main loop of the fetcher process.
+
+    Only the process holding the fetcher lock talks to Buda, so the upstream request rate depends on the
+    number of markets and the refresh interval, not on the number of API workers.
+    If on_refresh is set, it is called with the tickers after every refresh.
+    """
+    lock_file = acquire_fetcher_lock(path)
+    if lock_file is None:
+        app_logger.info('Another process is already the snapshot fetcher')
+        return
+
+    markets: List[str] = []
+    tickers: Dict[str, schemas.Ticker] = {}
+    markets_fetched_at: float = 0
+
+    while True:
+        started_at: float = time.monotonic()
+        try:
+            if started_at - markets_fetched_at >= markets_interval or not markets:
+                markets = [market.name.lower() for market in buda.get_client().get_markets().markets]
+                tickers = {market_id: tickers[market_id] for market_id in markets if market_id in tickers}
+                markets_fetched_at = started_at
+            refresh_snapshot(path, markets, tickers)
+            if on_refresh is not None:
+                on_refresh(tickers)
+        except Exception as e:
+            app_logger.warning(f'Snapshot fetcher failed: {e}')
+        time.sleep(max(0, interval - (time.monotonic() - started_at)))
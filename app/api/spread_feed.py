@@ -0,0 +1,128 @@
+import json
+import threading
+
+from collections import deque
+from typing import Deque, Dict, Iterable, Optional, Set, Tuple
+
+
+class VersionedSpreads:
+    """
+        Versioned snapshot of the spreads of every market, for clients that poll for changes.
+
+        Every update that changes at least one market increments sequence and records the changed and removed
+        markets in a ring buffer of the last max_deltas updates. A client that knows sequence N asks for the
+        changes since N and gets only the markets that changed after it. If N is older than the buffer, or unknown,
+        it gets every market instead (a full resync).
+
+        Processes that build their own spreads start at a different sequence (start), so the sequences of another
+        process are unknown instead of being mistaken for its own. Processes that read the same shared snapshot
+        pass its version as the sequence of each update instead, so all of them give the same sequence to the same
+        spreads, and a client can poll any of them.
+
+        Each market record is serialized once when it changes, so building a response only joins the stored json of
+        the changed markets.
+
+        Usage:
+
+        ```
+        feed = VersionedSpreads()
+        feed.update(spreads)
+        body = feed.changes_since(since)
+        ```
+    """
+
+    def __init__(self, max_deltas: int = 100, start: int = 0):
+        self.sequence: int = start
+        self._records: Dict[str, bytes] = {}
+        # (sequence, changed markets, removed markets) of the last updates
+        self._deltas: Deque[Tuple[int, Tuple[str, ...], Tuple[str, ...]]] = deque(maxlen=max_deltas)
+        # Oldest sequence whose changes are all in the deltas, None before the first update
+        self._oldest_since: Optional[int] = None
+        self._full_body: Optional[bytes] = None
+        self._lock = threading.Lock()
+
+    def update(self, spreads: Iterable[dict], complete: bool = True, sequence: Optional[int] = None) -> int:
+        """
+            Stores the spreads, dicts with a 'market' key, and returns the new sequence.
+            If complete is True, the markets missing from spreads are removed.
+
+            sequence is the version of the spreads, i.e. of a shared snapshot, instead of the next sequence. It
+            doesn't need to be consecutive, and an update with the current sequence is ignored.
+        """
+        records: Dict[str, bytes] = {
+            spread['market']: json.dumps(spread, sort_keys=True).encode() for spread in spreads
+        }
+        with self._lock:
+            if sequence is not None and sequence == self.sequence:
+                return self.sequence
+            changed: Tuple[str, ...] = tuple(
+                market_id for market_id, record in records.items() if self._records.get(market_id) != record
+            )
+            removed: Tuple[str, ...] = tuple(
+                market_id for market_id in self._records if market_id not in records
+            ) if complete else ()
+            if sequence is None:
+                if not changed and not removed:
+                    return self.sequence
+                sequence = self.sequence + 1
+
+            if self._oldest_since is None or sequence < self.sequence:
+                # The changes before the first update, or before the versions went back, are unknown
+                self._deltas.clear()
+                self._oldest_since = sequence
+            elif changed or removed:
+                if len(self._deltas) == self._deltas.maxlen:
+                    self._oldest_since = self._deltas[0][0]
+                self._deltas.append((sequence, changed, removed))
+
+            for market_id in changed:
+                self._records[market_id] = records[market_id]
+            for market_id in removed:
+                del self._records[market_id]
+            self.sequence = sequence
+            self._full_body = None
+            return self.sequence
+
+    def _body(self, full: bool, records: Iterable[bytes], removed: Iterable[str]) -> bytes:
+        return b''.join((
+            b'{"sequence": ', str(self.sequence).encode(),
+            b', "full": ', b'true' if full else b'false',
+            b', "removed": ', json.dumps(sorted(removed)).encode(),
+            b', "spreads": [', b', '.join(records), b']}'
+        ))
+
+    def changes_since(self, since: Optional[int] = None) -> bytes:
+        """
+            Returns the json body with the markets that changed after sequence since:
+
+            {"sequence": current sequence, "full": false, "removed": [market ids], "spreads": [changed records]}
+
+            If since is None, older than the buffered deltas or newer than the current sequence, every market is
+            returned with "full": true, and the client must replace its table.
+        """
+        with self._lock:
+            oldest: int = self.sequence if self._oldest_since is None else self._oldest_since
+            if since is None or since > self.sequence or since < oldest:
+                if self._full_body is None:
+                    self._full_body = self._body(True, (self._records[market_id] for market_id in sorted(self._records)), ())
+                return self._full_body
+
+            changed: Set[str] = set()
+            removed: Set[str] = set()
+            for sequence, delta_changed, delta_removed in self._deltas:
+                if sequence <= since:
+                    continue
+                changed.update(delta_changed)
+                removed.difference_update(delta_changed)
+                removed.update(delta_removed)
+                changed.difference_update(delta_removed)
+            return self._body(False, (self._records[market_id] for market_id in sorted(changed)), removed)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'sequence': self.sequence,
+                'markets': len(self._records),
+                'deltas': len(self._deltas),
+                'oldest_sequence': self._oldest_since
+            }
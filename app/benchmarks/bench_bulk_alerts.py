@@ -0,0 +1,74 @@
+"""
+Time to import and export alerts in bulk, in csv and columnar format, with a temporary SQLite database.
+Usage, inside the app directory:
+
+    python benchmarks/bench_bulk_alerts.py [alerts]
+"""
+import os
+import sys
+import time
+import random
+import tempfile
+
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from api import bulk
+from database import Base
+
+MARKETS = ['btc-clp', 'btc-cop', 'eth-clp', 'eth-btc', 'ltc-clp', 'bch-clp', 'usdc-clp']
+
+
+def create_session(directory: str, name: str):
+    engine = create_engine(f'sqlite:///{os.path.join(directory, name)}')
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+
+
+def import_data(db, data: bytes, file_format: str) -> dict:
+    reader = bulk.create_reader(file_format)
+    importer = bulk.AlertImporter(db, MARKETS)
+    for start in range(0, len(data), 1 << 20):
+        importer.add(reader.feed(data[start:start + (1 << 20)]))
+    importer.add(reader.close())
+    return importer.finish()
+
+
+def main():
+    alerts: int = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    lines = ['type,currency,market,spread,webhook_url']
+    for index in range(alerts):
+        currency, market = random.choice(MARKETS).split('-')
+        webhook_url: str = f'https://example.com/hooks/{index}' if index % 10 == 0 else ''
+        lines.append(f'{random.choice(("above", "under"))},{currency},{market},{random.uniform(0, 1000):.2f},{webhook_url}')
+    csv_data: bytes = ('\n'.join(lines) + '\n').encode()
+
+    with tempfile.TemporaryDirectory() as directory:
+        db = create_session(directory, 'csv.db')
+        started_at: float = time.perf_counter()
+        report: dict = import_data(db, csv_data, bulk.CSV_FORMAT)
+        print(f'import csv          {time.perf_counter() - started_at:>6.2f} s  {report["imported"]} alerts')
+
+        for file_format, export in ((bulk.CSV_FORMAT, bulk.export_alerts_csv), (bulk.COLUMNAR_FORMAT, bulk.export_alerts_columnar)):
+            started_at = time.perf_counter()
+            size: int = 0
+            chunks: list = []
+            for chunk in export(db, chunk_size=10000):
+                chunk = chunk.encode() if isinstance(chunk, str) else chunk
+                size += len(chunk)
+                chunks.append(chunk)
+            print(f'export {file_format:<12} {time.perf_counter() - started_at:>6.2f} s  {size / alerts:.1f} bytes/alert')
+        db.close()
+
+        db = create_session(directory, 'columnar.db')
+        started_at = time.perf_counter()
+        report = import_data(db, b''.join(chunks), bulk.COLUMNAR_FORMAT)
+        print(f'import columnar     {time.perf_counter() - started_at:>6.2f} s  {report["imported"]} alerts')
+        db.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,38 @@
+"""
+Time to compute the spread of a tick with floats and with scaled integers. Usage, inside the app directory:
+
+    python benchmarks/bench_spread.py [ticks]
+"""
+import sys
+import random
+import timeit
+
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from buda import prices
+from buda.compact import CompactTicker, TickerBatch
+
+
+def main():
+    ticks: int = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    batch = TickerBatch()
+    for index in range(ticks):
+        price: float = round(random.uniform(0.01, 0.1), 8)
+        batch.append(CompactTicker('ETH-BTC', 'ETH', 'BTC', price, price, round(price * 1.01, 8), 1.0, 0.0, 0.0), 0)
+    min_asks, max_bids = list(batch.min_ask), list(batch.max_bid)
+
+    results = {
+        'float round(ask - bid, 2)': lambda: [round(ask - bid, 2) for ask, bid in zip(min_asks, max_bids)],
+        'scaled_spread per tick': lambda: [prices.scaled_spread(ask, bid, 8) for ask, bid in zip(min_asks, max_bids)],
+        'TickerBatch.spreads': batch.spreads,
+        'TickerBatch.scaled_spreads': batch.scaled_spreads
+    }
+    print(f'{ticks} ticks')
+    for name, function in results.items():
+        seconds: float = min(timeit.repeat(function, number=1, repeat=5))
+        print(f'{name:<28}{seconds / ticks * 1e9:>8.1f} ns/tick')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+"""
+Cold start of the API: import time of main and time from process start to the first response of /health/.
+Usage, inside the app directory:
+
+    python benchmarks/bench_startup.py [runs]
+
+Track it when changing the imports of the app, since it is the latency added by every new autoscaled instance.
+"""
+import os
+import sys
+import time
+import socket
+import statistics
+import subprocess
+import urllib.request
+
+from pathlib import Path
+
+APP_DIR = str(Path(__file__).resolve().parent.parent)
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def import_time() -> float:
+    started_at: float = time.perf_counter()
+    subprocess.run([sys.executable, '-c', 'import main'], cwd=APP_DIR, check=True)
+    return time.perf_counter() - started_at
+
+
+def time_to_first_response(timeout: float = 30) -> float:
+    port: int = free_port()
+    started_at: float = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'uvicorn', 'main:app', '--port', str(port), '--log-level', 'warning'],
+        cwd=APP_DIR
+    )
+    try:
+        while time.perf_counter() - started_at < timeout:
+            try:
+                with urllib.request.urlopen(f'http://127.0.0.1:{port}/health/', timeout=1) as response:
+                    if response.status == 200:
+                        return time.perf_counter() - started_at
+            except OSError:
+                time.sleep(0.005)
+        raise TimeoutError('The app did not answer')
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def main():
+    runs: int = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    results = {
+        'python -c "import main"': [import_time() for _ in range(runs)],
+        'time to first response': [time_to_first_response() for _ in range(runs)]
+    }
+    print(f'{runs} runs, BUDA_INIT_DB_ON_STARTUP={os.environ.get("BUDA_INIT_DB_ON_STARTUP", "1")}')
+    for name, seconds in results.items():
+        print(f'{name:<28}median {statistics.median(seconds) * 1000:>7.1f} ms   min {min(seconds) * 1000:>7.1f} ms')
+
+
+if __name__ == '__main__':
+    main()
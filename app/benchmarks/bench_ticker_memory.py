@@ -0,0 +1,75 @@
+"""
+Memory used per tick by the ticker representations. Usage, inside the app directory:
+
+    python benchmarks/bench_ticker_memory.py [ticks]
+"""
+import sys
+import random
+import tracemalloc
+
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from buda import schemas
+from buda.compact import CompactTicker, TickerBatch
+
+MARKETS = [('BTC', 'CLP'), ('ETH', 'CLP'), ('ETH', 'BTC'), ('LTC', 'PEN'), ('USDC', 'COP')]
+
+
+def make_payload(index: int) -> dict:
+    """
+    Builds a ticker payload like the one returned by Buda, with new string objects for every field
+    """
+    base, quote = MARKETS[index % len(MARKETS)]
+    price: float = random.uniform(1, 30000000)
+    return {
+        'market_id': f'{base}-{quote}',
+        'last_price': [str(price), str(quote)],
+        'max_bid': [str(price * 0.99), str(quote)],
+        'min_ask': [str(price * 1.01), str(quote)],
+        'volume': [str(random.uniform(0, 100)), str(base)],
+        'price_variation_24h': str(random.uniform(-0.1, 0.1)),
+        'price_variation_7d': str(random.uniform(-0.1, 0.1))
+    }
+
+
+def ticker_from_payload(payload: dict) -> schemas.Ticker:
+    # Same float fields as Buda.get_ticker, without the exact prices
+    return schemas.Ticker(
+        last_price=[float(payload['last_price'][0]), payload['last_price'][1]],
+        market_id=payload['market_id'],
+        max_bid=[float(payload['max_bid'][0]), payload['max_bid'][1]],
+        min_ask=[float(payload['min_ask'][0]), payload['min_ask'][1]],
+        price_variation_24h=payload['price_variation_24h'],
+        price_variation_7d=payload['price_variation_7d'],
+        volume=[float(payload['volume'][0]), payload['volume'][1]]
+    )
+
+
+def measure(build, ticks: int) -> float:
+    payloads = [make_payload(index) for index in range(ticks)]
+    tracemalloc.start()
+    container = build(payloads)
+    del payloads
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del container
+    return size / ticks
+
+
+def main():
+    ticks: int = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    results = {
+        'list of Ticker': measure(lambda payloads: [ticker_from_payload(payload) for payload in payloads], ticks),
+        'list of CompactTicker': measure(lambda payloads: [CompactTicker.from_payload(payload) for payload in payloads], ticks),
+        'TickerBatch': measure(lambda payloads: TickerBatch.from_tickers(
+            (CompactTicker.from_payload(payload) for payload in payloads), timestamp=0
+        ), ticks)
+    }
+    print(f'{ticks} ticks')
+    for name, bytes_per_tick in results.items():
+        print(f'{name:<24}{bytes_per_tick:>8.1f} bytes/tick')
+
+
+if __name__ == '__main__':
+    main()
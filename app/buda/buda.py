@@ -1,5 +1,7 @@
-from buda import schemas, exceptions, constants
-from typing import Iterable
+from buda import schemas, exceptions, constants, compact, prices
+import threading
+
+from typing import Iterable, Optional
 import api.sdk as sdk
 
 
@@ -39,7 +41,9 @@ class Buda(sdk.BaseSDK):
         data: dict = None,
         optional_data: dict = None,
         query_params: dict = None,
-        success_codes: Iterable = None
+        success_codes: Iterable = None,
+        timeout: float = None,
+        circuit: str = None
     ) -> dict:
         """
         Generic Buda endpoint
@@ -53,11 +57,13 @@ class Buda(sdk.BaseSDK):
             optional_data=optional_data,
             query_params=query_params,
             success_codes=success_codes,
-            error_exc=exceptions.BudaServicesException
+            error_exc=exceptions.BudaServicesException,
+            timeout=timeout,
+            circuit=circuit
         )
 
     
-    def get_markets(self) -> schemas.Markets:
+    def get_markets(self, timeout: float = None) -> schemas.Markets:
         """
         This method queries the list of markets in the endpoint 'markets/' and returns a schema of type Markets
         with a list of markets of type Market.
@@ -73,12 +79,14 @@ class Buda(sdk.BaseSDK):
         minimum_order_amount | [amount, currency] | Minimum order size accepted
         taker_fee	         | [amount]	          | Fee paid for a taker order
         maker_fee	         | [amount]	          | Fee paid for a maker order
+        price_precision      | [int]              | Number of decimals of the prices, given by the quote currency
         
         """
 
         markets_data: dict = self.buda_endpoint(
             method='get',
-            url='markets'
+            url='markets',
+            timeout=timeout
         )
 
         if constants.ResponseErrors.is_error(markets_data.get('code')):
@@ -98,40 +106,59 @@ class Buda(sdk.BaseSDK):
                         market.get('minimum_order_amount')[1]
                     ],
                     taker_fee=market.get('taker_fee'),
-                    maker_fee=market.get('maker_fee')
+                    maker_fee=market.get('maker_fee'),
+                    price_precision=prices.get_price_precision(market.get('quote_currency'))
                 ) for market in total_markets
             ] 
         )
 
 
 
-    def get_ticker(self, currency: str, market: str) -> schemas.Ticker:
+    def get_ticker_payload(self, currency: str, market: str, timeout: float = None) -> dict:
         """
-        This method queries the endpoint markets/{currency}-{market}/ticker for a market and returns a schema of type
-        Ticker with the following information:
-
-        Ticker
-
-        Attribute           |  Type    | Description
-
-        last_price          | [float]  | Last price of the currency in the current market
-        market_id           | [string] | Market name with format {currency}-{market} 
-        max_bid             | [float]  | Current maximum bid in the market
-        min_ask             | [float]  | Current minimum ask in the market
-        price_variation_24h | [float]  | Percentage of variation in the period)
-        price_variation_7d  | [float]  | Percentage of variation in the period
+        This method queries the endpoint markets/{currency}-{market}/ticker and returns the unpacked 'ticker'
+        object of the response, without any conversion.
         """
-
         ticker_data: dict = self.buda_endpoint(
             method='get',
-            url=f'markets/{currency}-{market}/ticker'
+            url=f'markets/{currency}-{market}/ticker',
+            timeout=timeout,
+            circuit='markets/{market_id}/ticker'
         )
-        
+
         if constants.ResponseErrors.is_error(ticker_data.get('code')):
             raise exceptions.BudaInvalidResponse(f'Invalid response from Buda: {ticker_data.get("message")}')
 
-        unpacked_ticker: dict = ticker_data.get('ticker')
+        return ticker_data.get('ticker')
+
+    def get_compact_ticker(self, currency: str, market: str) -> compact.CompactTicker:
+        """
+        Same as get_ticker, but returns a CompactTicker, with flat float fields and interned currency codes.
+        Use it when many tickers are kept in memory.
+        """
+        return compact.CompactTicker.from_payload(self.get_ticker_payload(currency=currency, market=market))
+
+    def get_ticker(self, currency: str, market: str, timeout: float = None) -> schemas.Ticker:
+        """
+        This method queries the endpoint markets/{currency}-{market}/ticker for a market and returns a schema of type
+        Ticker with the following information:
+
+        Ticker
+
+        Attribute           |  Type          | Description
+
+        last_price          | [float]        | Last price of the currency in the current market
+        market_id           | [string]       | Market name with format {currency}-{market} 
+        max_bid             | [float]        | Current maximum bid in the market
+        min_ask             | [float]        | Current minimum ask in the market
+        price_variation_24h | [string]       | Percentage of variation in the period
+        price_variation_7d  | [string]       | Percentage of variation in the period
+        exact_prices        | {name: string} | Decimal strings of the amounts sent by Buda, by attribute name
+
+        Spreads are computed exactly from exact_prices, see buda/prices.py
+        """
 
+        unpacked_ticker: dict = self.get_ticker_payload(currency=currency, market=market, timeout=timeout)
 
         return schemas.Ticker(
             last_price=[
@@ -153,4 +180,24 @@ class Buda(sdk.BaseSDK):
                 float(unpacked_ticker.get('volume')[0]),
                 unpacked_ticker.get('volume')[1]
             ],
-        ) 
+            exact_prices={
+                name: unpacked_ticker.get(name)[0] for name in ('last_price', 'max_bid', 'min_ask', 'volume')
+            }
+        )
+
+
+_default_client: Optional[Buda] = None
+_default_client_lock = threading.Lock()
+
+
+def get_client() -> Buda:
+    """
+    Returns the Buda client shared by the whole process, created on first use.
+    Buda instances are thread-safe, so sharing one reuses its connections instead of opening new ones on every call.
+    """
+    global _default_client
+    if _default_client is None:
+        with _default_client_lock:
+            if _default_client is None:
+                _default_client = Buda()
+    return _default_client
@@ -0,0 +1,232 @@
+import sys
+import time
+
+from array import array
+from decimal import Decimal
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from buda import schemas, prices
+
+
+def intern_code(code: Optional[str]) -> Optional[str]:
+    """
+    Returns the interned version of a currency or market code, so every ticker shares the same string object
+    """
+    return None if code is None else sys.intern(code)
+
+
+def _to_float(value) -> float:
+    return float('nan') if value is None else float(value)
+
+
+def _to_text(value: float) -> Optional[str]:
+    # Decimal string as sent by Buda, without exponent, or None for a missing value stored as nan
+    return None if value != value else format(Decimal(repr(value)), 'f')
+
+
+def _same_value(value, other) -> bool:
+    # Missing variations are stored as nan, which is not equal to itself
+    return value == other or value != value and other != other
+
+
+class CompactTicker:
+    """
+        Memory efficient version of schemas.Ticker.
+
+        Prices and amounts are stored as flat float attributes instead of [amount, currency] lists, and
+        the currency codes are interned. Prices are in quote_currency and volume in base_currency.
+        Missing variations are stored as nan.
+
+        Use from_ticker and to_ticker to convert from and to the NamedTuple. to_ticker returns the variations with
+        the types of Buda: decimal strings, or None when missing. The strings have the same value, but not
+        necessarily the same text, i.e. '0.0340' comes back as '0.034'.
+    """
+
+    __slots__ = (
+        'market_id', 'base_currency', 'quote_currency', 'last_price', 'max_bid', 'min_ask', 'volume',
+        'price_variation_24h', 'price_variation_7d'
+    )
+
+    def __init__(
+        self,
+        market_id: str,
+        base_currency: str,
+        quote_currency: str,
+        last_price: float,
+        max_bid: float,
+        min_ask: float,
+        volume: float,
+        price_variation_24h: float,
+        price_variation_7d: float
+    ):
+        self.market_id = intern_code(market_id)
+        self.base_currency = intern_code(base_currency)
+        self.quote_currency = intern_code(quote_currency)
+        self.last_price = last_price
+        self.max_bid = max_bid
+        self.min_ask = min_ask
+        self.volume = volume
+        self.price_variation_24h = price_variation_24h
+        self.price_variation_7d = price_variation_7d
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, CompactTicker):
+            return NotImplemented
+        return all(_same_value(getattr(self, name), getattr(other, name)) for name in self.__slots__)
+
+    def __repr__(self) -> str:
+        fields: str = ', '.join(f'{name}={getattr(self, name)!r}' for name in self.__slots__)
+        return f'CompactTicker({fields})'
+
+    @property
+    def spread(self) -> float:
+        return self.min_ask - self.max_bid
+
+    @classmethod
+    def from_ticker(cls, ticker: schemas.Ticker) -> 'CompactTicker':
+        return cls(
+            market_id=ticker.market_id,
+            base_currency=ticker.volume[1],
+            quote_currency=ticker.max_bid[1],
+            last_price=float(ticker.last_price[0]),
+            max_bid=float(ticker.max_bid[0]),
+            min_ask=float(ticker.min_ask[0]),
+            volume=float(ticker.volume[0]),
+            price_variation_24h=_to_float(ticker.price_variation_24h),
+            price_variation_7d=_to_float(ticker.price_variation_7d)
+        )
+
+    @classmethod
+    def from_payload(cls, payload: dict) -> 'CompactTicker':
+        """
+            Builds the ticker from the 'ticker' object of the Buda response, without intermediate lists
+        """
+        return cls(
+            market_id=payload.get('market_id'),
+            base_currency=payload.get('volume')[1],
+            quote_currency=payload.get('max_bid')[1],
+            last_price=float(payload.get('last_price')[0]),
+            max_bid=float(payload.get('max_bid')[0]),
+            min_ask=float(payload.get('min_ask')[0]),
+            volume=float(payload.get('volume')[0]),
+            price_variation_24h=_to_float(payload.get('price_variation_24h')),
+            price_variation_7d=_to_float(payload.get('price_variation_7d'))
+        )
+
+    def to_ticker(self) -> schemas.Ticker:
+        return schemas.Ticker(
+            last_price=[self.last_price, self.quote_currency],
+            market_id=self.market_id,
+            max_bid=[self.max_bid, self.quote_currency],
+            min_ask=[self.min_ask, self.quote_currency],
+            price_variation_24h=_to_text(self.price_variation_24h),
+            price_variation_7d=_to_text(self.price_variation_7d),
+            volume=[self.volume, self.base_currency]
+        )
+
+
+class TickerBatch:
+    """
+        Columnar collection of tickers, for history buffers with millions of ticks.
+
+        Every float field is stored in its own array('d'), and the market of each tick as an index into a small
+        table of (market_id, base_currency, quote_currency), so a tick takes a fixed number of bytes and no
+        Python objects. Each tick also stores its timestamp in seconds.
+
+        Usage:
+
+        ```
+        batch = TickerBatch()
+        batch.append(ticker)
+        spreads = batch.spreads()
+        latest = batch[-1].to_ticker()
+        ```
+    """
+
+    FLOAT_COLUMNS: Tuple[str, ...] = (
+        'timestamp', 'last_price', 'max_bid', 'min_ask', 'volume', 'price_variation_24h', 'price_variation_7d'
+    )
+
+    def __init__(self):
+        self.markets: List[Tuple[str, str, str]] = []
+        self._market_index: Dict[str, int] = {}
+        self.market = array('H')
+        for column in self.FLOAT_COLUMNS:
+            setattr(self, column, array('d'))
+
+    def __len__(self) -> int:
+        return len(self.market)
+
+    def _get_market_index(self, market_id: str, base_currency: str, quote_currency: str) -> int:
+        index: Optional[int] = self._market_index.get(market_id)
+        if index is None:
+            index = self._market_index[market_id] = len(self.markets)
+            self.markets.append((intern_code(market_id), intern_code(base_currency), intern_code(quote_currency)))
+        return index
+
+    def append(self, ticker, timestamp: Optional[float] = None) -> None:
+        """
+            Adds a tick. ticker can be a schemas.Ticker or a CompactTicker
+        """
+        if isinstance(ticker, schemas.Ticker):
+            ticker = CompactTicker.from_ticker(ticker)
+        self.market.append(self._get_market_index(ticker.market_id, ticker.base_currency, ticker.quote_currency))
+        self.timestamp.append(time.time() if timestamp is None else timestamp)
+        self.last_price.append(ticker.last_price)
+        self.max_bid.append(ticker.max_bid)
+        self.min_ask.append(ticker.min_ask)
+        self.volume.append(ticker.volume)
+        self.price_variation_24h.append(ticker.price_variation_24h)
+        self.price_variation_7d.append(ticker.price_variation_7d)
+
+    def extend(self, tickers: Iterable, timestamp: Optional[float] = None) -> None:
+        for ticker in tickers:
+            self.append(ticker, timestamp)
+
+    @classmethod
+    def from_tickers(cls, tickers: Iterable, timestamp: Optional[float] = None) -> 'TickerBatch':
+        batch = cls()
+        batch.extend(tickers, timestamp)
+        return batch
+
+    def __getitem__(self, index: int) -> CompactTicker:
+        market_id, base_currency, quote_currency = self.markets[self.market[index]]
+        return CompactTicker(
+            market_id=market_id,
+            base_currency=base_currency,
+            quote_currency=quote_currency,
+            last_price=self.last_price[index],
+            max_bid=self.max_bid[index],
+            min_ask=self.min_ask[index],
+            volume=self.volume[index],
+            price_variation_24h=self.price_variation_24h[index],
+            price_variation_7d=self.price_variation_7d[index]
+        )
+
+    def __iter__(self) -> Iterator[CompactTicker]:
+        for index in range(len(self)):
+            yield self[index]
+
+    def to_tickers(self) -> List[schemas.Ticker]:
+        return [ticker.to_ticker() for ticker in self]
+
+    def spreads(self) -> array:
+        """
+            Returns the spread (min_ask - max_bid) of every tick
+        """
+        return array('d', map(float.__sub__, self.min_ask, self.max_bid))
+
+    def scaled_spreads(self) -> array:
+        """
+            Returns the exact spread of every tick as an array('q') of 10^-precision units, where precision is the
+            price precision of the quote currency of its market. See buda/prices.py
+        """
+        market_precisions: List[int] = [prices.get_price_precision(market[2]) for market in self.markets]
+        return prices.scaled_spreads(self.min_ask, self.max_bid, map(market_precisions.__getitem__, self.market))
+
+    def nbytes(self) -> int:
+        """
+            Bytes used by the column buffers
+        """
+        columns: List[array] = [self.market] + [getattr(self, column) for column in self.FLOAT_COLUMNS]
+        return sum(column.buffer_info()[1] * column.itemsize for column in columns)
@@ -7,3 +7,20 @@ class ResponseErrors(Enum):
     @classmethod
     def is_error(cls, value):
         return value in cls._value2member_map_ 
+
+
+# Number of decimals used for prices quoted in each currency. Buda doesn't publish the precision of a market,
+# so it is taken from the quote_currency of the market. Unknown currencies use DEFAULT_PRICE_PRECISION
+PRICE_PRECISION: dict = {
+    'CLP': 2,
+    'COP': 2,
+    'PEN': 2,
+    'ARS': 2,
+    'USDC': 6,
+    'USDT': 6,
+    'BTC': 8,
+    'ETH': 8,
+    'BCH': 8,
+    'LTC': 8,
+}
+DEFAULT_PRICE_PRECISION: int = 8
@@ -0,0 +1,86 @@
+from array import array
+from typing import Iterable, Union
+
+from buda import constants
+
+# Powers of ten by precision, to avoid computing them on every conversion
+_SCALES = [10 ** precision for precision in range(19)]
+
+
+def get_price_precision(quote_currency: str) -> int:
+    """
+    Returns the number of decimals of the prices quoted in quote_currency
+    """
+    return constants.PRICE_PRECISION.get(quote_currency.upper(), constants.DEFAULT_PRICE_PRECISION)
+
+
+def widen_precision(precision: int, *values: Union[str, float]) -> int:
+    """
+    Returns precision, or the number of decimals of the string values that have more, so they are scaled exactly.
+    The precision of a currency is a guess and Buda may send more decimals for some markets.
+    """
+    for value in values:
+        if isinstance(value, str):
+            precision = max(precision, len(value.partition('.')[2].rstrip('0')))
+    return precision
+
+
+def _scale(precision: int) -> int:
+    return _SCALES[precision] if precision < len(_SCALES) else 10 ** precision
+
+
+def to_scaled(value: Union[str, float], precision: int) -> int:
+    """
+    Converts a price to an integer number of 10^-precision units.
+
+    Strings are parsed exactly and raise ValueError if they have more decimals than precision, see widen_precision.
+    Floats are rounded to the nearest unit, which recovers the exact decimal value of any float parsed from a
+    price with at most precision decimals, as long as it has less than 15 significant digits.
+    """
+    if isinstance(value, str):
+        sign: int = -1 if value.startswith('-') else 1
+        integer, _, decimals = value.lstrip('+-').partition('.')
+        if len(decimals) > precision and decimals[precision:].strip('0'):
+            raise ValueError(f'{value} has more than {precision} decimals')
+        decimals = decimals[:precision].ljust(precision, '0')
+        return sign * int((integer or '0') + decimals)
+    return round(value * _SCALES[precision])
+
+
+def from_scaled(scaled: int, precision: int) -> float:
+    """
+    Converts an scaled price back to float
+    """
+    return scaled / _scale(precision)
+
+
+def format_scaled(scaled: int, precision: int) -> str:
+    """
+    Formats an scaled price as an exact decimal string, without trailing zeros, i.e. 6182 with precision 8 is '0.00006182'
+    """
+    if precision == 0:
+        return str(scaled)
+    sign: str = '-' if scaled < 0 else ''
+    integer, decimals = divmod(abs(scaled), _scale(precision))
+    decimals_text: str = str(decimals).rjust(precision, '0').rstrip('0')
+    return f'{sign}{integer}.{decimals_text}' if decimals_text else f'{sign}{integer}'
+
+
+def scaled_spread(min_ask: Union[str, float], max_bid: Union[str, float], precision: int) -> int:
+    """
+    Exact spread of a market in 10^-precision units
+    """
+    if type(min_ask) is float and type(max_bid) is float:
+        scale: int = _SCALES[precision]
+        return round(min_ask * scale) - round(max_bid * scale)
+    return to_scaled(min_ask, precision) - to_scaled(max_bid, precision)
+
+
+def scaled_spreads(min_asks: Iterable[float], max_bids: Iterable[float], precisions: Iterable[int]) -> array:
+    """
+    Exact spreads of many ticks at once, i.e. the columns of a TickerBatch. Returns an array('q') of scaled spreads
+    """
+    scales = map(_SCALES.__getitem__, precisions)
+    return array('q', [
+        round(min_ask * scale) - round(max_bid * scale) for min_ask, max_bid, scale in zip(min_asks, max_bids, scales)
+    ])
@@ -1,4 +1,4 @@
-from typing import NamedTuple, List, Tuple
+from typing import Dict, NamedTuple, List, Optional, Tuple
 
 
 class Market(NamedTuple):
@@ -12,6 +12,7 @@ class Market(NamedTuple):
         minimum_order_amount | [amount, currency] | Minimum order size accepted
         taker_fee	         | [amount]	          | Fee paid for a taker order
         maker_fee	         | [amount]	          | Fee paid for a maker order
+        price_precision      | [int]              | Number of decimals of the prices, given by the quote currency
 
     """
     id: str
@@ -21,6 +22,7 @@ class Market(NamedTuple):
     minimum_order_amount: Tuple[float, str]
     taker_fee: float
     maker_fee: float
+    price_precision: int = 8
 
 
 class Markets(NamedTuple):
@@ -34,19 +36,23 @@ class Markets(NamedTuple):
 
 class Ticker(NamedTuple):
     """       
-        Attribute           |  Type    | Description
-
-        last_price          | [float]  | Last price of the currency in the current market
-        market_id           | [string] | Market name with format {currency}-{market} 
-        max_bid             | [float]  | Current maximum bid in the market
-        min_ask             | [float]  | Current minimum ask in the market
-        price_variation_24h | [float]  | Percentage of variation in the period)
-        price_variation_7d  | [float]  | Percentage of variation in the period
+        Attribute           |  Type          | Description
+
+        last_price          | [float]        | Last price of the currency in the current market
+        market_id           | [string]       | Market name with format {currency}-{market} 
+        max_bid             | [float]        | Current maximum bid in the market
+        min_ask             | [float]        | Current minimum ask in the market
+        price_variation_24h | [string]       | Percentage of variation in the period, None if missing
+        price_variation_7d  | [string]       | Percentage of variation in the period, None if missing
+        volume              | [float]        | Traded volume in the base currency
+        exact_prices        | {name: string} | Decimal strings of the amounts, by attribute name, when the source
+                                               sends them, i.e. Buda. None otherwise
     """
     last_price: Tuple[float, str]
     market_id: str
     max_bid: Tuple[float, str]
     min_ask: Tuple[float, str]
-    price_variation_24h: float
-    price_variation_7d: float
+    price_variation_24h: Optional[str]
+    price_variation_7d: Optional[str]
     volume: Tuple[float, str]
+    exact_prices: Optional[Dict[str, str]] = None
@@ -0,0 +1,354 @@
+import os
+import time
+import fcntl
+import pickle
+import hashlib
+import threading
+
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+
+import settings
+
+# Returned by get when a key is not cached, since None is a valid cached value
+MISSING = object()
+
+
+class CacheStats:
+    """
+        Counters of a cache backend, useful for tuning sizes and TTLs.
+        hit_ratio is hits / (hits + misses).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.sets = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.fills = 0
+        self.fill_waits = 0
+
+    def incr(self, counter: str, amount: int = 1) -> None:
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + amount)
+
+    def as_dict(self) -> dict:
+        lookups: int = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'sets': self.sets,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+            'fills': self.fills,
+            'fill_waits': self.fill_waits,
+            'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0
+        }
+
+
+class BaseCache:
+    """
+        Common interface for cache backends.
+
+        Subclasses implement _get, _set, _delete and _clear. Per-key TTLs are passed in seconds, None uses the
+        backend default_ttl. get_or_set adds stampede protection: when several callers miss the same key at the
+        same time, only one of them computes the value while the others wait for it.
+    """
+
+    NAME = 'base'
+
+    def __init__(self, default_ttl: Optional[float] = None):
+        self.default_ttl = default_ttl
+        self.stats = CacheStats()
+        # Lock of every key being filled and the number of callers using it, removed when the last one is done
+        self._fill_locks: Dict[str, List] = {}
+        self._fill_locks_guard = threading.Lock()
+
+    def _expires_at(self, ttl: Optional[float]) -> Optional[float]:
+        ttl = self.default_ttl if ttl is None else ttl
+        return None if ttl is None else time.time() + ttl
+
+    def _get(self, key: str) -> Any:
+        raise NotImplementedError
+
+    def _set(self, key: str, value: Any, ttl: Optional[float]) -> None:
+        raise NotImplementedError
+
+    def _delete(self, key: str) -> None:
+        raise NotImplementedError
+
+    def _clear(self) -> None:
+        raise NotImplementedError
+
+    def get(self, key: str, default: Any = MISSING) -> Any:
+        value = self._get(key)
+        if value is MISSING:
+            self.stats.incr('misses')
+            return default
+        self.stats.incr('hits')
+        return value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        self._set(key, value, ttl)
+        self.stats.incr('sets')
+
+    def delete(self, key: str) -> None:
+        self._delete(key)
+
+    def clear(self) -> None:
+        self._clear()
+
+    def _local_fill_lock(self, key: str) -> threading.Lock:
+        with self._fill_locks_guard:
+            entry: Optional[List] = self._fill_locks.get(key)
+            if entry is None:
+                entry = self._fill_locks[key] = [threading.Lock(), 0]
+            entry[1] += 1
+            return entry[0]
+
+    def _release_local_fill_lock(self, key: str) -> None:
+        with self._fill_locks_guard:
+            entry: List = self._fill_locks[key]
+            entry[1] -= 1
+            if entry[1] == 0:
+                del self._fill_locks[key]
+
+    def _acquire_shared_fill_lock(self, key: str, ttl: float):
+        """
+            Hook for backends shared between processes, to hold a lock on key while it is being filled.
+            Returns a release callable. The default implementation only protects within the process.
+        """
+        return lambda: None
+
+    def get_or_set(self, key: str, factory: Callable[[], Any], ttl: Optional[float] = None) -> Any:
+        """
+            Returns the cached value of key, computing it with factory and caching it on a miss.
+            Exceptions raised by factory are not cached.
+        """
+        value = self.get(key)
+        if value is not MISSING:
+            return value
+
+        lock = self._local_fill_lock(key)
+        try:
+            if not lock.acquire(blocking=False):
+                self.stats.incr('fill_waits')
+                lock.acquire()
+        except BaseException:
+            self._release_local_fill_lock(key)
+            raise
+        try:
+            # Another caller may have filled the key while we were waiting
+            value = self._get(key)
+            if value is not MISSING:
+                return value
+            release = self._acquire_shared_fill_lock(key, settings.CACHE_FILL_LOCK_TIMEOUT)
+            try:
+                value = self._get(key)
+                if value is MISSING:
+                    value = factory()
+                    self.stats.incr('fills')
+                    self.set(key, value, ttl)
+            finally:
+                release()
+            return value
+        finally:
+            lock.release()
+            self._release_local_fill_lock(key)
+
+
+class NullCache(BaseCache):
+    """
+        Cache that never stores anything. Used to disable caching.
+    """
+
+    NAME = 'none'
+
+    def _get(self, key: str) -> Any:
+        return MISSING
+
+    def _set(self, key: str, value: Any, ttl: Optional[float]) -> None:
+        pass
+
+    def _delete(self, key: str) -> None:
+        pass
+
+    def _clear(self) -> None:
+        pass
+
+
+class LocalLRUCache(BaseCache):
+    """
+        In-process cache with a maximum number of entries and TTL eviction.
+        When full, the least recently used entry is evicted.
+    """
+
+    NAME = 'local'
+
+    def __init__(self, max_size: int = 1024, default_ttl: Optional[float] = None):
+        super().__init__(default_ttl)
+        self.max_size = max_size
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _get(self, key: str) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return MISSING
+            expires_at, value = entry
+            if expires_at is not None and expires_at <= time.time():
+                del self._entries[key]
+                self.stats.incr('expirations')
+                return MISSING
+            self._entries.move_to_end(key)
+            return value
+
+    def _set(self, key: str, value: Any, ttl: Optional[float]) -> None:
+        with self._lock:
+            self._entries[key] = (self._expires_at(ttl), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.stats.incr('evictions')
+
+    def _delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def _clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+class DiskCache(BaseCache):
+    """
+        Cache shared between the processes of a host, stored as one pickle file per key in a directory.
+
+        Pointing the directory to /dev/shm keeps it in shared memory. Writes are atomic renames, so readers
+        never see a partial entry. Entries are pickled: only use it in directories trusted by the app.
+
+        A key is filled by one process at a time, holding a lock file. A process waits for it up to
+        CACHE_FILL_LOCK_TIMEOUT seconds, then fills the key without it, like RedisCache.
+    """
+
+    NAME = 'disk'
+
+    def __init__(self, path: str, default_ttl: Optional[float] = None):
+        super().__init__(default_ttl)
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+
+    def _key_path(self, key: str) -> str:
+        return os.path.join(self.path, hashlib.sha1(key.encode()).hexdigest())
+
+    def _get(self, key: str) -> Any:
+        try:
+            with open(self._key_path(key), 'rb') as entry_file:
+                expires_at, value = pickle.load(entry_file)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return MISSING
+        if expires_at is not None and expires_at <= time.time():
+            self._delete(key)
+            self.stats.incr('expirations')
+            return MISSING
+        return value
+
+    def _set(self, key: str, value: Any, ttl: Optional[float]) -> None:
+        key_path: str = self._key_path(key)
+        tmp_path: str = f'{key_path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(tmp_path, 'wb') as entry_file:
+            pickle.dump((self._expires_at(ttl), value), entry_file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, key_path)
+
+    def _delete(self, key: str) -> None:
+        try:
+            os.remove(self._key_path(key))
+        except FileNotFoundError:
+            pass
+
+    def _clear(self) -> None:
+        for filename in os.listdir(self.path):
+            try:
+                os.remove(os.path.join(self.path, filename))
+            except FileNotFoundError:
+                pass
+
+    def _acquire_shared_fill_lock(self, key: str, ttl: float):
+        lock_path: str = f'{self._key_path(key)}.lock'
+        deadline: float = time.monotonic() + ttl
+        while True:
+            lock_file = open(lock_path, 'a')
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                lock_file.close()
+                # Fill without the lock if its holder takes too long, or skip it if the value is already there
+                if time.monotonic() > deadline or self._get(key) is not MISSING:
+                    return lambda: None
+                time.sleep(0.005)
+                continue
+            try:
+                locked = os.fstat(lock_file.fileno())
+                current = os.stat(lock_path)
+                if (locked.st_dev, locked.st_ino) == (current.st_dev, current.st_ino):
+                    break
+            except FileNotFoundError:
+                pass
+            # The previous holder removed the file while we were waiting for it, lock the current one
+            lock_file.close()
+
+        def release():
+            # The file is removed while it is still locked, so no lock files are left behind
+            try:
+                os.remove(lock_path)
+            except FileNotFoundError:
+                pass
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+            lock_file.close()
+        return release
+
+
+_default_cache: Optional[BaseCache] = None
+_default_cache_lock = threading.Lock()
+
+
+def create_cache(backend: str) -> BaseCache:
+    """
+    Creates a cache backend by name: local, disk, redis or none. Options are taken from settings.
+    """
+    if backend == LocalLRUCache.NAME:
+        return LocalLRUCache(max_size=settings.CACHE_MAX_SIZE, default_ttl=settings.CACHE_DEFAULT_TTL)
+    if backend == DiskCache.NAME:
+        return DiskCache(path=settings.CACHE_DISK_PATH, default_ttl=settings.CACHE_DEFAULT_TTL)
+    if backend == 'redis':
+        from cache.resp import RedisCache
+        return RedisCache.from_url(settings.CACHE_REDIS_URL, default_ttl=settings.CACHE_DEFAULT_TTL)
+    if backend == NullCache.NAME:
+        return NullCache()
+    raise ValueError(f'Unknown cache backend: {backend}')
+
+
+def get_cache() -> BaseCache:
+    """
+    Returns the app cache, created on first use from settings.CACHE_BACKEND
+    """
+    global _default_cache
+    if _default_cache is None:
+        with _default_cache_lock:
+            if _default_cache is None:
+                _default_cache = create_cache(settings.CACHE_BACKEND)
+    return _default_cache
+
+
+def set_cache(cache: Optional[BaseCache]) -> None:
+    """
+    Replaces the app cache. Passing None recreates it from settings on next use.
+    """
+    global _default_cache
+    _default_cache = cache
@@ -0,0 +1,44 @@
+import functools
+
+from typing import Callable, Optional
+
+from cache.backends import BaseCache, get_cache
+
+
+def default_key(func: Callable, args: tuple, kwargs: dict) -> str:
+    """
+    Builds a cache key from the function name and the repr of its arguments
+    """
+    arguments: str = ','.join([repr(arg) for arg in args] + [f'{name}={value!r}' for name, value in sorted(kwargs.items())])
+    return f'{func.__module__}.{func.__qualname__}({arguments})'
+
+
+def cached(ttl: Optional[float] = None, key: Optional[Callable[..., str]] = None, cache: Optional[BaseCache] = None):
+    """
+    Caches the result of a service function.
+
+    - **ttl**: seconds to keep the result, None uses the backend default
+    - **key**: callable receiving the same arguments as the function and returning the cache key.
+        Use it when some arguments, like a DB session, must not be part of the key
+    - **cache**: backend to use, by default the app cache from get_cache()
+
+    The wrapped function is available as the `uncached` attribute of the result.
+
+    Example usage:
+
+    ```
+    @cached(ttl=60)
+    def get_all_markets() -> List[str]:
+        ...
+    ```
+    """
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            backend: BaseCache = cache if cache is not None else get_cache()
+            cache_key: str = key(*args, **kwargs) if key is not None else default_key(func, args, kwargs)
+            return backend.get_or_set(cache_key, lambda: func(*args, **kwargs), ttl)
+
+        wrapper.uncached = func
+        return wrapper
+    return decorator
@@ -0,0 +1,265 @@
+import os
+import time
+import pickle
+import socket
+import threading
+import socketserver
+
+from typing import Any, List, Optional
+from urllib.parse import urlparse
+
+from cache.backends import BaseCache, MISSING
+
+# Deletes a lock only if it still holds the token of its owner, so an expired lock taken by another process
+# isn't released by mistake
+RELEASE_LOCK_SCRIPT = (
+    "if redis.call('GET', KEYS[1]) == ARGV[1] then return redis.call('DEL', KEYS[1]) else return 0 end"
+)
+
+
+class RESPError(Exception):
+    """
+        The server answered a command with an error reply
+    """
+    pass
+
+
+def encode_command(*args) -> bytes:
+    """
+    Encodes a command as a RESP array of bulk strings
+    """
+    parts: List[bytes] = [b'*%d\r\n' % len(args)]
+    for arg in args:
+        if not isinstance(arg, bytes):
+            arg = str(arg).encode()
+        parts.append(b'$%d\r\n%s\r\n' % (len(arg), arg))
+    return b''.join(parts)
+
+
+def read_reply(stream) -> Any:
+    """
+    Reads one RESP reply from a buffered binary stream
+    """
+    line: bytes = stream.readline()
+    if not line:
+        raise ConnectionError('Connection closed by the server')
+    kind, payload = line[:1], line[1:-2]
+    if kind == b'+':
+        return payload.decode()
+    if kind == b'-':
+        raise RESPError(payload.decode())
+    if kind == b':':
+        return int(payload)
+    if kind == b'$':
+        length: int = int(payload)
+        if length == -1:
+            return None
+        data: bytes = stream.read(length + 2)
+        return data[:-2]
+    if kind == b'*':
+        length = int(payload)
+        if length == -1:
+            return None
+        return [read_reply(stream) for _ in range(length)]
+    raise RESPError(f'Unknown reply type: {line!r}')
+
+
+class RESPClient:
+    """
+        Minimal client for servers speaking the Redis protocol (RESP2).
+        Each thread uses its own connection, so an instance can be shared between threads.
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 6379, db: int = 0, timeout: float = 1):
+        self.host = host
+        self.port = port
+        self.db = db
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            connection = (sock, sock.makefile('rb'))
+            self._local.connection = connection
+            if self.db:
+                self.execute('SELECT', self.db)
+        return connection
+
+    def close(self) -> None:
+        connection = getattr(self._local, 'connection', None)
+        if connection is not None:
+            connection[1].close()
+            connection[0].close()
+            self._local.connection = None
+
+    def execute(self, *args) -> Any:
+        sock, stream = self._connection()
+        try:
+            sock.sendall(encode_command(*args))
+            return read_reply(stream)
+        except (OSError, ConnectionError):
+            self.close()
+            raise
+
+
+class RedisCache(BaseCache):
+    """
+        Cache backend for a Redis compatible server, shared between processes and hosts.
+
+        Values are pickled, so the server must only be reachable by trusted clients. While a key is being
+        filled, a `<key>:fill` lock is held on the server with SET NX PX, so a stampede is also prevented
+        between processes. The lock holds a random token and is only deleted by its owner.
+    """
+
+    NAME = 'redis'
+
+    def __init__(self, client: RESPClient, default_ttl: Optional[float] = None, prefix: str = 'buda:'):
+        super().__init__(default_ttl)
+        self.client = client
+        self.prefix = prefix
+
+    @classmethod
+    def from_url(cls, url: str, default_ttl: Optional[float] = None) -> 'RedisCache':
+        """
+            Creates the cache from an url with the format redis://host:port/db
+        """
+        parsed = urlparse(url)
+        db: int = int(parsed.path.lstrip('/') or 0)
+        return cls(RESPClient(parsed.hostname or '127.0.0.1', parsed.port or 6379, db), default_ttl)
+
+    def _get(self, key: str) -> Any:
+        data: Optional[bytes] = self.client.execute('GET', self.prefix + key)
+        return MISSING if data is None else pickle.loads(data)
+
+    def _set(self, key: str, value: Any, ttl: Optional[float]) -> None:
+        ttl = self.default_ttl if ttl is None else ttl
+        data: bytes = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        if ttl is None:
+            self.client.execute('SET', self.prefix + key, data)
+        else:
+            self.client.execute('SET', self.prefix + key, data, 'PX', max(1, int(ttl * 1000)))
+
+    def _delete(self, key: str) -> None:
+        self.client.execute('DEL', self.prefix + key)
+
+    def _clear(self) -> None:
+        self.client.execute('FLUSHDB')
+
+    def _acquire_shared_fill_lock(self, key: str, ttl: float):
+        lock_key: str = f'{self.prefix}{key}:fill'
+        token: str = os.urandom(16).hex()
+        deadline: float = time.monotonic() + ttl
+        while self.client.execute('SET', lock_key, token, 'NX', 'PX', max(1, int(ttl * 1000))) is None:
+            # Fill without the lock if its holder takes too long, or skip it if the value is already there
+            if time.monotonic() > deadline or self.client.execute('GET', self.prefix + key) is not None:
+                return lambda: None
+            time.sleep(0.005)
+        return lambda: self.client.execute('EVAL', RELEASE_LOCK_SCRIPT, 1, lock_key, token)
+
+
+class _RESPHandler(socketserver.StreamRequestHandler):
+
+    def _write(self, reply: Any) -> None:
+        if reply is None:
+            self.wfile.write(b'$-1\r\n')
+        elif isinstance(reply, int):
+            self.wfile.write(b':%d\r\n' % reply)
+        elif isinstance(reply, bytes):
+            self.wfile.write(b'$%d\r\n%s\r\n' % (len(reply), reply))
+        elif isinstance(reply, RESPError):
+            self.wfile.write(b'-%s\r\n' % str(reply).encode())
+        else:
+            self.wfile.write(b'+%s\r\n' % str(reply).encode())
+
+    def handle(self) -> None:
+        while True:
+            try:
+                command = read_reply(self.rfile)
+            except (ConnectionError, OSError):
+                return
+            self._write(self.server.store.execute(command))
+
+
+class LocalRESPStore:
+    """
+        In-memory store implementing the subset of Redis commands used by RedisCache:
+        PING, SELECT, GET, SET (with PX and NX), DEL, FLUSHDB, and EVAL of RELEASE_LOCK_SCRIPT only.
+    """
+
+    def __init__(self):
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def _get(self, key: bytes) -> Optional[bytes]:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self._data[key]
+            return None
+        return value
+
+    def execute(self, command: List[bytes]) -> Any:
+        name: str = command[0].decode().upper()
+        args: List[bytes] = command[1:]
+        with self._lock:
+            if name == 'PING':
+                return 'PONG'
+            if name == 'SELECT':
+                return 'OK'
+            if name == 'GET':
+                return self._get(args[0])
+            if name == 'SET':
+                options: List[str] = [arg.decode().upper() for arg in args[2:]]
+                if 'NX' in options and self._get(args[0]) is not None:
+                    return None
+                expires_at = None
+                if 'PX' in options:
+                    expires_at = time.monotonic() + int(options[options.index('PX') + 1]) / 1000
+                self._data[args[0]] = (args[1], expires_at)
+                return 'OK'
+            if name == 'DEL':
+                return sum(1 for key in args if self._data.pop(key, None) is not None)
+            if name == 'EVAL' and args[0].decode() == RELEASE_LOCK_SCRIPT:
+                if self._get(args[2]) != args[3]:
+                    return 0
+                del self._data[args[2]]
+                return 1
+            if name == 'FLUSHDB':
+                self._data.clear()
+                return 'OK'
+        return RESPError(f'ERR unknown command {name}')
+
+
+class LocalRESPServer(socketserver.ThreadingTCPServer):
+    """
+        Local stand-in for a Redis server, for tests and development.
+
+        Usage:
+
+        ```
+        server = LocalRESPServer()
+        server.start()
+        cache = RedisCache(RESPClient(*server.server_address))
+        ```
+    """
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0):
+        super().__init__((host, port), _RESPHandler)
+        self.store = LocalRESPStore()
+
+    def start(self) -> threading.Thread:
+        thread = threading.Thread(target=self.serve_forever, name='local-resp-server', daemon=True)
+        thread.start()
+        return thread
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
@@ -1,4 +1,4 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, inspect, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
@@ -10,4 +10,34 @@ engine = create_engine(
 )
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
-Base = declarative_base()
\ No newline at end of file
+Base = declarative_base()
+
+
+def add_missing_columns(bind=engine):
+    """
+    Adds the columns and indexes declared in the models that are missing in existing tables.
+    create_all only creates new tables, so this keeps databases created by older versions usable.
+    """
+    inspector = inspect(bind)
+    with bind.begin() as connection:
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing_columns = {column['name'] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing_columns:
+                    column_type = column.type.compile(dialect=bind.dialect)
+                    connection.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'))
+            for index in table.indexes:
+                index.create(bind=connection, checkfirst=True)
+
+
+def init_db(bind=engine):
+    """
+    Creates the missing tables, columns and indexes of the models.
+    Run it once per deployment with `python manage.py initdb`, or let the app run it on startup (see settings.INIT_DB_ON_STARTUP)
+    """
+    import api.models  # Registers the models in Base.metadata
+
+    Base.metadata.create_all(bind=bind)
+    add_missing_columns(bind=bind)
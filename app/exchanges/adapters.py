@@ -0,0 +1,132 @@
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import settings
+from buda import buda, schemas
+from exchanges.base import (
+    ExchangeAdapter, ExchangeError, get_deadline, normalize_currency, normalize_market_id, register_exchange, time_left
+)
+
+
+@register_exchange
+class BudaExchange(ExchangeAdapter):
+    """
+        Buda adapter on top of the buda.Buda SDK. Buda has no endpoint with the bid and ask of every market, so
+        get_tickers fetches up to concurrency tickers at the same time, leaving out the markets that fail.
+    """
+
+    NAME: str = 'buda'
+
+    def __init__(self, client: Optional[buda.Buda] = None, concurrency: int = settings.EXCHANGES_CONCURRENCY):
+        self.client = client if client is not None else buda.get_client()
+        self.concurrency = concurrency
+
+    def get_markets(self, timeout: Optional[float] = None) -> List[str]:
+        return [
+            normalize_market_id(market.base_currency, market.quote_currency)
+            for market in self.client.get_markets(timeout=timeout).markets
+        ]
+
+    def get_ticker(self, market_id: str, timeout: Optional[float] = None) -> schemas.Ticker:
+        currency, market = market_id.split('-')
+        ticker: schemas.Ticker = self.client.get_ticker(currency=currency, market=market, timeout=timeout)
+        return ticker._replace(market_id=market_id)
+
+    def get_tickers(
+        self,
+        market_ids: Optional[Iterable[str]] = None,
+        timeout: Optional[float] = None
+    ) -> Dict[str, schemas.Ticker]:
+        deadline: Optional[float] = get_deadline(timeout)
+        markets: List[str] = self.get_markets(timeout=time_left(deadline))
+        if market_ids is not None:
+            wanted: set = set(market_ids)
+            markets = [market_id for market_id in markets if market_id in wanted]
+        if not markets:
+            return {}
+        with ThreadPoolExecutor(max_workers=min(self.concurrency, len(markets))) as executor:
+            tickers: List[Optional[schemas.Ticker]] = list(executor.map(
+                lambda market_id: self.get_ticker_or_none(market_id, deadline), markets
+            ))
+        return {market_id: ticker for market_id, ticker in zip(markets, tickers) if ticker is not None}
+
+
+@register_exchange
+class StubExchange(ExchangeAdapter):
+    """
+        Local exchange for tests and development, with fixed prices and no network.
+
+        prices maps the native symbols of the markets, with the format {base}{separator}{quote} in any case,
+        i.e. XBT/CLP, to (bid, ask). Every call waits delay seconds, and raises ExchangeError(error) if error
+        is set, to simulate slow or failing exchanges.
+
+        Usage:
+
+        ```
+        exchange = StubExchange(name='kraken', prices={'XBT/USD': (20000, 20010)})
+        exchange.get_ticker('btc-usd')
+        ```
+    """
+
+    NAME: str = 'stub'
+
+    def __init__(
+        self,
+        name: str = NAME,
+        prices: Optional[Dict[str, Tuple[float, float]]] = None,
+        separator: str = '/',
+        delay: float = 0,
+        error: Optional[str] = None
+    ):
+        self.NAME = name
+        self.delay = delay
+        self.error = error
+        self.prices: Dict[str, Tuple[float, float]] = {}
+        self.currencies: Dict[str, Tuple[str, str]] = {}
+        for symbol, price in (prices or {}).items():
+            base_currency, quote_currency = symbol.split(separator)
+            market_id: str = normalize_market_id(base_currency, quote_currency)
+            self.prices[market_id] = price
+            self.currencies[market_id] = (normalize_currency(base_currency), normalize_currency(quote_currency))
+
+    def _call(self) -> None:
+        if self.delay:
+            time.sleep(self.delay)
+        if self.error is not None:
+            raise ExchangeError(self.error)
+
+    def get_markets(self, timeout: Optional[float] = None) -> List[str]:
+        self._call()
+        return list(self.prices)
+
+    def get_ticker(self, market_id: str, timeout: Optional[float] = None) -> schemas.Ticker:
+        self._call()
+        return self._ticker(market_id)
+
+    def _ticker(self, market_id: str) -> schemas.Ticker:
+        if market_id not in self.prices:
+            raise ExchangeError(f'{self.NAME} has no market {market_id}')
+        bid, ask = self.prices[market_id]
+        base_currency, quote_currency = self.currencies[market_id]
+        return schemas.Ticker(
+            last_price=[bid, quote_currency],
+            market_id=market_id,
+            max_bid=[bid, quote_currency],
+            min_ask=[ask, quote_currency],
+            price_variation_24h=None,
+            price_variation_7d=None,
+            volume=[0.0, base_currency]
+        )
+
+    def get_tickers(
+        self,
+        market_ids: Optional[Iterable[str]] = None,
+        timeout: Optional[float] = None
+    ) -> Dict[str, schemas.Ticker]:
+        self._call()
+        wanted: Iterable[str] = self.prices if market_ids is None else [
+            market_id for market_id in market_ids if market_id in self.prices
+        ]
+        return {market_id: self._ticker(market_id) for market_id in wanted}
@@ -0,0 +1,128 @@
+import time
+import threading
+
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+import settings
+from buda import schemas
+from exchanges.base import ExchangeAdapter, create_exchange
+
+# Registers the adapters shipped with the app, so they can be created by name
+import exchanges.adapters  # noqa: F401
+
+
+class ExchangeResult(NamedTuple):
+    """
+        Attribute  | Type                 | Description
+
+        exchange   | [string]             | Name of the exchange
+        tickers    | {market_id: Ticker}  | Tickers by normalized market id. Empty if the exchange failed
+        error      | [string]             | Why the exchange failed, or None
+        elapsed    | [float]              | Seconds taken by the exchange, or the deadline if it didn't answer
+    """
+    exchange: str
+    tickers: Dict[str, schemas.Ticker]
+    error: Optional[str]
+    elapsed: float
+
+
+def fetch_all_tickers(
+    exchanges: List[ExchangeAdapter],
+    market_ids: Optional[Iterable[str]] = None,
+    deadline: float = settings.EXCHANGES_DEADLINE
+) -> List[ExchangeResult]:
+    """
+    Gets the tickers of market_ids, or of every market, from every exchange in parallel.
+
+    All the exchanges share a single deadline in seconds: the exchanges that haven't answered by then are
+    reported with a timeout error and their results are discarded, so a slow exchange never delays the others.
+    Every exchange gets the time left to the deadline as its timeout, so the threads of the exchanges that didn't
+    answer stop making requests once it has passed. Results are in the same order as exchanges.
+    """
+    if market_ids is not None:
+        market_ids = list(market_ids)
+    started_at: float = time.monotonic()
+
+    def fetch(exchange: ExchangeAdapter) -> ExchangeResult:
+        tickers: Dict[str, schemas.Ticker] = exchange.get_tickers(
+            market_ids, timeout=started_at + deadline - time.monotonic()
+        )
+        return ExchangeResult(exchange.NAME, tickers, None, time.monotonic() - started_at)
+
+    if not exchanges:
+        return []
+    executor = ThreadPoolExecutor(max_workers=len(exchanges), thread_name_prefix='exchange')
+    try:
+        futures: List[Future] = [executor.submit(fetch, exchange) for exchange in exchanges]
+        wait(futures, timeout=deadline)
+    finally:
+        # Don't wait for the exchanges past the deadline, their threads finish on their own
+        executor.shutdown(wait=False)
+
+    results: List[ExchangeResult] = []
+    for exchange, future in zip(exchanges, futures):
+        if not future.done():
+            future.cancel()
+            results.append(ExchangeResult(exchange.NAME, {}, f'No answer after {deadline}s', deadline))
+        elif future.exception() is not None:
+            results.append(ExchangeResult(
+                exchange.NAME, {}, f'{type(future.exception()).__name__}: {future.exception()}',
+                time.monotonic() - started_at
+            ))
+        else:
+            results.append(future.result())
+    return results
+
+
+def compare_spreads(results: List[ExchangeResult]) -> List[dict]:
+    """
+    Groups the tickers of every exchange by market. For each market returns the bid, ask and spread at every
+    exchange, the best bid and best ask across exchanges, and the spread between them, which is negative when
+    buying at one exchange and selling at another is profitable before fees.
+    """
+    markets: Dict[str, List[dict]] = {}
+    for result in results:
+        for market_id, ticker in result.tickers.items():
+            bid, ask = float(ticker.max_bid[0]), float(ticker.min_ask[0])
+            markets.setdefault(market_id, []).append(
+                {'exchange': result.exchange, 'bid': bid, 'ask': ask, 'spread': ask - bid}
+            )
+
+    comparison: List[dict] = []
+    for market_id in sorted(markets):
+        venues: List[dict] = markets[market_id]
+        best_bid: dict = max(venues, key=lambda venue: venue['bid'])
+        best_ask: dict = min(venues, key=lambda venue: venue['ask'])
+        comparison.append({
+            'market': market_id,
+            'exchanges': venues,
+            'best_bid': {'exchange': best_bid['exchange'], 'price': best_bid['bid']},
+            'best_ask': {'exchange': best_ask['exchange'], 'price': best_ask['ask']},
+            'spread': best_ask['ask'] - best_bid['bid']
+        })
+    return comparison
+
+
+_default_exchanges: Optional[List[ExchangeAdapter]] = None
+_default_exchanges_lock = threading.Lock()
+
+
+def get_exchanges() -> List[ExchangeAdapter]:
+    """
+    Returns the adapters of the exchanges in settings.EXCHANGES, created on first use
+    """
+    global _default_exchanges
+    if _default_exchanges is None:
+        with _default_exchanges_lock:
+            if _default_exchanges is None:
+                _default_exchanges = [create_exchange(name) for name in settings.EXCHANGES]
+    return _default_exchanges
+
+
+def set_exchanges(exchanges: Optional[List[ExchangeAdapter]]) -> None:
+    """
+    Replaces the app exchanges. Passing None recreates them from settings on next use.
+    """
+    global _default_exchanges
+    _default_exchanges = exchanges
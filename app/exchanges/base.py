@@ -0,0 +1,144 @@
+import time
+import logging
+import threading
+
+from typing import Dict, Iterable, List, Optional, Type
+
+from buda import schemas
+
+app_logger = logging.getLogger('app')
+
+# Codes used by some exchanges for the same currency
+CURRENCY_ALIASES: Dict[str, str] = {
+    'xbt': 'btc',
+}
+
+
+class ExchangeError(Exception):
+    """
+        An exchange adapter couldn't fetch the requested data.
+        The exception string contains the error details.
+    """
+    pass
+
+
+def normalize_currency(currency: str) -> str:
+    currency = currency.strip().lower()
+    return CURRENCY_ALIASES.get(currency, currency)
+
+
+def normalize_market_id(base_currency: str, quote_currency: str) -> str:
+    """
+    Returns the market id used across exchanges: {base_currency}-{quote_currency} in lowercase, i.e. btc-clp
+    """
+    return f'{normalize_currency(base_currency)}-{normalize_currency(quote_currency)}'
+
+
+def get_deadline(timeout: Optional[float]) -> Optional[float]:
+    """
+    Returns the time.monotonic() value at which timeout seconds from now expire, or None without timeout
+    """
+    return time.monotonic() + timeout if timeout is not None else None
+
+
+def time_left(deadline: Optional[float]) -> Optional[float]:
+    """
+    Returns the seconds left until deadline, to be used as the timeout of the next request, or None without deadline.
+    Raises ExchangeError once the deadline has passed, so no more requests are made.
+    """
+    if deadline is None:
+        return None
+    left: float = deadline - time.monotonic()
+    if left <= 0:
+        raise ExchangeError('Deadline exceeded')
+    return left
+
+
+class ExchangeAdapter:
+    """
+        Common interface of the exchanges, so their data can be compared.
+
+        Markets are identified by their normalized id (see normalize_market_id) and tickers are returned as
+        buda.schemas.Ticker with that id as market_id. Inherit from this class and implement get_markets and
+        get_ticker. Override get_tickers when the exchange can return many tickers in a single request.
+
+        timeout is the time in seconds for the whole call. When a call makes several requests, every request gets the
+        time left (see get_deadline and time_left), so the call doesn't last longer than timeout.
+
+        Register the adapter with @register_exchange to create it by NAME with create_exchange.
+    """
+
+    NAME: str = ''
+
+    def get_markets(self, timeout: Optional[float] = None) -> List[str]:
+        """
+            Returns the normalized ids of the markets of the exchange
+        """
+        raise NotImplementedError
+
+    def get_ticker(self, market_id: str, timeout: Optional[float] = None) -> schemas.Ticker:
+        """
+            Returns the ticker of a market by its normalized id
+        """
+        raise NotImplementedError
+
+    def get_tickers(
+        self,
+        market_ids: Optional[Iterable[str]] = None,
+        timeout: Optional[float] = None
+    ) -> Dict[str, schemas.Ticker]:
+        """
+            Returns the tickers of market_ids, or of every market if None, by normalized id.
+            Markets that the exchange doesn't list, or whose ticker can't be fetched, are left out.
+        """
+        deadline: Optional[float] = get_deadline(timeout)
+        markets: List[str] = self.get_markets(timeout=time_left(deadline))
+        if market_ids is not None:
+            wanted: set = set(market_ids)
+            markets = [market_id for market_id in markets if market_id in wanted]
+        tickers: Dict[str, Optional[schemas.Ticker]] = {
+            market_id: self.get_ticker_or_none(market_id, deadline) for market_id in markets
+        }
+        return {market_id: ticker for market_id, ticker in tickers.items() if ticker is not None}
+
+    def get_ticker_or_none(self, market_id: str, deadline: Optional[float]) -> Optional[schemas.Ticker]:
+        """
+            Returns the ticker of a market with the time left to deadline as timeout, or None if it can't be fetched,
+            so a single market doesn't fail the tickers of the rest
+        """
+        try:
+            return self.get_ticker(market_id, timeout=time_left(deadline))
+        except Exception as e:
+            app_logger.warning(f'Could not get the ticker of {market_id} from {self.NAME}: {e}')
+            return None
+
+
+_exchanges: Dict[str, Type[ExchangeAdapter]] = {}
+_exchanges_lock = threading.Lock()
+
+
+def register_exchange(adapter_class: Type[ExchangeAdapter]) -> Type[ExchangeAdapter]:
+    """
+    Class decorator that registers an exchange adapter by its NAME
+    """
+    if not adapter_class.NAME:
+        raise ValueError(f'Please set a NAME for {adapter_class.__name__}.')
+    with _exchanges_lock:
+        _exchanges[adapter_class.NAME] = adapter_class
+    return adapter_class
+
+
+def get_exchange_names() -> List[str]:
+    with _exchanges_lock:
+        return sorted(_exchanges)
+
+
+def create_exchange(name: str, **options) -> ExchangeAdapter:
+    """
+    Creates a registered exchange adapter by name. options are passed to the adapter class.
+    """
+    with _exchanges_lock:
+        adapter_class: Optional[Type[ExchangeAdapter]] = _exchanges.get(name)
+    if adapter_class is None:
+        raise ValueError(f'Unknown exchange: {name}')
+    return adapter_class(**options)
@@ -1,21 +1,79 @@
-from fastapi import FastAPI, Depends, HTTPException
+from typing import List, Optional
+from fastapi import FastAPI, Depends, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import Response, StreamingResponse
 from sqlalchemy.orm import Session
 
+import settings
 import api.services as services
+from api import bulk
+from api.constants import AlertType
 from api.schemas import Alert
-from api.models import Base
-from database import engine
-from utils import get_db
+from api.circuit_breaker import get_circuit_breakers_stats
+from cache.backends import get_cache
+from database import init_db
+from utils import get_db, ndjson_lines, require_admin, sse_events
 
 
-Base.metadata.create_all(bind=engine)
 app = FastAPI()
+notification_dispatcher = None
+alert_scheduler = None
+
+
+@app.on_event('startup')
+def startup():
+    """
+    Creates the database schema (unless it is done by the deployment with `python manage.py initdb`)
+    and starts the notification dispatcher workers and the alert scheduler
+    """
+    global notification_dispatcher, alert_scheduler
+
+    if settings.INIT_DB_ON_STARTUP:
+        init_db()
+
+    if settings.NOTIFICATIONS_WORKERS > 0:
+        # Imported here to keep the notification workers out of the import time of the app
+        from notifications.dispatcher import NotificationDispatcher
+        from notifications.queue import get_queue
+
+        notification_dispatcher = NotificationDispatcher(get_queue())
+        notification_dispatcher.start()
+
+    if settings.ALERT_SCHEDULER_ENABLED:
+        from api.scheduler import AlertScheduler
+
+        alert_scheduler = AlertScheduler()
+        alert_scheduler.start()
+
+
+@app.on_event('shutdown')
+def shutdown():
+    if notification_dispatcher is not None:
+        notification_dispatcher.stop(timeout=settings.NOTIFICATIONS_TIMEOUT)
+    if alert_scheduler is not None:
+        alert_scheduler.stop(timeout=settings.ALERT_SCHEDULER_MAX_DELAY)
+
+
+@app.get(
+    '/health/',
+    summary='Check that the app is running'
+)
+def health():
+    """
+    Lightweight endpoint for readiness checks, it doesn't call Buda nor the database
+    """
+    return {'status': 'ok'}
+
 
 @app.get(
     '/spread/{currency}/{market}/',
     summary='Get spread for a specified market at Buda'
 )
 def get_spread_data(currency: str, market: str):
+    """
+    Get the spread of a market. If Buda is unavailable, the last known spread is returned with `"stale": true`
+    and its `age` in seconds
+    """
     try:
         ticker_data: dict = services.get_market_spread(currency=currency, market=market)
     except services.InvalidRequest:
@@ -23,19 +81,41 @@ def get_spread_data(currency: str, market: str):
             status_code=400,
             detail='Market does not exist'
         )
+    except Exception as e:
+        if not services.sdk.is_upstream_failure(e):
+            raise
+        raise HTTPException(
+            status_code=503,
+            detail='Buda is unavailable'
+        )
     
-    return {
+    spread_data: dict = {
         'spread': ticker_data.get("spread"),
+        'spread_exact': ticker_data.get("spread_exact"),
         'market': ticker_data.get("market")
     }
+    if ticker_data.get('stale'):
+        spread_data['stale'] = True
+        spread_data['age'] = ticker_data.get('age')
+    return spread_data
 
 
 @app.get(
     '/spreads/',
     summary='Get spreads for all available markets at Buda'
 )
-def get_all_spreads():
+def get_all_spreads(since: Optional[int] = Query(None, ge=0)):
+    """
+    Get the spread of every market
+
+    - **since**: sequence number of the last response received. The response is then
+        `{"sequence": ..., "full": false, "removed": [...], "spreads": [...]}` with only the markets that changed or
+        were removed after it. If it is too old (more than `BUDA_SPREADS_MAX_DELTAS` updates behind) or unknown,
+        every market is returned with `"full": true`. Use `since=0` for the first request
+    """
     try:
+        if since is not None:
+            return Response(content=services.get_spreads_changes(since), media_type='application/json')
         return services.get_all_markets_spread()
     except Exception as e:
         raise HTTPException(
@@ -44,6 +124,84 @@ def get_all_spreads():
         )
 
 
+@app.get(
+    '/spreads/stream/',
+    summary='Stream the spreads of all available markets at Buda as they are fetched'
+)
+def stream_all_spreads(format: str = Query('ndjson', regex='^(ndjson|sse)$')):
+    """
+    Stream the spread of every market as soon as it is fetched, in completion order, so the first market arrives
+    without waiting for the slowest one
+
+    - **format**: **ndjson** for a json object per line, **sse** for server-sent events
+    - Every record has the same fields as in `/spreads/`. If the spread of a market can't be fetched, the record is
+        `{"market": ..., "error": ...}` and the rest of the markets are still sent
+    - If the markets of Buda can't be fetched, the response is a 503 before anything is streamed
+    """
+    try:
+        spreads = services.iter_all_markets_spread()
+    except Exception as e:
+        if not services.sdk.is_upstream_failure(e):
+            raise
+        raise HTTPException(
+            status_code=503,
+            detail='Buda is unavailable'
+        )
+
+    if format == 'sse':
+        return StreamingResponse(sse_events(spreads), media_type='text/event-stream')
+    return StreamingResponse(ndjson_lines(spreads), media_type='application/x-ndjson')
+
+
+@app.get(
+    '/analytics/',
+    summary='Get spread statistics and triangular arbitrage cycles across all markets at Buda'
+)
+def get_analytics(min_return_bps: float = 0):
+    """
+    Get analytics computed across all markets
+
+    - **markets**: bid, ask, mid price, spread in basis points relative to the mid price, and the z-score of the
+        spread against the recent spreads of the market
+    - **arbitrage**: cycles of three currencies, i.e. `["clp", "btc", "eth", "clp"]`, with a return above
+        **min_return_bps** when trading at the current bid and ask prices, before fees
+    - **updated**: number of markets and cycles recomputed in the last refresh
+    - **stale**, **age**: only when Buda was unavailable and the last known markets were used in the last refresh,
+        `true` and their age in seconds
+    """
+    try:
+        return services.get_market_analytics(min_return_bps=min_return_bps)
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail='Internal error'
+        )
+
+
+@app.get(
+    '/exchanges/spreads/',
+    summary='Compare the spreads of the markets across the configured exchanges'
+)
+def compare_exchange_spreads(market: Optional[List[str]] = Query(None)):
+    """
+    Get the bid, ask and spread of every market at every exchange in `BUDA_EXCHANGES`, queried in parallel
+
+    - **market**: markets to compare with the format {currency}-{market}, i.e. `?market=btc-clp&market=eth-clp`.
+        Every market is compared if not set
+    - **exchanges**: the exchanges queried, with the number of markets they returned, the seconds they took and the
+        error if they failed or didn't answer within `BUDA_EXCHANGES_DEADLINE` seconds
+    - **markets**: for every market, the prices at each exchange, the best bid and ask across exchanges, and the
+        spread between them
+    """
+    try:
+        return services.compare_exchange_spreads(market_ids=market)
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail='Internal error'
+        )
+
+
 @app.post(
     '/alert/',
     summary='Creates an alert for checking the spread of a market'
@@ -56,6 +214,7 @@ def create_alert(alert: Alert, db: Session = Depends(get_db)):
     - **currency**: currency of market, i.e. **btc**, **eth**, **usdc**, **ltc**
     - **market**: market for the selected currency, i.e. **clp**, **pen**, **cop**
     - **spread**: positive value for the spread
+    - **webhook_url**: optional url that receives a POST when the alert status changes to fulfill
     """
     try:
         create_alert = services.create_alert(db=db, alert=alert)
@@ -83,6 +242,9 @@ def get_alert_data(alert_id: int, db: Session = Depends(get_db)):
         - Possible values: 
             - fulfill: The condition was fulfilled
             - pending: The condition is not currently being met.
+    - **last_spread**: Market spread used to evaluate the status
+    - **last_evaluated_at**: When the status was evaluated (UTC)
+    - **fulfilled_at**: Last time the status changed to fulfill (UTC)
     """
     try:
         return services.get_alert(db=db, alert_id=alert_id)
@@ -91,3 +253,195 @@ def get_alert_data(alert_id: int, db: Session = Depends(get_db)):
             status_code=404,
             detail=f'Alert with id {alert_id} not found'
         )
+
+
+@app.get(
+    '/alerts/',
+    summary='List alerts'
+)
+def list_alerts(
+    market: Optional[str] = None,
+    type: Optional[AlertType] = None,
+    min_spread: Optional[float] = None,
+    max_spread: Optional[float] = None,
+    after_id: int = 0,
+    limit: Optional[int] = Query(None, gt=0),
+    include_status: bool = False,
+    format: str = Query('json', regex='^(json|ndjson)$'),
+    db: Session = Depends(get_db)
+):
+    """
+    List the alerts matching the filters, ordered by id
+
+    - **market**: market with the format {currency}-{market}, i.e. **btc-clp**
+    - **type**: **under** or **above**
+    - **min_spread**, **max_spread**: range of the alert target spread
+    - **after_id**: return the alerts after this id. Use the `next_after_id` of the previous page
+    - **limit**: maximum number of alerts. For json, the default is 100 and the maximum 1000
+    - **include_status**: add the status of every alert, evaluated with a single spread request per market
+    - **format**: **json** returns a page `{"alerts": [...], "next_after_id": ...}`, with `next_after_id` null on the
+        last page. **ndjson** streams every matching alert as a json line
+    """
+    filters: dict = {'market': market, 'alert_type': type, 'min_spread': min_spread, 'max_spread': max_spread}
+    try:
+        services.filter_alerts(db, **filters)
+    except services.InvalidRequest as e:
+        raise HTTPException(
+            status_code=400,
+            detail=str(e)
+        )
+
+    if format == 'ndjson':
+        return StreamingResponse(
+            ndjson_lines(services.iter_alerts(db, after_id, limit, include_status, **filters)),
+            media_type='application/x-ndjson'
+        )
+
+    page_size: int = min(limit or settings.ALERTS_PAGE_SIZE, settings.ALERTS_MAX_PAGE_SIZE)
+    alerts: list = services.list_alerts(db, after_id, page_size, include_status, **filters)
+    return {
+        'alerts': alerts,
+        'next_after_id': alerts[-1]['id'] if len(alerts) == page_size else None
+    }
+
+
+@app.get(
+    '/alerts/export/',
+    summary='Export every alert as a file',
+    dependencies=[Depends(require_admin)]
+)
+def export_alerts(
+    format: str = Query(bulk.CSV_FORMAT, regex=f'^({"|".join(bulk.FORMATS)})$'),
+    db: Session = Depends(get_db)
+):
+    """
+    Stream every alert, ordered by id, with the columns `id, type, currency, market, spread, webhook_url`.
+    Admin endpoint, see `require_admin`
+
+    - **format**: **csv** with a header row, or **columnar**, a compact binary format described in `api/bulk.py`
+    """
+    if format == bulk.CSV_FORMAT:
+        return StreamingResponse(
+            bulk.export_alerts_csv(db),
+            media_type='text/csv',
+            headers={'Content-Disposition': 'attachment; filename="alerts.csv"'}
+        )
+    return StreamingResponse(
+        bulk.export_alerts_columnar(db),
+        media_type='application/octet-stream',
+        headers={'Content-Disposition': 'attachment; filename="alerts.bin"'}
+    )
+
+
+@app.post(
+    '/alerts/import/',
+    summary='Import alerts from a file',
+    dependencies=[Depends(require_admin)]
+)
+async def import_alerts(
+    request: Request,
+    format: str = Query(bulk.CSV_FORMAT, regex=f'^({"|".join(bulk.FORMATS)})$'),
+    db: Session = Depends(get_db)
+):
+    """
+    Create the alerts of a file sent as the request body, in the format of `/alerts/export/`. The id column is
+    ignored and every alert gets a new id. Admin endpoint, see `require_admin`
+
+    The file is read as it arrives, and the alerts are inserted in transactions of `BUDA_ALERTS_IMPORT_BATCH_SIZE`.
+    Invalid rows are skipped and reported in **errors** with their **row** number, 1 being the first alert.
+
+    If the file can't be read to the end (i.e. it is truncated), the alerts read before are kept and the `400`
+    **detail** has the **error** and the report of those rows: a retry should skip the first **rows** alerts.
+
+        curl -X POST 'http://127.0.0.1:8000/alerts/import/?format=csv' -H 'Authorization: Bearer <token>' --data-binary @alerts.csv
+    """
+    try:
+        reader = bulk.create_reader(format)
+        importer: bulk.AlertImporter = await run_in_threadpool(services.create_alert_importer, db)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=400,
+            detail=str(e)
+        )
+    try:
+        async for chunk in request.stream():
+            await run_in_threadpool(lambda: importer.add(reader.feed(chunk)))
+        await run_in_threadpool(lambda: importer.add(reader.close()))
+    except ValueError as e:
+        error: bulk.AlertImportError = await run_in_threadpool(importer.abort, e)
+        raise HTTPException(
+            status_code=400,
+            detail={'error': str(error), **error.report}
+        )
+    return await run_in_threadpool(importer.finish)
+
+
+@app.get(
+    '/cache/stats/',
+    summary='Get cache statistics'
+)
+def get_cache_stats():
+    """
+    Get the counters of the cache used by the services, useful for tuning sizes and TTLs
+
+    - **backend**: name of the cache backend
+    - **stats**: hits, misses, sets, evictions, expirations, fills (values computed on a miss),
+        fill_waits (callers that waited for another caller to fill the same key) and hit_ratio
+    """
+    cache = get_cache()
+    return {
+        'backend': cache.NAME,
+        'stats': cache.stats.as_dict()
+    }
+
+
+@app.get(
+    '/notifications/stats/',
+    summary='Get notification queue statistics'
+)
+def get_notification_stats():
+    """
+    Get the number of notifications in the queue by status
+
+    - **pending**: waiting to be delivered, including the ones waiting for a retry
+    - **delivering**: claimed by a dispatcher worker
+    - **dead**: dead-lettered after reaching the maximum number of attempts
+    """
+    from notifications.queue import get_queue
+
+    return get_queue().counts()
+
+
+@app.get(
+    '/circuits/stats/',
+    summary='Get the state of the circuit breakers of the Buda endpoints'
+)
+def get_circuit_stats():
+    """
+    State of the circuit breaker of every Buda endpoint called by this worker
+
+    - **state**: **closed** (requests are sent), **open** (requests fail fast after consecutive failures) or
+        **half_open** (a request is probing whether Buda recovered)
+    - **failures**: consecutive failed requests
+    - **rejected**: requests not sent because the circuit was open
+    - **open_for**: seconds since the circuit opened
+    """
+    return {'circuits': get_circuit_breakers_stats()}
+
+
+@app.get(
+    '/alerts/scheduler/stats/',
+    summary='Get alert scheduler statistics'
+)
+def get_alert_scheduler_stats():
+    """
+    Get the metrics of the alert scheduler of this worker
+
+    - **markets**: markets with alerts being evaluated, and **overdue** the ones whose evaluation time already passed
+    - **evaluations**, **failures**: markets evaluated, and the ones whose spread couldn't be fetched
+    - **avg_lag**, **max_lag**, **last_lag**: seconds between the scheduled and actual evaluation of the markets
+    - **last_cycle_evaluated**, **last_cycle_duration**: markets evaluated and seconds taken by the last cycle
+    """
+    if alert_scheduler is None:
+        return {'running': False}
+    return alert_scheduler.stats()
@@ -0,0 +1,84 @@
+"""
+Management commands. Usage, inside the app directory:
+
+    python manage.py initdb
+    python manage.py export-alerts --format csv --output alerts.csv
+    python manage.py import-alerts alerts.csv
+"""
+import sys
+import argparse
+
+from typing import Optional
+
+
+def initdb(args: argparse.Namespace) -> None:
+    from database import init_db
+
+    init_db()
+    print('Database schema is up to date')
+
+
+def export_alerts(args: argparse.Namespace) -> None:
+    from api import bulk
+    from database import SessionLocal
+
+    export = bulk.export_alerts_csv if args.format == bulk.CSV_FORMAT else bulk.export_alerts_columnar
+    db = SessionLocal()
+    output = sys.stdout.buffer if args.output == '-' else open(args.output, 'wb')
+    try:
+        for chunk in export(db):
+            output.write(chunk.encode() if isinstance(chunk, str) else chunk)
+    finally:
+        db.close()
+        if output is not sys.stdout.buffer:
+            output.close()
+
+
+def import_alerts(args: argparse.Namespace) -> None:
+    import api.services as services
+    from api import bulk
+    from database import SessionLocal, init_db
+
+    init_db()
+    file_format: str = args.format or (bulk.CSV_FORMAT if args.path.endswith('.csv') else bulk.COLUMNAR_FORMAT)
+    db = SessionLocal()
+    file_error: Optional[str] = None
+    try:
+        with open(args.path, 'rb') as file:
+            report: dict = services.import_alerts(db, iter(lambda: file.read(1 << 20), b''), file_format)
+    except bulk.AlertImportError as e:
+        file_error, report = str(e), e.report
+    finally:
+        db.close()
+
+    for error in report['errors']:
+        print(f'Row {error["row"]}: {error["error"]}', file=sys.stderr)
+    print(f'Imported {report["imported"]} of {report["rows"]} alerts, {report["error_count"]} invalid')
+    if file_error is not None:
+        sys.exit(f'The file could not be read after row {report["rows"]}: {file_error}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Management commands of the Buda spread API')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    commands.add_parser('initdb', help='Create the missing tables, columns and indexes').set_defaults(func=initdb)
+
+    export_parser = commands.add_parser('export-alerts', help='Export every alert as a csv or columnar file')
+    export_parser.add_argument('--format', choices=('csv', 'columnar'), default='csv')
+    export_parser.add_argument('--output', default='-', help='File path, - for the standard output')
+    export_parser.set_defaults(func=export_alerts)
+
+    import_parser = commands.add_parser('import-alerts', help='Import the alerts of a csv or columnar file')
+    import_parser.add_argument('path')
+    import_parser.add_argument(
+        '--format', choices=('csv', 'columnar'), help='Format of the file, by default csv if it ends with .csv'
+    )
+    import_parser.set_defaults(func=import_alerts)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+import socket
+import ipaddress
+
+from typing import List, Optional
+from urllib.parse import urlparse
+
+import settings
+
+
+class InvalidDestination(ValueError):
+    """
+        The webhook url is not allowed as a notification destination
+    """
+    pass
+
+
+def _check_address(address: str, url: str) -> None:
+    ip = ipaddress.ip_address(address.split('%')[0])
+    if not ip.is_global or ip.is_multicast:
+        raise InvalidDestination(f'The webhook url {url} points to a private address: {ip}')
+
+
+def check_destination(url: str, resolve: bool = False, allow_private: Optional[bool] = None) -> None:
+    """
+    Checks that a webhook url is an http(s) url of a public host, so alerts can't be used to send requests to the
+    internal network of the app (SSRF). Raises InvalidDestination otherwise.
+
+    Without resolve, only ip addresses and local host names are checked. With resolve, every address of the
+    host must also be public. Hosts that can't be resolved pass, so the delivery fails and is retried as usual.
+    Private destinations are allowed with settings.NOTIFICATIONS_ALLOW_PRIVATE_DESTINATIONS, i.e. for development.
+    """
+    parsed = urlparse(url)
+    if parsed.scheme not in ('http', 'https') or not parsed.hostname:
+        raise InvalidDestination(f'Invalid webhook url: {url}')
+    if settings.NOTIFICATIONS_ALLOW_PRIVATE_DESTINATIONS if allow_private is None else allow_private:
+        return
+
+    host: str = parsed.hostname.rstrip('.').lower()
+    if host == 'localhost' or host.endswith('.localhost') or '.' not in host and ':' not in host:
+        raise InvalidDestination(f'The webhook url {url} points to a local host')
+    try:
+        ipaddress.ip_address(host)
+    except ValueError:
+        pass
+    else:
+        _check_address(host, url)
+        return
+    if not resolve:
+        return
+
+    try:
+        addresses: List[str] = [info[4][0] for info in socket.getaddrinfo(host, parsed.port or None)]
+    except (socket.gaierror, UnicodeError):
+        return
+    for address in addresses:
+        _check_address(address, url)
@@ -0,0 +1,151 @@
+import random
+import logging
+import threading
+
+from typing import List, Optional
+
+import requests
+
+import settings
+from notifications.destinations import InvalidDestination, check_destination
+from notifications.queue import Batch, NotificationQueue, get_queue
+
+app_logger = logging.getLogger('app')
+
+
+class NotificationDispatcher:
+    """
+        Delivers the queued notifications to their webhooks with a pool of worker threads.
+
+        Every request sends a batch of notifications for the same destination as a json body
+        {"notifications": [...]}. Any 2xx response acknowledges the batch. Otherwise the batch is retried with
+        exponential backoff and jitter, and dead-lettered after max_attempts. Each worker keeps its own
+        requests session, so connections to the same destination are reused.
+
+        Destinations are resolved before every request, and batches for private addresses are dead-lettered
+        without sending them, unless allow_private. See notifications/destinations.py. Redirects aren't followed,
+        since their location isn't checked: a 3xx response is a failed delivery.
+
+        Usage:
+
+        ```
+        dispatcher = NotificationDispatcher(get_queue())
+        dispatcher.start()
+        ...
+        dispatcher.stop()
+        ```
+    """
+
+    def __init__(
+        self,
+        queue: NotificationQueue,
+        workers: int = settings.NOTIFICATIONS_WORKERS,
+        batch_size: int = settings.NOTIFICATIONS_BATCH_SIZE,
+        max_attempts: int = settings.NOTIFICATIONS_MAX_ATTEMPTS,
+        backoff: float = settings.NOTIFICATIONS_BACKOFF,
+        max_backoff: float = settings.NOTIFICATIONS_MAX_BACKOFF,
+        timeout: float = settings.NOTIFICATIONS_TIMEOUT,
+        poll_interval: float = 0.2,
+        allow_private: bool = settings.NOTIFICATIONS_ALLOW_PRIVATE_DESTINATIONS
+    ):
+        self.queue = queue
+        self.workers = workers
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self.allow_private = allow_private
+        self._stop_event = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._local = threading.local()
+
+    def _session(self) -> requests.Session:
+        session: Optional[requests.Session] = getattr(self._local, 'session', None)
+        if session is None:
+            session = self._local.session = requests.Session()
+            session.headers.update({'Content-Type': 'application/json'})
+        return session
+
+    def retry_delay(self, attempts: int) -> float:
+        """
+            Seconds to wait before the next attempt of a batch that already failed attempts times
+        """
+        delay: float = min(self.max_backoff, self.backoff * 2 ** attempts)
+        return delay / 2 + random.uniform(0, delay / 2)
+
+    def deliver(self, batch: Batch) -> bool:
+        """
+            Sends a claimed batch and acknowledges or retries it. Returns True if it was delivered.
+        """
+        try:
+            check_destination(batch.destination, resolve=True, allow_private=self.allow_private)
+        except InvalidDestination as e:
+            self.queue.retry(batch, str(e), 0, max_attempts=0)
+            app_logger.warning(f'{len(batch.ids)} notifications to {batch.destination} dead-lettered: {e}')
+            return False
+
+        try:
+            response = self._session().post(
+                batch.destination,
+                json={'notifications': batch.payloads},
+                timeout=self.timeout,
+                allow_redirects=False
+            )
+            if 200 <= response.status_code < 300:
+                self.queue.ack(batch)
+                return True
+            error: str = f'Status code: {response.status_code}'
+            if response.is_redirect:
+                error += ', redirects are not followed'
+        except requests.RequestException as e:
+            error = str(e)
+
+        if self.queue.retry(batch, error, self.retry_delay(batch.attempts), self.max_attempts):
+            app_logger.warning(f'{len(batch.ids)} notifications to {batch.destination} dead-lettered: {error}')
+        return False
+
+    def process_once(self) -> int:
+        """
+            Claims and delivers a single batch. Returns the number of notifications in the batch.
+        """
+        batch: Optional[Batch] = self.queue.claim_batch(self.batch_size)
+        if batch is None:
+            return 0
+        self.deliver(batch)
+        return len(batch.ids)
+
+    def _run(self) -> None:
+        while not self._stop_event.is_set():
+            try:
+                if self.process_once() == 0:
+                    self._stop_event.wait(self.poll_interval)
+            except Exception as e:
+                app_logger.warning(f'Notification dispatcher failed: {e}')
+                self._stop_event.wait(self.poll_interval)
+
+    def start(self) -> None:
+        self._stop_event.clear()
+        self._threads = [
+            threading.Thread(target=self._run, name=f'notification-dispatcher-{index}', daemon=True)
+            for index in range(self.workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        self._stop_event.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+
+if __name__ == '__main__':
+    # Run the dispatcher as a separate worker process: python -m notifications.dispatcher
+    dispatcher = NotificationDispatcher(get_queue())
+    dispatcher.start()
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        dispatcher.stop()
@@ -0,0 +1,270 @@
+import json
+import time
+import sqlite3
+import threading
+
+from contextlib import contextmanager
+from typing import Iterable, List, NamedTuple, Optional, Tuple
+
+import settings
+
+
+class NotificationStatus:
+    """
+    Status of a notification in the queue. Delivered notifications are removed from the queue.
+    """
+    pending = 'pending'
+    delivering = 'delivering'
+    dead = 'dead'
+
+
+class Batch(NamedTuple):
+    """
+        Attribute    | Type        | Description
+
+        destination  | [string]    | Webhook url shared by all the notifications of the batch
+        ids          | [int]       | Queue ids of the notifications
+        payloads     | [dict]      | Notification bodies
+        attempts     | [int]       | Maximum number of previous delivery attempts in the batch
+    """
+    destination: str
+    ids: List[int]
+    payloads: List[dict]
+    attempts: int
+
+
+class NotificationQueue:
+    """
+        Durable notification queue stored in a SQLite database.
+
+        Notifications are claimed in batches that share a destination, so a worker can deliver them with a
+        single request. A claimed batch must be acknowledged with ack or returned with retry; claims older than
+        claim_timeout are considered lost (e.g. the worker died) and are delivered again.
+        Each thread uses its own connection, so an instance can be shared between threads, and several
+        processes can use the same file.
+    """
+
+    def __init__(self, path: str, claim_timeout: float = 60):
+        self.path = path
+        self.claim_timeout = claim_timeout
+        self._local = threading.local()
+        self._create_schema()
+
+    def _connection(self) -> sqlite3.Connection:
+        connection: Optional[sqlite3.Connection] = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self._local.connection = connection
+        return connection
+
+    def _create_schema(self) -> None:
+        connection: sqlite3.Connection = self._connection()
+        connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS notifications (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                destination TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                status TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                next_attempt_at REAL NOT NULL,
+                claimed_at REAL,
+                last_error TEXT,
+                created_at REAL NOT NULL
+            )
+            """
+        )
+        connection.execute(
+            'CREATE INDEX IF NOT EXISTS ix_notifications_due ON notifications (status, next_attempt_at)'
+        )
+        connection.execute(
+            'CREATE INDEX IF NOT EXISTS ix_notifications_destination ON notifications (destination, status)'
+        )
+
+    @contextmanager
+    def _transaction(self):
+        connection: sqlite3.Connection = self._connection()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            yield connection
+        except Exception:
+            connection.execute('ROLLBACK')
+            raise
+        connection.execute('COMMIT')
+
+    def close(self) -> None:
+        connection: Optional[sqlite3.Connection] = getattr(self._local, 'connection', None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
+
+    def enqueue(self, destination: str, payload: dict) -> None:
+        self.enqueue_many([(destination, payload)])
+
+    def enqueue_many(self, notifications: Iterable[Tuple[str, dict]]) -> None:
+        """
+            Adds (destination, payload) pairs to the queue in a single transaction
+        """
+        now: float = time.time()
+        rows: List[tuple] = [
+            (destination, json.dumps(payload, default=str), NotificationStatus.pending, now, now)
+            for destination, payload in notifications
+        ]
+        with self._transaction() as connection:
+            connection.executemany(
+                'INSERT INTO notifications (destination, payload, status, next_attempt_at, created_at) '
+                'VALUES (?, ?, ?, ?, ?)',
+                rows
+            )
+
+    def claim_batch(self, max_size: int) -> Optional[Batch]:
+        """
+            Claims up to max_size due notifications of the destination with the oldest due notification.
+            Returns None if there is nothing to deliver.
+        """
+        now: float = time.time()
+        with self._transaction() as connection:
+            connection.execute(
+                'UPDATE notifications SET status = ?, claimed_at = NULL WHERE status = ? AND claimed_at < ?',
+                (NotificationStatus.pending, NotificationStatus.delivering, now - self.claim_timeout)
+            )
+            row = connection.execute(
+                'SELECT destination FROM notifications WHERE status = ? AND next_attempt_at <= ? ORDER BY id LIMIT 1',
+                (NotificationStatus.pending, now)
+            ).fetchone()
+            if row is None:
+                return None
+
+            destination: str = row[0]
+            rows: List[tuple] = connection.execute(
+                'SELECT id, payload, attempts FROM notifications '
+                'WHERE destination = ? AND status = ? AND next_attempt_at <= ? ORDER BY id LIMIT ?',
+                (destination, NotificationStatus.pending, now, max_size)
+            ).fetchall()
+            ids: List[int] = [row[0] for row in rows]
+            connection.executemany(
+                'UPDATE notifications SET status = ?, claimed_at = ? WHERE id = ?',
+                [(NotificationStatus.delivering, now, notification_id) for notification_id in ids]
+            )
+
+        return Batch(
+            destination=destination,
+            ids=ids,
+            payloads=[json.loads(row[1]) for row in rows],
+            attempts=max(row[2] for row in rows)
+        )
+
+    def ack(self, batch: Batch) -> None:
+        """
+            Removes a delivered batch from the queue
+        """
+        with self._transaction() as connection:
+            connection.executemany(
+                'DELETE FROM notifications WHERE id = ?',
+                [(notification_id,) for notification_id in batch.ids]
+            )
+
+    def retry(self, batch: Batch, error: str, delay: float, max_attempts: int) -> bool:
+        """
+            Schedules a failed batch to be delivered again after delay seconds. When the batch reaches
+            max_attempts, its notifications are moved to the dead letters instead.
+
+            Returns True if the batch was dead-lettered.
+        """
+        dead: bool = batch.attempts + 1 >= max_attempts
+        with self._transaction() as connection:
+            connection.executemany(
+                'UPDATE notifications SET status = ?, attempts = attempts + 1, next_attempt_at = ?, '
+                'claimed_at = NULL, last_error = ? WHERE id = ?',
+                [
+                    (
+                        NotificationStatus.dead if dead else NotificationStatus.pending,
+                        time.time() + delay,
+                        error,
+                        notification_id
+                    ) for notification_id in batch.ids
+                ]
+            )
+        return dead
+
+    def dead_letters(self, limit: int = 100) -> List[dict]:
+        rows: List[tuple] = self._connection().execute(
+            'SELECT id, destination, payload, attempts, last_error FROM notifications WHERE status = ? ORDER BY id LIMIT ?',
+            (NotificationStatus.dead, limit)
+        ).fetchall()
+        return [
+            {
+                'id': row[0],
+                'destination': row[1],
+                'payload': json.loads(row[2]),
+                'attempts': row[3],
+                'last_error': row[4]
+            } for row in rows
+        ]
+
+    def requeue_dead_letters(self) -> int:
+        """
+            Moves the dead letters back to the queue with their attempts reset. Returns how many were moved.
+        """
+        cursor = self._connection().execute(
+            'UPDATE notifications SET status = ?, attempts = 0, next_attempt_at = ? WHERE status = ?',
+            (NotificationStatus.pending, time.time(), NotificationStatus.dead)
+        )
+        return cursor.rowcount
+
+    def counts(self) -> dict:
+        rows: List[tuple] = self._connection().execute(
+            'SELECT status, COUNT(*) FROM notifications GROUP BY status'
+        ).fetchall()
+        counts: dict = {
+            NotificationStatus.pending: 0,
+            NotificationStatus.delivering: 0,
+            NotificationStatus.dead: 0
+        }
+        counts.update(dict(rows))
+        return counts
+
+
+def build_alert_notification(alert) -> dict:
+    """
+    Builds the payload sent when an alert status changes to fulfill
+    """
+    return {
+        'event': 'alert.fulfilled',
+        'alert_id': alert.id,
+        'market': f'{alert.currency}-{alert.market}',
+        'type': alert.type.value,
+        'target_spread': alert.spread,
+        'spread': alert.last_spread,
+        'fulfilled_at': alert.fulfilled_at.isoformat() if alert.fulfilled_at else None
+    }
+
+
+def enqueue_alert_notifications(alerts: Iterable, queue: Optional[NotificationQueue] = None) -> int:
+    """
+    Queues a notification for every fulfilled alert with a webhook url. Returns how many were queued.
+    """
+    notifications: List[tuple] = [
+        (alert.webhook_url, build_alert_notification(alert)) for alert in alerts if alert.webhook_url
+    ]
+    if notifications:
+        (queue if queue is not None else get_queue()).enqueue_many(notifications)
+    return len(notifications)
+
+
+_default_queue: Optional[NotificationQueue] = None
+_default_queue_lock = threading.Lock()
+
+
+def get_queue() -> NotificationQueue:
+    """
+    Returns the app notification queue, stored at settings.NOTIFICATIONS_QUEUE_PATH
+    """
+    global _default_queue
+    if _default_queue is None:
+        with _default_queue_lock:
+            if _default_queue is None:
+                _default_queue = NotificationQueue(settings.NOTIFICATIONS_QUEUE_PATH)
+    return _default_queue
@@ -0,0 +1,84 @@
+import json
+import threading
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Optional
+
+
+class _SinkHandler(BaseHTTPRequestHandler):
+
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self) -> None:
+        body: bytes = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        status_code: int = self.server.record(self.path, body)
+        self.send_response(status_code)
+        if self.server.redirect_to is not None:
+            self.send_header('Location', self.server.redirect_to)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, format: str, *args) -> None:
+        pass
+
+
+class LocalHTTPSink(ThreadingHTTPServer):
+    """
+        Local webhook receiver for tests and development. Stores every received batch.
+
+        The first fail_requests requests are answered with fail_status_code, the rest with 200,
+        which allows testing retries and dead letters. If redirect_to is set, every request is answered
+        with a 307 redirect to it instead, and isn't stored.
+
+        Usage:
+
+        ```
+        sink = LocalHTTPSink()
+        sink.start()
+        webhook_url = sink.url('/alerts')
+        ```
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        host: str = '127.0.0.1',
+        port: int = 0,
+        fail_requests: int = 0,
+        fail_status_code: int = 503,
+        redirect_to: Optional[str] = None
+    ):
+        super().__init__((host, port), _SinkHandler)
+        self.fail_requests = fail_requests
+        self.fail_status_code = fail_status_code
+        self.redirect_to = redirect_to
+        self.requests: List[dict] = []
+        self._lock = threading.Lock()
+
+    def record(self, path: str, body: bytes) -> int:
+        with self._lock:
+            if self.redirect_to is not None:
+                return 307
+            if self.fail_requests > 0:
+                self.fail_requests -= 1
+                return self.fail_status_code
+            self.requests.append({'path': path, 'body': json.loads(body)})
+            return 200
+
+    @property
+    def notifications(self) -> List[dict]:
+        with self._lock:
+            return [notification for request in self.requests for notification in request['body']['notifications']]
+
+    def url(self, path: str = '/') -> str:
+        return f'http://{self.server_address[0]}:{self.server_address[1]}{path}'
+
+    def start(self) -> threading.Thread:
+        thread = threading.Thread(target=self.serve_forever, name='local-http-sink', daemon=True)
+        thread.start()
+        return thread
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
@@ -0,0 +1,73 @@
+"""
+Multi-worker launcher for the API.
+
+Starts one fetcher process that keeps a shared snapshot of markets and tickers up to date, and N uvicorn
+workers that read from it. Usage, inside the app directory:
+
+    python serve.py --workers 4 --host 0.0.0.0 --port 5000
+"""
+import os
+import argparse
+import multiprocessing
+
+import uvicorn
+
+import settings
+import api.services as services
+from api.snapshot import run_fetcher
+from database import SessionLocal, init_db
+
+
+def evaluate_snapshot_alerts(tickers: dict) -> None:
+    """
+    Updates the stored alert statuses with the tickers of the last snapshot refresh.
+    Only the alerts of markets whose spread changed are evaluated again.
+    """
+    db = SessionLocal()
+    try:
+        services.evaluate_alerts(
+            db,
+            [services.get_ticker_spread(market_id, ticker) for market_id, ticker in tickers.items()]
+        )
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run the API with a shared market snapshot')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--workers', type=int, default=int(os.environ.get('WEB_CONCURRENCY', 1)))
+    parser.add_argument('--snapshot', default=settings.SHARED_SNAPSHOT_PATH or settings.DEFAULT_SHARED_SNAPSHOT_PATH)
+    args = parser.parse_args()
+
+    # The schema is created once here instead of in every worker
+    init_db()
+
+    # Workers are spawned with this environment, so all of them read the same snapshot
+    os.environ['BUDA_SHARED_SNAPSHOT'] = args.snapshot
+    os.environ['BUDA_INIT_DB_ON_STARTUP'] = '0'
+    # The fetcher evaluates the alerts of every market on each refresh, so the workers don't need the scheduler
+    os.environ['BUDA_ALERT_SCHEDULER'] = '0'
+
+    fetcher = multiprocessing.Process(
+        target=run_fetcher,
+        args=(
+            args.snapshot,
+            settings.SNAPSHOT_REFRESH_INTERVAL,
+            settings.SNAPSHOT_MARKETS_REFRESH_INTERVAL,
+            evaluate_snapshot_alerts
+        ),
+        name='buda-snapshot-fetcher',
+        daemon=True
+    )
+    fetcher.start()
+
+    try:
+        uvicorn.run('main:app', host=args.host, port=args.port, workers=args.workers)
+    finally:
+        fetcher.terminate()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+import os
+import tempfile
+
+# Startup
+# Create the database schema when the app starts. Disable it when the deployment runs `python manage.py initdb`
+INIT_DB_ON_STARTUP = os.environ.get('BUDA_INIT_DB_ON_STARTUP', '1') == '1'
+
+# Multi-worker deployment
+# When SHARED_SNAPSHOT_PATH is set, the API workers read markets and tickers from a snapshot file written
+# by a single fetcher process instead of calling Buda on every request. See api/snapshot.py and serve.py
+_SHM_DIR = '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+
+SHARED_SNAPSHOT_PATH = os.environ.get('BUDA_SHARED_SNAPSHOT')
+DEFAULT_SHARED_SNAPSHOT_PATH = os.path.join(_SHM_DIR, 'buda_snapshot.json')
+SNAPSHOT_REFRESH_INTERVAL = float(os.environ.get('BUDA_SNAPSHOT_REFRESH_INTERVAL', 2))
+SNAPSHOT_MARKETS_REFRESH_INTERVAL = float(os.environ.get('BUDA_SNAPSHOT_MARKETS_REFRESH_INTERVAL', 300))
+SNAPSHOT_MAX_AGE = float(os.environ.get('BUDA_SNAPSHOT_MAX_AGE', 30))
+
+# Cache
+# Backends: local (in-process LRU), disk (files shared between processes), redis or none. See cache/backends.py
+CACHE_BACKEND = os.environ.get('BUDA_CACHE_BACKEND', 'local')
+CACHE_MAX_SIZE = int(os.environ.get('BUDA_CACHE_MAX_SIZE', 1024))
+CACHE_DEFAULT_TTL = float(os.environ.get('BUDA_CACHE_DEFAULT_TTL', 5))
+CACHE_DISK_PATH = os.environ.get('BUDA_CACHE_DISK_PATH', os.path.join(_SHM_DIR, 'buda_cache'))
+CACHE_REDIS_URL = os.environ.get('BUDA_CACHE_REDIS_URL', 'redis://127.0.0.1:6379/0')
+CACHE_FILL_LOCK_TIMEOUT = float(os.environ.get('BUDA_CACHE_FILL_LOCK_TIMEOUT', 15))
+
+MARKETS_CACHE_TTL = float(os.environ.get('BUDA_MARKETS_CACHE_TTL', 60))
+SPREAD_CACHE_TTL = float(os.environ.get('BUDA_SPREAD_CACHE_TTL', 2))
+
+# Spreads
+# Number of markets fetched at the same time by GET /spreads/stream/
+SPREADS_STREAM_CONCURRENCY = int(os.environ.get('BUDA_SPREADS_STREAM_CONCURRENCY', 8))
+# Number of updates kept by the versioned spreads of GET /spreads/?since=<sequence>. Clients further behind get every market
+SPREADS_MAX_DELTAS = int(os.environ.get('BUDA_SPREADS_MAX_DELTAS', 100))
+
+# Upstream failures
+# Consecutive failures (timeouts, connection errors, 5xx) of a Buda endpoint that open its circuit. See api/circuit_breaker.py
+CIRCUIT_FAILURE_THRESHOLD = int(os.environ.get('BUDA_CIRCUIT_FAILURE_THRESHOLD', 5))
+# Seconds an open circuit fails fast before probing the endpoint again
+CIRCUIT_RECOVERY_TIMEOUT = float(os.environ.get('BUDA_CIRCUIT_RECOVERY_TIMEOUT', 30))
+# Maximum age in seconds of the last known good markets and tickers served while Buda is unavailable
+LAST_KNOWN_GOOD_MAX_AGE = float(os.environ.get('BUDA_LAST_KNOWN_GOOD_MAX_AGE', 600))
+
+# Exchanges
+# Exchange adapters compared by GET /exchanges/spreads/, by registered name. See exchanges/adapters.py
+EXCHANGES = [name.strip() for name in os.environ.get('BUDA_EXCHANGES', 'buda').split(',') if name.strip()]
+# Seconds shared by all the exchanges to answer
+EXCHANGES_DEADLINE = float(os.environ.get('BUDA_EXCHANGES_DEADLINE', 5))
+# Tickers fetched at the same time from an exchange without a bulk ticker endpoint
+EXCHANGES_CONCURRENCY = int(os.environ.get('BUDA_EXCHANGES_CONCURRENCY', 8))
+
+# Analytics
+# Number of distinct spreads of each market used for the z-score of GET /analytics/
+ANALYTICS_HISTORY_SIZE = int(os.environ.get('BUDA_ANALYTICS_HISTORY_SIZE', 100))
+
+# Alerts
+# Stored alert statuses evaluated less than ALERT_STATUS_MAX_AGE seconds ago are returned without calling Buda
+ALERT_STATUS_MAX_AGE = float(os.environ.get('BUDA_ALERT_STATUS_MAX_AGE', 5))
+ALERTS_PAGE_SIZE = int(os.environ.get('BUDA_ALERTS_PAGE_SIZE', 100))
+ALERTS_MAX_PAGE_SIZE = int(os.environ.get('BUDA_ALERTS_MAX_PAGE_SIZE', 1000))
+ALERTS_STREAM_CHUNK_SIZE = int(os.environ.get('BUDA_ALERTS_STREAM_CHUNK_SIZE', 1000))
+# Alerts inserted per transaction by the bulk import
+ALERTS_IMPORT_BATCH_SIZE = int(os.environ.get('BUDA_ALERTS_IMPORT_BATCH_SIZE', 10000))
+# The admin endpoints (bulk import and export of alerts) require the header `Authorization: Bearer <ADMIN_TOKEN>`.
+# Without a token they are disabled, and the bulk operations are only available with manage.py
+ADMIN_TOKEN = os.environ.get('BUDA_ADMIN_TOKEN') or None
+
+# Alert scheduler
+# Re-evaluates the stored alert statuses in the background, more often for markets whose spread is close to an alert
+# threshold. Set ALERT_SCHEDULER_ENABLED to 0 to run it as a separate process (python -m api.scheduler). See api/scheduler.py
+ALERT_SCHEDULER_ENABLED = os.environ.get('BUDA_ALERT_SCHEDULER', '1') == '1'
+# Seconds between scheduler cycles
+ALERT_SCHEDULER_INTERVAL = float(os.environ.get('BUDA_ALERT_SCHEDULER_INTERVAL', 1))
+# Maximum number of markets evaluated per cycle
+ALERT_SCHEDULER_BUDGET = int(os.environ.get('BUDA_ALERT_SCHEDULER_BUDGET', 20))
+# Bounds of the seconds between two evaluations of the same market
+ALERT_SCHEDULER_MIN_DELAY = float(os.environ.get('BUDA_ALERT_SCHEDULER_MIN_DELAY', 1))
+ALERT_SCHEDULER_MAX_DELAY = float(os.environ.get('BUDA_ALERT_SCHEDULER_MAX_DELAY', 60))
+# Seconds between lookups of the markets with alerts
+ALERT_SCHEDULER_MARKETS_INTERVAL = float(os.environ.get('BUDA_ALERT_SCHEDULER_MARKETS_INTERVAL', 30))
+
+# Notifications
+# Webhook notifications of fulfilled alerts are queued in a SQLite database and delivered by the dispatcher
+# workers. Set NOTIFICATIONS_WORKERS to 0 to run the dispatcher as a separate process (python -m notifications.dispatcher)
+NOTIFICATIONS_QUEUE_PATH = os.environ.get(
+    'BUDA_NOTIFICATIONS_QUEUE_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'notifications.db')
+)
+NOTIFICATIONS_WORKERS = int(os.environ.get('BUDA_NOTIFICATIONS_WORKERS', 2))
+NOTIFICATIONS_BATCH_SIZE = int(os.environ.get('BUDA_NOTIFICATIONS_BATCH_SIZE', 100))
+NOTIFICATIONS_MAX_ATTEMPTS = int(os.environ.get('BUDA_NOTIFICATIONS_MAX_ATTEMPTS', 8))
+NOTIFICATIONS_BACKOFF = float(os.environ.get('BUDA_NOTIFICATIONS_BACKOFF', 1))
+NOTIFICATIONS_MAX_BACKOFF = float(os.environ.get('BUDA_NOTIFICATIONS_MAX_BACKOFF', 300))
+NOTIFICATIONS_TIMEOUT = float(os.environ.get('BUDA_NOTIFICATIONS_TIMEOUT', 5))
+# Webhooks of private, loopback or local hosts are rejected, so alerts can't reach the internal network.
+# Allow them only for development. See notifications/destinations.py
+NOTIFICATIONS_ALLOW_PRIVATE_DESTINATIONS = os.environ.get('BUDA_NOTIFICATIONS_ALLOW_PRIVATE_DESTINATIONS', '0') == '1'
@@ -0,0 +1,223 @@
+import pytest
+import api.services as services
+import settings
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from api import bulk
+from api.constants import AlertStatus, AlertType
+from api.models import Alert as AlertModel
+from database import Base
+from fastapi.testclient import TestClient
+from main import app
+from utils import get_db
+
+client = TestClient(app)
+
+MARKETS: list = ['btc-clp', 'eth-clp', 'eth-btc']
+
+
+@pytest.fixture
+def db(session_factory):
+    session = session_factory()
+    session.add_all([
+        AlertModel(type=AlertType.above, currency='btc', market='clp', spread=100.5, status=AlertStatus.fulfill),
+        AlertModel(
+            type=AlertType.under, currency='eth', market='btc', spread=0.00012, status=AlertStatus.pending,
+            webhook_url='https://example.com/hooks/1'
+        ),
+        AlertModel(type=AlertType.above, currency='eth', market='clp', spread=1e-9, status=AlertStatus.undefined)
+    ])
+    session.commit()
+    yield session
+    session.close()
+
+def alert_rows(db) -> list:
+    return [
+        (alert.type, alert.currency, alert.market, alert.spread, alert.webhook_url)
+        for alert in db.query(AlertModel).order_by(AlertModel.id)
+    ]
+
+def import_file(db, data: bytes, file_format: str, chunk_size: int = 7, batch_size: int = 2) -> dict:
+    """
+    Imports data fed in chunks of chunk_size bytes, to test rows and blocks split between chunks
+    """
+    reader = bulk.create_reader(file_format)
+    importer = bulk.AlertImporter(db, MARKETS, batch_size=batch_size)
+    for start in range(0, len(data), chunk_size):
+        importer.add(reader.feed(data[start:start + chunk_size]))
+    importer.add(reader.close())
+    return importer.finish()
+
+@pytest.mark.parametrize('file_format', bulk.FORMATS)
+def test_round_trip(db, session_factory, file_format):
+    """
+    Tests that an exported file imported in another database creates the same alerts
+    """
+    export = bulk.export_alerts_csv if file_format == bulk.CSV_FORMAT else bulk.export_alerts_columnar
+    chunks: list = list(export(db, chunk_size=2))
+    data: bytes = b''.join(chunk.encode() if isinstance(chunk, str) else chunk for chunk in chunks)
+    other_db = sessionmaker(bind=create_engine('sqlite://'))()
+    Base.metadata.create_all(bind=other_db.get_bind())
+
+    report: dict = import_file(other_db, data, file_format)
+
+    assert report == {'rows': 3, 'imported': 3, 'error_count': 0, 'errors': []}
+    assert alert_rows(other_db) == alert_rows(db)
+    assert {alert.status for alert in other_db.query(AlertModel)} == {AlertStatus.undefined}
+
+def test_export_csv(db):
+    """
+    Tests the csv columns and that spreads are written exactly
+    """
+    lines: list = ''.join(bulk.export_alerts_csv(db)).splitlines()
+
+    assert lines[0] == 'id,type,currency,market,spread,webhook_url'
+    assert lines[2] == '2,under,eth,btc,0.00012,https://example.com/hooks/1'
+    assert lines[3] == '3,above,eth,clp,1e-09,'
+
+def test_columnar_is_compact(db):
+    """
+    Tests that markets are stored once per block instead of once per alert
+    """
+    for _ in range(300):
+        db.add(AlertModel(type=AlertType.above, currency='btc', market='clp', spread=1.0))
+    db.commit()
+
+    size: int = sum(len(chunk) for chunk in bulk.export_alerts_columnar(db))
+    csv_size: int = sum(len(chunk) for chunk in bulk.export_alerts_csv(db))
+
+    assert size < 23 * 303 + 200 and size < csv_size
+
+def test_row_errors(db):
+    """
+    Tests that invalid rows are reported and skipped, and valid rows are imported
+    """
+    data: bytes = (
+        'type,currency,market,spread,webhook_url\n'
+        'above,BTC,CLP,10,\n'
+        'sideways,btc,clp,10,\n'
+        'above,doge,clp,10,\n'
+        'under,eth,clp,abc,\n'
+        'under,eth,clp,nan,\n'
+        'under,eth,clp,5,ftp://example.com\n'
+        'under,eth,clp,5,http://example.com/hook\n'
+    ).encode()
+
+    report: dict = import_file(db, data, bulk.CSV_FORMAT)
+
+    assert report['rows'] == 7 and report['imported'] == 2 and report['error_count'] == 5
+    assert [error['row'] for error in report['errors']] == [2, 3, 4, 5, 6]
+    assert 'doge-clp' in report['errors'][1]['error']
+    assert alert_rows(db)[-2:] == [
+        (AlertType.above, 'btc', 'clp', 10.0, None), (AlertType.under, 'eth', 'clp', 5.0, 'http://example.com/hook')
+    ]
+
+def test_spread_must_be_positive(db):
+    """
+    Tests that zero and negative spreads are rejected, like in POST /alert/
+    """
+    data: bytes = (
+        'type,currency,market,spread,webhook_url\n'
+        'above,btc,clp,-5,\n'
+        'under,btc,clp,0,\n'
+        'under,btc,clp,0.5,\n'
+    ).encode()
+
+    report: dict = import_file(db, data, bulk.CSV_FORMAT)
+
+    assert report['imported'] == 1 and [error['row'] for error in report['errors']] == [1, 2]
+    assert 'greater than 0' in report['errors'][0]['error']
+
+def test_csv_columns_in_any_order(db):
+    """
+    Tests a header in another order, with rows that leave out the trailing empty webhook url
+    """
+    data: bytes = b'webhook_url,spread,market,currency,type,id\n,10,clp,btc,above\nhttp://example.com/hook,5,clp,eth,under,7\n'
+
+    report: dict = import_file(db, data, bulk.CSV_FORMAT)
+
+    assert report['imported'] == 2 and report['errors'] == []
+    assert alert_rows(db)[-2:] == [
+        (AlertType.above, 'btc', 'clp', 10.0, None), (AlertType.under, 'eth', 'clp', 5.0, 'http://example.com/hook')
+    ]
+
+def test_truncated_file_reports_imported_rows(db, monkeypatch):
+    """
+    Tests that the rows read before a file error are kept and reported with the error
+    """
+    monkeypatch.setattr(services, 'get_all_markets', lambda: MARKETS)
+    data: bytes = b''.join(bulk.export_alerts_columnar(db, chunk_size=2))
+
+    with pytest.raises(bulk.AlertImportError) as error:
+        services.import_alerts(db, [data[:-10]], bulk.COLUMNAR_FORMAT)
+
+    assert error.value.report == {'rows': 2, 'imported': 2, 'error_count': 0, 'errors': []}
+    assert len(alert_rows(db)) == 5
+
+def test_invalid_files(db):
+    """
+    Tests files with missing columns, in another format or truncated
+    """
+    with pytest.raises(ValueError):
+        import_file(db, b'type,currency,spread\nabove,btc,10\n', bulk.CSV_FORMAT)
+    with pytest.raises(ValueError):
+        import_file(db, b'type,currency,market,spread\n', bulk.COLUMNAR_FORMAT)
+
+    data: bytes = b''.join(bulk.export_alerts_columnar(db))
+    with pytest.raises(ValueError):
+        import_file(db, data[:-10], bulk.COLUMNAR_FORMAT)
+
+def test_import_export_endpoints(db, session_factory, monkeypatch):
+    """
+    Tests that the endpoints stream the file and validate the markets once
+    """
+    calls: list = []
+
+    def get_all_markets():
+        calls.append(1)
+        return MARKETS
+
+    def override_get_db():
+        session = session_factory()
+        try:
+            yield session
+        finally:
+            session.close()
+
+    monkeypatch.setattr(services, 'get_all_markets', get_all_markets)
+    monkeypatch.setattr(settings, 'ADMIN_TOKEN', 'secret')
+    app.dependency_overrides[get_db] = override_get_db
+    headers: dict = {'Authorization': 'Bearer secret'}
+    try:
+        exported = client.get('/alerts/export/', params={'format': 'columnar'}, headers=headers)
+        imported = client.post(
+            '/alerts/import/', params={'format': 'columnar'}, data=exported.content, headers=headers
+        )
+        invalid = client.post('/alerts/import/', params={'format': 'csv'}, data=b'id,type\n', headers=headers)
+        truncated = client.post(
+            '/alerts/import/', params={'format': 'columnar'}, data=exported.content[:-10], headers=headers
+        )
+    finally:
+        app.dependency_overrides.clear()
+
+    assert exported.headers['content-type'] == 'application/octet-stream'
+    assert imported.status_code == 200 and imported.json()['imported'] == 3 and calls == [1, 1, 1]
+    assert invalid.status_code == 400
+    assert truncated.status_code == 400 and truncated.json()['detail']['imported'] == 0
+    assert 'truncated' in truncated.json()['detail']['error']
+    assert len(alert_rows(db)) == 6
+
+def test_admin_endpoints_require_the_token(monkeypatch):
+    """
+    Tests that the import and export endpoints are disabled without an admin token, and need it when it is set
+    """
+    monkeypatch.setattr(settings, 'ADMIN_TOKEN', None)
+    disabled = client.get('/alerts/export/', headers={'Authorization': 'Bearer secret'})
+
+    monkeypatch.setattr(settings, 'ADMIN_TOKEN', 'secret')
+    missing = client.get('/alerts/export/')
+    invalid = client.post('/alerts/import/', data=b'type,currency,market,spread\n', headers={'Authorization': 'Bearer x'})
+
+    assert disabled.status_code == 403
+    assert missing.status_code == invalid.status_code == 401
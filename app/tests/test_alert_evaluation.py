@@ -0,0 +1,124 @@
+import pytest
+import api.services as services
+
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.orm import sessionmaker
+from api.constants import AlertStatus, AlertType
+from api.models import Alert as AlertModel
+from database import Base, add_missing_columns
+
+
+@pytest.fixture
+def db():
+    """
+    Returns a session of an empty in-memory database
+    """
+    engine = create_engine('sqlite://')
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    yield session
+    session.close()
+
+@pytest.fixture
+def alerts(db) -> list:
+    alerts = [
+        AlertModel(type=AlertType.above, currency='btc', market='clp', spread=100, status=AlertStatus.undefined),
+        AlertModel(type=AlertType.under, currency='btc', market='clp', spread=100, status=AlertStatus.undefined),
+        AlertModel(type=AlertType.above, currency='eth', market='clp', spread=10, status=AlertStatus.undefined)
+    ]
+    db.add_all(alerts)
+    db.commit()
+    return alerts
+
+def test_evaluate_alerts(db, alerts):
+    """
+    Tests that the status is stored and only the alerts that changed to fulfill are returned
+    """
+    fulfilled: list = services.evaluate_alerts(db, [{'market': 'btc-clp', 'spread': 150}])
+    above, under, other_market = alerts
+
+    assert fulfilled == [above] and above.fulfilled_at is not None
+    assert above.status == AlertStatus.fulfill and under.status == AlertStatus.pending
+    assert above.last_spread == 150 and other_market.status == AlertStatus.undefined
+
+    assert services.evaluate_alerts(db, [{'market': 'btc-clp', 'spread': 50}]) == [under]
+
+def test_unchanged_spread_is_not_evaluated_again(db, alerts):
+    """
+    Tests that alerts already evaluated with the current spread only get their evaluation time updated
+    """
+    services.evaluate_alerts(db, [{'market': 'btc-clp', 'spread': 150}])
+    above: AlertModel = alerts[0]
+    evaluated_at: datetime = above.last_evaluated_at
+    above.status = AlertStatus.pending
+    db.commit()
+
+    services.evaluate_alerts(db, [{'market': 'btc-clp', 'spread': 150}])
+
+    assert above.status == AlertStatus.pending and above.last_evaluated_at > evaluated_at
+
+def test_edited_alert_is_evaluated_again(db, alerts):
+    """
+    Tests that changing the target spread or type of an alert evaluates it again with an unchanged market spread
+    """
+    services.evaluate_alerts(db, [{'market': 'btc-clp', 'spread': 150}])
+    above, under, _ = alerts
+    above.spread = 1000
+    under.type = AlertType.above
+    db.commit()
+
+    assert above.last_spread is None and not services.is_alert_status_fresh(above)
+
+    services.evaluate_alerts(db, [{'market': 'btc-clp', 'spread': 150}])
+
+    assert above.status == AlertStatus.pending and under.status == AlertStatus.fulfill
+
+def test_get_alert_from_stored_state(monkeypatch, db, alerts):
+    """
+    Tests that a fresh status is returned without getting the market spread, and a stale one is evaluated again
+    """
+    def get_market_spread(currency, market, disable_check=False):
+        calls.append(f'{currency}-{market}')
+        return {'market': f'{currency}-{market}', 'spread': 150}
+
+    calls: list = []
+    monkeypatch.setattr(services, 'get_market_spread', get_market_spread)
+
+    assert services.get_alert(db=db, alert_id=alerts[0].id)['status'] == 'fulfill' and calls == ['btc-clp']
+    assert services.get_alert(db=db, alert_id=alerts[1].id)['status'] == 'pending' and calls == ['btc-clp']
+
+    alerts[1].last_evaluated_at = datetime.utcnow() - timedelta(hours=1)
+    db.commit()
+    services.get_alert(db=db, alert_id=alerts[1].id)
+    assert calls == ['btc-clp', 'btc-clp']
+
+def test_stale_spread_keeps_stored_status(monkeypatch, db, alerts):
+    """
+    Tests that the last known spread of an unavailable market doesn't change the stored status of its alerts
+    """
+    notified: list = []
+    monkeypatch.setattr(
+        services, 'get_market_spread',
+        lambda currency, market, disable_check=False: {'market': 'btc-clp', 'spread': 150, 'stale': True, 'age': 60}
+    )
+    monkeypatch.setattr(services, 'enqueue_alert_notifications', notified.extend)
+
+    assert services.refresh_alert_statuses(db, alerts[:2]) is False
+    assert services.get_alert(db=db, alert_id=alerts[0].id)['status'] == 'undefined'
+    assert alerts[0].last_evaluated_at is None and notified == []
+
+def test_add_missing_columns():
+    """
+    Tests that the status columns are added to an alerts table created by a previous version
+    """
+    engine = create_engine('sqlite://')
+    with engine.begin() as connection:
+        connection.execute(text(
+            'CREATE TABLE alerts (id INTEGER PRIMARY KEY, type VARCHAR, currency VARCHAR, market VARCHAR, spread FLOAT)'
+        ))
+
+    add_missing_columns(bind=engine)
+
+    columns: set = {column['name'] for column in inspect(engine).get_columns('alerts')}
+    assert {'status', 'last_evaluated_at', 'last_spread', 'fulfilled_at'} <= columns
@@ -0,0 +1,107 @@
+import json
+import pytest
+import settings
+import api.services as services
+
+from fastapi.testclient import TestClient
+from api.constants import AlertStatus, AlertType
+from api.models import Alert as AlertModel
+from main import app
+from utils import get_db
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def session_factory(session_factory):
+    """
+    Replaces the app database with an in-memory database with 30 alerts in 3 markets
+    """
+    db = session_factory()
+    db.add_all([
+        AlertModel(
+            type=AlertType.above if index % 2 else AlertType.under,
+            currency=['btc', 'eth', 'ltc'][index % 3],
+            market='clp',
+            spread=100 * (index + 1),
+            status=AlertStatus.undefined
+        ) for index in range(30)
+    ])
+    db.commit()
+    db.close()
+
+    def override_get_db():
+        db = session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+    yield session_factory
+    app.dependency_overrides.clear()
+
+@pytest.fixture
+def spread_calls(monkeypatch) -> list:
+    calls: list = []
+
+    def get_market_spread(currency, market, disable_check=False):
+        calls.append(f'{currency}-{market}')
+        return {'market': f'{currency}-{market}', 'spread': 1000}
+
+    monkeypatch.setattr(services, 'get_market_spread', get_market_spread)
+    return calls
+
+def test_keyset_pagination(session_factory):
+    """
+    Tests that following next_after_id returns every alert once, in id order
+    """
+    ids: list = []
+    after_id: int = 0
+    while after_id is not None:
+        page: dict = client.get('/alerts/', params={'after_id': after_id, 'limit': 7}).json()
+        ids.extend(alert['id'] for alert in page['alerts'])
+        after_id = page['next_after_id']
+
+    assert ids == list(range(1, 31))
+
+def test_filters(session_factory):
+    """
+    Tests the market, type and spread range filters
+    """
+    response = client.get(
+        '/alerts/',
+        params={'market': 'BTC-clp', 'type': 'under', 'min_spread': 500, 'max_spread': 2500}
+    )
+    alerts: list = response.json()['alerts']
+
+    assert response.status_code == 200 and [alert['target_spread'] for alert in alerts] == [700, 1300, 1900, 2500]
+    assert all(alert['market'] == 'btc-clp' and alert['type'] == 'under' for alert in alerts)
+    assert client.get('/alerts/', params={'market': 'btcclp'}).status_code == 400
+
+def test_include_status_evaluates_per_market(session_factory, spread_calls):
+    """
+    Tests that statuses are evaluated with one spread request per market and then read from the database
+    """
+    alerts: list = client.get('/alerts/', params={'include_status': True, 'limit': 30}).json()['alerts']
+
+    assert sorted(spread_calls) == ['btc-clp', 'eth-clp', 'ltc-clp']
+    assert all(
+        alert['status'] == ('fulfill' if alert['type'] == 'above' and alert['target_spread'] < 1000
+                            or alert['type'] == 'under' and alert['target_spread'] > 1000 else 'pending')
+        for alert in alerts
+    )
+
+    client.get('/alerts/', params={'include_status': True})
+    assert len(spread_calls) == 3
+
+def test_ndjson_stream(session_factory, spread_calls, monkeypatch):
+    """
+    Tests that the ndjson format streams every matching alert, fetching them in chunks
+    """
+    monkeypatch.setattr(settings, 'ALERTS_STREAM_CHUNK_SIZE', 4)
+    response = client.get('/alerts/', params={'format': 'ndjson', 'after_id': 5, 'include_status': True})
+    alerts: list = [json.loads(line) for line in response.text.splitlines()]
+
+    assert response.headers['content-type'] == 'application/x-ndjson'
+    assert [alert['id'] for alert in alerts] == list(range(6, 31)) and all('status' in alert for alert in alerts)
@@ -0,0 +1,137 @@
+import pytest
+import api.services as services
+
+from api.constants import AlertStatus, AlertType
+from api.models import Alert as AlertModel
+from api.scheduler import AlertScheduler
+from fastapi.testclient import TestClient
+from main import app
+
+client = TestClient(app)
+
+
+class Clock:
+
+    def __init__(self):
+        self.now: float = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def session_factory(session_factory):
+    """
+    Returns a session factory of an in-memory database with an alert in 3 markets
+    """
+    db = session_factory()
+    db.add_all([
+        AlertModel(type=AlertType.above, currency='btc', market='clp', spread=100, status=AlertStatus.undefined),
+        AlertModel(type=AlertType.above, currency='eth', market='clp', spread=1000, status=AlertStatus.undefined),
+        AlertModel(type=AlertType.under, currency='ltc', market='clp', spread=1, status=AlertStatus.undefined)
+    ])
+    db.commit()
+    db.close()
+    return session_factory
+
+@pytest.fixture
+def spreads(monkeypatch) -> dict:
+    """
+    Replaces Buda with spreads that can be changed by the tests
+    """
+    spreads: dict = {'btc-clp': 90.0, 'eth-clp': 10.0, 'ltc-clp': 50.0}
+
+    def get_market_spread(currency, market, disable_check=False):
+        spread = spreads[f'{currency}-{market}']
+        if isinstance(spread, Exception):
+            raise spread
+        return {'market': f'{currency}-{market}', 'spread': spread}
+
+    monkeypatch.setattr(services, 'get_market_spread', get_market_spread)
+    return spreads
+
+@pytest.fixture
+def clock() -> Clock:
+    return Clock()
+
+def create_scheduler(session_factory, clock, budget: int = 10) -> AlertScheduler:
+    return AlertScheduler(
+        session_factory=session_factory, budget=budget, min_delay=1, max_delay=60, markets_interval=30, clock=clock
+    )
+
+def test_evaluates_every_market(session_factory, spreads, clock):
+    """
+    Tests that the first cycle evaluates the alerts of every market
+    """
+    scheduler: AlertScheduler = create_scheduler(session_factory, clock)
+
+    assert scheduler.run_cycle() == 3
+    db = session_factory()
+    assert {alert.status for alert in db.query(AlertModel)} == {AlertStatus.pending}
+    assert scheduler.run_cycle() == 0
+
+def test_priority_by_distance_and_volatility(session_factory, spreads, clock):
+    """
+    Tests that a moving market close to its threshold is evaluated more often than a flat one far from it
+    """
+    scheduler: AlertScheduler = create_scheduler(session_factory, clock)
+    scheduler.run_cycle()
+    clock.now += 1
+    spreads['btc-clp'] = 95.0
+    scheduler.run_cycle()
+
+    btc, eth = scheduler.markets['btc-clp'], scheduler.markets['eth-clp']
+    assert btc.distance == 5 and btc.volatility == 5
+    assert btc.due_at - clock.now == 1
+    assert eth.due_at - clock.now == 60
+
+    clock.now += 1
+    spreads['btc-clp'] = 101.0
+    assert scheduler.run_cycle() == 1
+    db = session_factory()
+    assert db.query(AlertModel).filter(AlertModel.currency == 'btc').one().status == AlertStatus.fulfill
+
+def test_budget_and_lag(session_factory, spreads, clock):
+    """
+    Tests that a cycle evaluates at most budget markets and the rest are evaluated late
+    """
+    scheduler: AlertScheduler = create_scheduler(session_factory, clock, budget=2)
+
+    assert scheduler.run_cycle() == 2
+    assert scheduler.stats()['overdue'] == 1
+    clock.now += 0.5
+    assert scheduler.run_cycle() == 1
+
+    stats: dict = scheduler.stats()
+    assert stats['evaluations'] == 3 and stats['overdue'] == 0
+    assert stats['max_lag'] == stats['last_lag'] == 0.5 and stats['avg_lag'] == pytest.approx(0.5 / 3)
+
+def test_failed_markets_are_retried(session_factory, spreads, clock):
+    """
+    Tests that a market whose spread can't be fetched is retried after min_delay without stopping the others
+    """
+    spreads['eth-clp'] = ConnectionError('Buda is not answering')
+    scheduler: AlertScheduler = create_scheduler(session_factory, clock)
+
+    assert scheduler.run_cycle() == 3
+    assert scheduler.stats()['failures'] == 1
+    assert scheduler.markets['eth-clp'].due_at == clock.now + 1
+
+def test_removed_markets(session_factory, spreads, clock):
+    """
+    Tests that markets without alerts are not evaluated after the markets are looked up again
+    """
+    scheduler: AlertScheduler = create_scheduler(session_factory, clock)
+    scheduler.run_cycle()
+    db = session_factory()
+    db.query(AlertModel).filter(AlertModel.currency == 'ltc').delete()
+    db.commit()
+
+    clock.now += 60
+    assert scheduler.run_cycle() == 2 and set(scheduler.markets) == {'btc-clp', 'eth-clp'}
+
+def test_stats_endpoint():
+    """
+    Tests the endpoint when the scheduler is not running in the worker
+    """
+    assert client.get('/alerts/scheduler/stats/').json() == {'running': False}
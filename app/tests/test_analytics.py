@@ -0,0 +1,149 @@
+import pytest
+import api.services as services
+
+from api.analytics import MarketAnalytics
+from buda.schemas import Ticker
+from fastapi.testclient import TestClient
+from main import app
+
+client = TestClient(app)
+
+
+def make_ticker(market_id: str, bid: float, ask: float) -> Ticker:
+    base_currency, quote_currency = market_id.split('-')
+    return Ticker(
+        last_price=[bid, quote_currency],
+        market_id=market_id,
+        max_bid=[bid, quote_currency],
+        min_ask=[ask, quote_currency],
+        price_variation_24h=0.0,
+        price_variation_7d=0.0,
+        volume=[1.0, base_currency]
+    )
+
+@pytest.fixture
+def tickers() -> dict:
+    """
+    Three markets with a profitable cycle clp -> btc -> eth -> clp: 1 btc buys 20 eth, which are worth 1.1 btc in clp
+    """
+    return {
+        'btc-clp': make_ticker('btc-clp', 99.0, 100.0),
+        'eth-clp': make_ticker('eth-clp', 5.5, 5.6),
+        'eth-btc': make_ticker('eth-btc', 0.049, 0.05),
+        'ltc-usdc': make_ticker('ltc-usdc', 10.0, 10.0)
+    }
+
+def test_market_spreads(tickers):
+    """
+    Tests the spread in basis points relative to the mid price
+    """
+    analytics = MarketAnalytics()
+    analytics.refresh(tickers)
+    markets: dict = {market['market']: market for market in analytics.snapshot()['markets']}
+
+    assert markets['btc-clp']['mid'] == 99.5
+    assert markets['btc-clp']['spread_bps'] == pytest.approx(1 / 99.5 * 10000)
+    assert markets['ltc-usdc']['spread_bps'] == 0
+    assert markets['btc-clp']['zscore'] is None
+
+def test_spread_zscore(tickers):
+    """
+    Tests that the z-score compares the spread with the previous spreads of the market
+    """
+    analytics = MarketAnalytics()
+    for ask in (100.0, 100.2, 100.0, 100.2):
+        analytics.refresh({'btc-clp': make_ticker('btc-clp', 99.0, ask)})
+    analytics.refresh({'btc-clp': make_ticker('btc-clp', 99.0, 101.0)})
+
+    assert analytics.snapshot()['markets'][0]['zscore'] > 3
+
+def test_triangular_arbitrage(tickers):
+    """
+    Tests that both directions of the cycle are found and only the profitable one is returned
+    """
+    analytics = MarketAnalytics()
+    analytics.refresh(tickers)
+    data: dict = analytics.snapshot()
+
+    assert data['cycles'] == 2
+    assert len(data['arbitrage']) == 1
+    cycle: dict = data['arbitrage'][0]
+    # btc -> eth at the eth-btc ask, eth -> clp at the eth-clp bid, clp -> btc at the btc-clp ask
+    assert cycle['path'] == ['btc', 'eth', 'clp', 'btc']
+    assert cycle['markets'] == ['eth-btc', 'eth-clp', 'btc-clp']
+    assert cycle['return_bps'] == pytest.approx((1 / 0.05 * 5.5 / 100.0 - 1) * 10000)
+    assert analytics.snapshot(min_return_bps=cycle['return_bps'])['arbitrage'] == []
+
+def test_incremental_refresh(tickers):
+    """
+    Tests that a refresh only recomputes the markets that changed and the cycles that go through them
+    """
+    analytics = MarketAnalytics()
+
+    assert analytics.refresh(tickers) == {'markets': 4, 'cycles': 2}
+    assert analytics.refresh(tickers) == {'markets': 0, 'cycles': 0}
+    tickers['ltc-usdc'] = make_ticker('ltc-usdc', 10.0, 10.5)
+    assert analytics.refresh(tickers) == {'markets': 1, 'cycles': 0}
+    tickers['eth-btc'] = make_ticker('eth-btc', 0.049, 0.06)
+    assert analytics.refresh(tickers) == {'markets': 1, 'cycles': 2}
+    assert analytics.snapshot()['arbitrage'] == []
+
+def test_failed_market_keeps_history(tickers):
+    """
+    Tests that a market whose ticker is missing from a refresh doesn't reset the analytics of the catalogue
+    """
+    analytics = MarketAnalytics()
+    markets: list = list(tickers)
+    for ask in (100.0, 100.2, 100.0, 100.2):
+        tickers['btc-clp'] = make_ticker('btc-clp', 99.0, ask)
+        analytics.refresh(tickers, markets)
+    failed: dict = {market_id: ticker for market_id, ticker in tickers.items() if market_id != 'eth-clp'}
+    failed['btc-clp'] = make_ticker('btc-clp', 99.0, 101.0)
+
+    assert analytics.refresh(failed, markets) == {'markets': 1, 'cycles': 2}
+    data: dict = analytics.snapshot()
+    assert data['cycles'] == 2 and data['markets'][0]['zscore'] > 3
+
+def test_analytics_refresh_is_throttled(tickers, monkeypatch):
+    """
+    Tests that the analytics of the process are refreshed at most once every SPREAD_CACHE_TTL seconds
+    """
+    calls: list = []
+    monkeypatch.setattr(services, 'market_analytics', MarketAnalytics())
+    monkeypatch.setattr(services, '_analytics_refreshed_at', float('-inf'))
+    monkeypatch.setattr(services, 'get_all_markets_with_age', lambda: (list(tickers), None))
+    monkeypatch.setattr(services, 'get_all_markets_ticker', lambda markets: calls.append(markets) or tickers)
+
+    assert services.refresh_market_analytics() == {'markets': 4, 'cycles': 2}
+    assert services.refresh_market_analytics() == {'markets': 4, 'cycles': 2}
+    assert len(calls) == 1
+
+def test_analytics_endpoint(tickers, monkeypatch):
+    """
+    Tests the endpoint with the tickers of every market
+    """
+    monkeypatch.setattr(services, 'market_analytics', MarketAnalytics())
+    monkeypatch.setattr(services, 'get_all_markets_with_age', lambda: (list(tickers), None))
+    monkeypatch.setattr(services, 'get_market_ticker', lambda currency, market: tickers[f'{currency}-{market}'])
+    monkeypatch.setattr(services, '_analytics_refreshed_at', float('-inf'))
+
+    response = client.get('/analytics/', params={'min_return_bps': 0})
+    data: dict = response.json()
+
+    assert response.status_code == 200
+    assert len(data['markets']) == 4 and len(data['arbitrage']) == 1
+    assert data['updated'] == {'markets': 4, 'cycles': 2} and 'stale' not in data
+
+def test_analytics_with_stale_markets(tickers, monkeypatch):
+    """
+    Tests that the analytics say so when they were refreshed with the last known markets
+    """
+    monkeypatch.setattr(services, 'market_analytics', MarketAnalytics())
+    monkeypatch.setattr(services, 'get_all_markets_with_age', lambda: (list(tickers), 30.0))
+    monkeypatch.setattr(services, 'get_all_markets_ticker', lambda markets: tickers)
+    monkeypatch.setattr(services, '_analytics_refreshed_at', float('-inf'))
+    monkeypatch.setattr(services, '_analytics_markets_fetched_at', None)
+
+    data: dict = services.get_market_analytics()
+
+    assert data['stale'] is True and data['age'] >= 30
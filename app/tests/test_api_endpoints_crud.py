@@ -2,8 +2,10 @@ import pytest
 
 from fastapi.testclient import TestClient
 from api.schemas import Alert
+from database import init_db
 from main import app
 
+init_db()
 client = TestClient(app)
 
 @pytest.fixture
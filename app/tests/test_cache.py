@@ -0,0 +1,143 @@
+import os
+import time
+import fcntl
+import pytest
+import threading
+import settings
+
+from cache.backends import LocalLRUCache, DiskCache, MISSING
+from cache.decorators import cached
+from cache.resp import LocalRESPServer, RESPClient, RedisCache
+
+
+@pytest.fixture
+def resp_server() -> LocalRESPServer:
+    server = LocalRESPServer()
+    server.start()
+    yield server
+    server.stop()
+
+@pytest.fixture(params=['local', 'disk', 'redis'])
+def cache_backend(request, tmp_path):
+    """
+    Returns an instance of every cache backend
+    """
+    if request.param == 'local':
+        return LocalLRUCache(max_size=16)
+    if request.param == 'disk':
+        return DiskCache(path=str(tmp_path / 'cache'))
+    return RedisCache(RESPClient(*request.getfixturevalue('resp_server').server_address))
+
+def test_set_get_delete(cache_backend):
+    """
+    Tests the basic interface of every backend, including cached None values
+    """
+    cache_backend.set('spread', {'market': 'btc-clp', 'spread': 20.0})
+    cache_backend.set('none', None)
+
+    assert cache_backend.get('spread') == {'market': 'btc-clp', 'spread': 20.0}
+    assert cache_backend.get('none') is None and cache_backend.get('missing') is MISSING
+
+    cache_backend.delete('spread')
+    assert cache_backend.get('spread', default=0) == 0
+
+def test_per_key_ttl(cache_backend):
+    """
+    Tests that an entry expires after its own TTL and other entries are kept
+    """
+    cache_backend.set('short', 1, ttl=0.05)
+    cache_backend.set('long', 2, ttl=60)
+    time.sleep(0.1)
+
+    assert cache_backend.get('short') is MISSING and cache_backend.get('long') == 2
+
+def test_stampede_protection(cache_backend):
+    """
+    Tests that concurrent misses of the same key compute the value only once
+    """
+    calls: list = []
+
+    def factory():
+        calls.append(1)
+        time.sleep(0.05)
+        return 'value'
+
+    results: list = []
+    threads = [
+        threading.Thread(target=lambda: results.append(cache_backend.get_or_set('key', factory, ttl=10)))
+        for _ in range(10)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1 and results == ['value'] * 10
+    assert cache_backend.stats.fills == 1
+
+def test_fill_locks_are_removed(cache_backend, tmp_path):
+    """
+    Tests that no lock is left behind, in the process or on disk, after filling many keys
+    """
+    for index in range(20):
+        cache_backend.get_or_set(f'key:{index}', lambda: index, ttl=10)
+
+    assert cache_backend._fill_locks == {}
+    if isinstance(cache_backend, DiskCache):
+        assert not [name for name in os.listdir(cache_backend.path) if name.endswith('.lock')]
+
+def test_disk_fill_lock_times_out(tmp_path, monkeypatch):
+    """
+    Tests that a process waiting for a disk fill lock whose holder hangs fills the key without it after the timeout
+    """
+    cache = DiskCache(path=str(tmp_path / 'cache'))
+    monkeypatch.setattr(settings, 'CACHE_FILL_LOCK_TIMEOUT', 0.2)
+    with open(f'{cache._key_path("key")}.lock', 'a') as held:
+        fcntl.flock(held, fcntl.LOCK_EX)
+        started_at: float = time.monotonic()
+        value = cache.get_or_set('key', lambda: 1, ttl=10)
+
+    assert value == 1 and 0.2 <= time.monotonic() - started_at < 2
+
+def test_redis_fill_lock_of_another_owner_is_kept(resp_server):
+    """
+    Tests that a fill lock is only deleted by its owner, and a lock that was never acquired releases nothing
+    """
+    cache = RedisCache(RESPClient(*resp_server.server_address))
+    release = cache._acquire_shared_fill_lock('key', 10)
+    cache.client.execute('SET', 'buda:key:fill', 'other')
+    release()
+
+    assert cache.client.execute('GET', 'buda:key:fill') == b'other'
+
+    cache.set('key', 1)
+    cache._acquire_shared_fill_lock('key', 10)()
+    assert cache.client.execute('GET', 'buda:key:fill') == b'other'
+
+def test_lru_eviction():
+    """
+    Tests that the least recently used entry is evicted when the cache is full
+    """
+    cache = LocalLRUCache(max_size=2)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.get('a')
+    cache.set('c', 3)
+
+    assert cache.get('b') is MISSING and cache.get('a') == 1 and cache.stats.evictions == 1
+
+def test_cached_decorator():
+    """
+    Tests that the decorator caches by the key function and exposes the statistics
+    """
+    cache = LocalLRUCache()
+    calls: list = []
+
+    @cached(ttl=10, key=lambda db, alert_id: f'alert:{alert_id}', cache=cache)
+    def get_alert(db, alert_id):
+        calls.append(alert_id)
+        return {'id': alert_id}
+
+    assert get_alert(object(), 1) == get_alert(object(), 1) == {'id': 1}
+    assert calls == [1] and get_alert.uncached(None, 2) == {'id': 2}
+    assert cache.stats.as_dict()['hit_ratio'] == 0.5
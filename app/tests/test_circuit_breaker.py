@@ -0,0 +1,180 @@
+import time
+import pytest
+import requests
+import api.services as services
+
+from types import SimpleNamespace
+from api.circuit_breaker import (
+    CircuitBreaker, CircuitOpenError, CircuitState, get_circuit_breakers_stats, reset_circuit_breakers
+)
+from buda import buda
+from buda.schemas import Ticker
+from fastapi.testclient import TestClient
+from main import app
+
+client = TestClient(app)
+
+
+class FailingAdapter(requests.adapters.BaseAdapter):
+    """
+    requests transport that fails every request with a timeout, counting them
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.calls: int = 0
+
+    def send(self, request, **kwargs):
+        self.calls += 1
+        raise requests.exceptions.ConnectTimeout('Timed out')
+
+    def close(self):
+        pass
+
+
+@pytest.fixture(autouse=True)
+def circuits():
+    reset_circuit_breakers()
+    services._last_known_good.clear()
+    yield
+    reset_circuit_breakers()
+    services._last_known_good.clear()
+
+@pytest.fixture
+def ticker() -> Ticker:
+    return Ticker(
+        last_price=[100.0, 'CLP'], market_id='BTC-CLP', max_bid=[90.0, 'CLP'], min_ask=[110.0, 'CLP'],
+        price_variation_24h=0.0, price_variation_7d=0.0, volume=[1.0, 'BTC']
+    )
+
+def test_breaker_opens_and_recovers():
+    """
+    Tests the transitions closed -> open -> half open -> closed
+    """
+    breaker = CircuitBreaker('test', failure_threshold=2, recovery_timeout=0.2)
+    for _ in range(2):
+        breaker.before_call()
+        breaker.record_failure()
+
+    assert breaker.state == CircuitState.open
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    time.sleep(0.25)
+    breaker.before_call()
+    assert breaker.state == CircuitState.half_open
+    with pytest.raises(CircuitOpenError):
+        # Only one probe at a time
+        breaker.before_call()
+    breaker.record_success()
+
+    assert breaker.state == CircuitState.closed and breaker.stats()['rejected'] == 2
+
+def test_failed_probe_opens_again():
+    """
+    Tests that a failed probe opens the circuit without waiting for failure_threshold failures
+    """
+    breaker = CircuitBreaker('test', failure_threshold=1, recovery_timeout=0.1)
+    breaker.record_failure()
+    time.sleep(0.15)
+    breaker.before_call()
+    breaker.record_failure()
+
+    assert breaker.state == CircuitState.open
+
+def test_sdk_fails_fast():
+    """
+    Tests that the SDK stops sending requests to an endpoint after consecutive timeouts, for every instance and market
+    """
+    adapter = FailingAdapter()
+    for market in ('clp', 'cop', 'pen', 'usdc', 'ars'):
+        buda_client = buda.Buda()
+        buda_client._rest_session.mount('https://', adapter)
+        with pytest.raises(requests.exceptions.ConnectTimeout):
+            buda_client.get_ticker('btc', market)
+
+    buda_client = buda.Buda()
+    buda_client._rest_session.mount('https://', adapter)
+    with pytest.raises(CircuitOpenError):
+        buda_client.get_ticker('eth', 'clp')
+
+    assert adapter.calls == services.settings.CIRCUIT_FAILURE_THRESHOLD == 5
+    stats: list = get_circuit_breakers_stats()
+    assert stats[0]['name'] == 'BUDA GET markets/{market_id}/ticker' and stats[0]['state'] == CircuitState.open
+
+def test_stale_spread(ticker, monkeypatch):
+    """
+    Tests that the last known ticker is served with its age while the circuit is open
+    """
+    monkeypatch.setattr(buda.Buda, 'get_ticker', lambda self, currency, market: ticker)
+    fresh: dict = services.get_market_spread.uncached('btc', 'clp', disable_check=True)
+
+    def get_ticker(self, currency, market):
+        raise CircuitOpenError('Circuit is open')
+
+    monkeypatch.setattr(buda.Buda, 'get_ticker', get_ticker)
+    stale: dict = services.get_market_spread.uncached('btc', 'clp', disable_check=True)
+
+    assert 'stale' not in fresh
+    assert stale['stale'] is True and stale['age'] >= 0 and stale['spread'] == fresh['spread'] == 20.0
+    with pytest.raises(CircuitOpenError):
+        # There is no last known ticker of this market
+        services.get_market_spread.uncached('eth', 'clp', disable_check=True)
+
+def test_stale_markets(monkeypatch):
+    """
+    Tests that the last known markets are served with their age while the circuit is open
+    """
+    listing = SimpleNamespace(markets=[SimpleNamespace(name='btc-clp'), SimpleNamespace(name='eth-clp')])
+    monkeypatch.setattr(buda.Buda, 'get_markets', lambda self: listing)
+    fresh: tuple = services.get_all_markets_with_fetch_time.uncached()
+
+    def get_markets(self):
+        raise CircuitOpenError('Circuit is open')
+
+    monkeypatch.setattr(buda.Buda, 'get_markets', get_markets)
+    stale: tuple = services.get_all_markets_with_fetch_time.uncached()
+    monkeypatch.setattr(services, 'get_all_markets_with_fetch_time', lambda: stale)
+    markets, age = services.get_all_markets_with_age()
+
+    assert fresh == (['btc-clp', 'eth-clp'], None)
+    assert markets == ['btc-clp', 'eth-clp'] and stale[1] <= time.time() and age >= 0
+
+def test_request_errors_are_not_hidden(ticker, monkeypatch):
+    """
+    Tests that errors that aren't caused by Buda being unavailable are raised even with a last known ticker
+    """
+    monkeypatch.setattr(buda.Buda, 'get_ticker', lambda self, currency, market: ticker)
+    services.get_market_ticker('btc', 'clp')
+
+    def get_ticker(self, currency, market):
+        raise ValueError('Invalid market')
+
+    monkeypatch.setattr(buda.Buda, 'get_ticker', get_ticker)
+    with pytest.raises(ValueError):
+        services.get_market_ticker('btc', 'clp')
+
+def test_last_known_good_max_age(ticker, monkeypatch):
+    """
+    Tests that values older than LAST_KNOWN_GOOD_MAX_AGE are not served
+    """
+    services._last_known_good['ticker:btc-clp'] = (ticker, time.time() - services.settings.LAST_KNOWN_GOOD_MAX_AGE - 1)
+
+    def get_ticker(self, currency, market):
+        raise CircuitOpenError('Circuit is open')
+
+    monkeypatch.setattr(buda.Buda, 'get_ticker', get_ticker)
+    with pytest.raises(CircuitOpenError):
+        services.get_market_ticker('btc', 'clp')
+
+def test_spread_endpoint_unavailable(monkeypatch):
+    """
+    Tests that the endpoint answers 503 when Buda is unavailable and there is no last known spread
+    """
+    def get_market_spread(currency, market):
+        raise CircuitOpenError('Circuit is open')
+
+    monkeypatch.setattr(services, 'get_market_spread', get_market_spread)
+
+    assert client.get('/spread/btc/clp/').status_code == 503
+    assert client.get('/circuits/stats/').json() == {'circuits': []}
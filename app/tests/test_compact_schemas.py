@@ -0,0 +1,76 @@
+import sys
+import pytest
+
+from buda import schemas
+from buda.compact import CompactTicker, TickerBatch
+
+
+@pytest.fixture
+def get_payload() -> dict:
+    """
+    Returns a ticker as received from Buda
+    """
+    return {
+        'market_id': 'BTC-CLP',
+        'last_price': ['15000000.0', 'CLP'],
+        'max_bid': ['14990000.0', 'CLP'],
+        'min_ask': ['15010000.0', 'CLP'],
+        'volume': ['12.5', 'BTC'],
+        'price_variation_24h': '-0.012',
+        'price_variation_7d': '0.034'
+    }
+
+def test_compact_ticker_round_trip(get_payload):
+    """
+    Tests the conversion between CompactTicker and the Ticker NamedTuple
+    """
+    compact_ticker = CompactTicker.from_payload(get_payload)
+    ticker: schemas.Ticker = compact_ticker.to_ticker()
+
+    assert ticker.max_bid == [14990000.0, 'CLP'] and ticker.volume == [12.5, 'BTC']
+    assert (ticker.price_variation_24h, ticker.price_variation_7d) == ('-0.012', '0.034')
+    assert CompactTicker.from_ticker(ticker) == compact_ticker and compact_ticker.spread == 20000.0
+
+@pytest.mark.parametrize('variation', [None, '0.00001', '-12.5'])
+def test_compact_ticker_keeps_variation_types(get_payload, variation):
+    """
+    Tests that missing variations come back as None and the rest as decimal strings without exponent
+    """
+    get_payload['price_variation_7d'] = variation
+    ticker: schemas.Ticker = CompactTicker.from_payload(get_payload).to_ticker()
+
+    assert ticker.price_variation_7d == variation
+
+def test_currency_codes_are_interned(get_payload):
+    """
+    Tests that tickers share the same currency code objects
+    """
+    first = CompactTicker.from_payload(get_payload)
+    second = CompactTicker.from_payload({**get_payload, 'max_bid': ['1', ''.join(['C', 'L', 'P'])]})
+
+    assert first.quote_currency is second.quote_currency is sys.intern('CLP')
+
+def test_ticker_batch(get_payload):
+    """
+    Tests that a batch keeps every tick and computes the spreads by column
+    """
+    eth_payload: dict = {
+        **get_payload, 'market_id': 'ETH-BTC', 'max_bid': ['0.061', 'BTC'], 'min_ask': ['0.062', 'BTC'],
+        'volume': ['3', 'ETH']
+    }
+    tickers: list = [CompactTicker.from_payload(payload) for payload in [get_payload, eth_payload] * 3]
+    batch = TickerBatch.from_tickers(tickers, timestamp=1.0)
+
+    assert len(batch) == 6 and len(batch.markets) == 2 and list(batch) == tickers
+    assert batch[-1].to_ticker().min_ask == [0.062, 'BTC']
+    assert list(batch.spreads()) == [ticker.min_ask - ticker.max_bid for ticker in tickers]
+
+def test_ticker_batch_is_smaller(get_payload):
+    """
+    Tests that a tick in a batch uses less memory than a Ticker NamedTuple
+    """
+    ticker: schemas.Ticker = CompactTicker.from_payload(get_payload).to_ticker()
+    batch = TickerBatch.from_tickers([ticker] * 1000)
+    ticker_size: int = sys.getsizeof(ticker) + sum(sys.getsizeof(field) for field in ticker)
+
+    assert batch.nbytes() / len(batch) < ticker_size
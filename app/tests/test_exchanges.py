@@ -0,0 +1,217 @@
+import json
+import time
+import threading
+import pytest
+import requests
+
+from types import SimpleNamespace
+from api.circuit_breaker import CircuitState, get_circuit_breakers_stats, reset_circuit_breakers
+from buda import buda
+from buda.exceptions import BudaServicesException
+from exchanges import aggregator, base
+from exchanges.adapters import BudaExchange, StubExchange
+from exchanges.base import ExchangeAdapter, create_exchange, get_exchange_names, normalize_market_id, register_exchange
+from fastapi.testclient import TestClient
+from main import app
+
+client = TestClient(app)
+
+
+class SlowBudaAdapter(requests.adapters.BaseAdapter):
+    """
+    requests transport with the markets of Buda, answering every ticker after delay seconds, or with a timeout when
+    the timeout of the request is shorter
+    """
+
+    def __init__(self, markets: list, delay: float):
+        super().__init__()
+        self.markets = markets
+        self.delay = delay
+
+    def send(self, request, timeout=None, **kwargs):
+        if request.url.endswith('/markets'):
+            data: dict = {'markets': [
+                {
+                    'id': market_id.upper(), 'name': market_id, 'base_currency': market_id.split('-')[0].upper(),
+                    'quote_currency': market_id.split('-')[1].upper(), 'minimum_order_amount': ['0.001', 'BTC'],
+                    'taker_fee': '0.8', 'maker_fee': '0.4'
+                } for market_id in self.markets
+            ]}
+        else:
+            time.sleep(min(self.delay, timeout))
+            if timeout < self.delay:
+                raise requests.exceptions.ReadTimeout('Read timed out')
+            amount: list = ['100.0', 'CLP']
+            data: dict = {'ticker': {
+                'market_id': 'BTC-CLP', 'last_price': amount, 'max_bid': amount, 'min_ask': amount,
+                'volume': ['1.0', 'BTC'], 'price_variation_24h': '0.0', 'price_variation_7d': '0.0'
+            }}
+        response = requests.Response()
+        response.status_code = 200
+        response._content = json.dumps(data).encode()
+        response.request = request
+        response.url = request.url
+        return response
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def exchanges() -> list:
+    """
+    Three exchanges with different symbol formats: a fast one, a slow one and a failing one
+    """
+    return [
+        StubExchange(name='fast', prices={'BTC/CLP': (100.0, 101.0), 'ETH/CLP': (10.0, 10.5)}),
+        StubExchange(name='other', prices={'xbt-clp': (102.0, 103.0)}, separator='-', delay=0.1),
+        StubExchange(name='down', prices={'BTC/CLP': (1.0, 2.0)}, error='Service unavailable')
+    ]
+
+def test_normalized_market_ids():
+    """
+    Tests that market ids are lowercase and use the same code for a currency in every exchange
+    """
+    assert normalize_market_id('XBT', 'CLP') == 'btc-clp'
+    assert StubExchange(prices={'Eth_Btc': (1, 2)}, separator='_').get_markets() == ['eth-btc']
+
+def test_registry(monkeypatch):
+    """
+    Tests that adapters are created by their registered name
+    """
+    monkeypatch.setattr(base, '_exchanges', dict(base._exchanges))
+
+    @register_exchange
+    class EmptyExchange(ExchangeAdapter):
+        NAME = 'empty'
+
+    assert {'buda', 'stub', 'empty'} <= set(get_exchange_names())
+    assert isinstance(create_exchange('empty'), EmptyExchange)
+    with pytest.raises(ValueError):
+        create_exchange('unknown')
+
+def test_fetch_all_tickers(exchanges):
+    """
+    Tests that exchanges are queried in parallel and a failing exchange doesn't hide the others
+    """
+    results: list = aggregator.fetch_all_tickers(exchanges, deadline=1)
+
+    assert [result.exchange for result in results] == ['fast', 'other', 'down']
+    assert set(results[0].tickers) == {'btc-clp', 'eth-clp'}
+    assert results[1].tickers['btc-clp'].max_bid[0] == 102.0
+    assert results[2].tickers == {} and 'Service unavailable' in results[2].error
+
+def test_shared_deadline(exchanges):
+    """
+    Tests that an exchange slower than the deadline is reported as a timeout without delaying the response
+    """
+    exchanges.append(StubExchange(name='slow', prices={'BTC/CLP': (1.0, 2.0)}, delay=2))
+
+    started_at: float = time.monotonic()
+    results: list = aggregator.fetch_all_tickers(exchanges, market_ids=['btc-clp'], deadline=0.5)
+
+    assert time.monotonic() - started_at < 1
+    assert results[3].tickers == {} and results[3].error.startswith('No answer')
+    assert set(results[0].tickers) == {'btc-clp'}
+
+def test_requests_get_the_time_left(exchanges):
+    """
+    Tests that every request of an exchange gets the time left to the deadline, and that an exchange that didn't
+    answer stops making requests once the deadline has passed
+    """
+    timeouts: list = []
+    finished = threading.Event()
+
+    class SlowExchange(ExchangeAdapter):
+        NAME = 'slow'
+
+        def get_markets(self, timeout=None):
+            timeouts.append(timeout)
+            time.sleep(0.3)
+            return ['btc-clp', 'eth-clp', 'ltc-clp']
+
+        def get_ticker(self, market_id, timeout=None):
+            timeouts.append(timeout)
+            time.sleep(0.3)
+            return exchanges[0].get_ticker('btc-clp')
+
+        def get_tickers(self, market_ids=None, timeout=None):
+            try:
+                return super().get_tickers(market_ids, timeout=timeout)
+            finally:
+                finished.set()
+
+    results: list = aggregator.fetch_all_tickers([SlowExchange()], deadline=0.5)
+
+    assert finished.wait(timeout=5)
+    assert results[0].error.startswith('No answer')
+    assert len(timeouts) == 2 and timeouts[0] <= 0.5 and timeouts[1] <= 0.2
+
+def test_deadline_doesnt_open_the_circuit():
+    """
+    Tests that the requests of a comparison cut short by its deadline don't count as failures of a slow Buda
+    """
+    finished = threading.Event()
+
+    class SlowBuda(BudaExchange):
+        def get_tickers(self, market_ids=None, timeout=None):
+            try:
+                return super().get_tickers(market_ids, timeout=timeout)
+            finally:
+                finished.set()
+
+    buda_client = buda.Buda()
+    buda_client._rest_session.mount('https://', SlowBudaAdapter([f'c{index}-clp' for index in range(16)], delay=0.3))
+    reset_circuit_breakers()
+    try:
+        aggregator.fetch_all_tickers([SlowBuda(client=buda_client, concurrency=8)], deadline=0.5)
+        assert finished.wait(timeout=5)
+
+        stats: dict = {breaker['name']: breaker for breaker in get_circuit_breakers_stats()}
+        assert stats['BUDA GET markets/{market_id}/ticker']['state'] == CircuitState.closed
+        assert stats['BUDA GET markets/{market_id}/ticker']['failures'] == 0
+    finally:
+        reset_circuit_breakers()
+
+def test_failed_market_is_left_out(exchanges):
+    """
+    Tests that a market whose ticker can't be fetched is left out of the tickers of Buda instead of failing them all
+    """
+    class DelistingBuda:
+        def get_markets(self, timeout=None):
+            return SimpleNamespace(markets=[
+                SimpleNamespace(base_currency=currency, quote_currency='CLP') for currency in ('BTC', 'LTC', 'ETH')
+            ])
+
+        def get_ticker(self, currency, market, timeout=None):
+            if currency == 'ltc':
+                raise BudaServicesException('API Error. Status code: 404')
+            return exchanges[0].get_ticker(f'{currency}-{market}')
+
+    results: list = aggregator.fetch_all_tickers([BudaExchange(client=DelistingBuda())], deadline=1)
+
+    assert results[0].error is None and set(results[0].tickers) == {'btc-clp', 'eth-clp'}
+
+def test_compare_spreads(exchanges):
+    """
+    Tests the best bid and ask across exchanges
+    """
+    comparison: list = aggregator.compare_spreads(aggregator.fetch_all_tickers(exchanges, deadline=1))
+
+    assert [market['market'] for market in comparison] == ['btc-clp', 'eth-clp']
+    assert comparison[0]['best_bid'] == {'exchange': 'other', 'price': 102.0}
+    assert comparison[0]['best_ask'] == {'exchange': 'fast', 'price': 101.0}
+    assert comparison[0]['spread'] == -1.0
+
+def test_exchange_spreads_endpoint(exchanges, monkeypatch):
+    """
+    Tests the endpoint with the configured exchanges
+    """
+    monkeypatch.setattr(aggregator, '_default_exchanges', exchanges)
+
+    response = client.get('/exchanges/spreads/', params={'market': ['BTC-CLP']})
+    data: dict = response.json()
+
+    assert response.status_code == 200
+    assert [exchange['markets'] for exchange in data['exchanges']] == [1, 1, 0]
+    assert len(data['markets']) == 1 and len(data['markets'][0]['exchanges']) == 2
@@ -0,0 +1,135 @@
+import time
+import pytest
+
+from types import SimpleNamespace
+from datetime import datetime
+from pydantic import ValidationError
+from api.constants import AlertType
+from api.schemas import Alert
+from notifications.destinations import InvalidDestination, check_destination
+from notifications.dispatcher import NotificationDispatcher
+from notifications.queue import NotificationQueue, enqueue_alert_notifications
+from notifications.sink import LocalHTTPSink
+
+
+@pytest.fixture
+def queue(tmp_path) -> NotificationQueue:
+    return NotificationQueue(str(tmp_path / 'notifications.db'))
+
+@pytest.fixture
+def sink() -> LocalHTTPSink:
+    sink = LocalHTTPSink()
+    sink.start()
+    yield sink
+    sink.stop()
+
+def wait_until_empty(queue: NotificationQueue, timeout: float = 20) -> dict:
+    deadline: float = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        counts: dict = queue.counts()
+        if counts['pending'] == 0 and counts['delivering'] == 0:
+            return counts
+        time.sleep(0.01)
+    return queue.counts()
+
+def test_enqueue_alert_notifications(queue):
+    """
+    Tests that only fulfilled alerts with a webhook url are queued
+    """
+    alert = SimpleNamespace(
+        id=1, currency='btc', market='clp', type=AlertType.above, spread=100, last_spread=150,
+        fulfilled_at=datetime.utcnow(), webhook_url='http://127.0.0.1/alerts'
+    )
+    without_webhook = SimpleNamespace(**{**vars(alert), 'id': 2, 'webhook_url': None})
+
+    assert enqueue_alert_notifications([alert, without_webhook], queue=queue) == 1
+
+    batch = queue.claim_batch(10)
+    assert batch.destination == 'http://127.0.0.1/alerts' and batch.payloads[0]['alert_id'] == 1
+
+def test_batched_delivery(queue, sink):
+    """
+    Tests that every notification is delivered once, in batches per destination
+    """
+    total: int = 5000
+    queue.enqueue_many([(sink.url(f'/destination/{index % 2}'), {'index': index}) for index in range(total)])
+    dispatcher = NotificationDispatcher(queue, workers=4, batch_size=200, poll_interval=0.01, allow_private=True)
+
+    dispatcher.start()
+    counts: dict = wait_until_empty(queue)
+    dispatcher.stop()
+
+    received: list = sorted(notification['index'] for notification in sink.notifications)
+    assert received == list(range(total)) and counts['dead'] == 0
+    assert len(sink.requests) <= total / 200 + 4
+    assert all(
+        notification['index'] % 2 == int(request['path'][-1])
+        for request in sink.requests for notification in request['body']['notifications']
+    )
+
+def test_retry_and_dead_letters(queue, sink):
+    """
+    Tests that a failed batch is retried and dead-lettered after the maximum number of attempts
+    """
+    sink.fail_requests = 2
+    queue.enqueue(sink.url('/retry'), {'event': 'retry'})
+    dispatcher = NotificationDispatcher(
+        queue, workers=1, max_attempts=3, backoff=0.01, poll_interval=0.01, allow_private=True
+    )
+
+    dispatcher.start()
+    wait_until_empty(queue)
+    assert [notification['event'] for notification in sink.notifications] == ['retry']
+
+    sink.fail_requests = 3
+    queue.enqueue(sink.url('/dead'), {'event': 'dead'})
+    counts: dict = wait_until_empty(queue)
+    dispatcher.stop()
+
+    assert counts['dead'] == 1 and queue.dead_letters()[0]['attempts'] == 3
+
+@pytest.mark.parametrize('url', [
+    'http://127.0.0.1/alerts', 'http://[::1]/alerts', 'http://10.0.0.1/alerts', 'http://169.254.169.254/latest',
+    'http://localhost:8000/alerts', 'http://intranet/alerts', 'ftp://example.com/alerts'
+])
+def test_private_destinations_are_rejected(url):
+    """
+    Tests that webhooks of private or local hosts are rejected, unless private destinations are allowed
+    """
+    with pytest.raises(InvalidDestination):
+        check_destination(url, allow_private=False)
+    check_destination('https://example.com/alerts', allow_private=False)
+
+def test_private_destination_is_dead_lettered(queue, sink):
+    """
+    Tests that the dispatcher doesn't send batches to private addresses
+    """
+    queue.enqueue(sink.url('/alerts'), {'event': 'internal'})
+    dispatcher = NotificationDispatcher(queue, allow_private=False)
+
+    assert dispatcher.process_once() == 1
+    assert sink.requests == [] and 'private' in queue.dead_letters()[0]['last_error']
+
+def test_redirects_are_not_followed(queue, sink):
+    """
+    Tests that a webhook redirecting to another address is a failed delivery and the redirect isn't followed
+    """
+    redirecting = LocalHTTPSink(redirect_to=sink.url('/internal'))
+    redirecting.start()
+    try:
+        queue.enqueue(redirecting.url('/alerts'), {'event': 'redirected'})
+        dispatcher = NotificationDispatcher(queue, max_attempts=1, allow_private=True)
+
+        assert dispatcher.process_once() == 1
+    finally:
+        redirecting.stop()
+
+    assert sink.requests == [] and 'Status code: 307' in queue.dead_letters()[0]['last_error']
+
+def test_alert_with_private_webhook_is_invalid():
+    """
+    Tests that alerts can't be created with a webhook of a private address
+    """
+    with pytest.raises(ValidationError):
+        Alert(type=AlertType.above, currency='btc', market='clp', spread=1, webhook_url='http://10.0.0.1/alerts')
+    assert Alert(type=AlertType.above, currency='btc', market='clp', spread=1, webhook_url='https://example.com/a')
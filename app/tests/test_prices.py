@@ -0,0 +1,83 @@
+import pytest
+import api.services as services
+
+from buda import prices, schemas
+from buda.compact import TickerBatch
+
+
+def make_ticker(market_id: str, max_bid: float, min_ask: float, quote_currency: str) -> schemas.Ticker:
+    return schemas.Ticker(
+        last_price=[min_ask, quote_currency],
+        market_id=market_id,
+        max_bid=[max_bid, quote_currency],
+        min_ask=[min_ask, quote_currency],
+        price_variation_24h='0',
+        price_variation_7d='0',
+        volume=[1.0, market_id.split('-')[0]]
+    )
+
+def test_scaled_conversions():
+    """
+    Tests that strings and floats are converted to the same exact scaled value
+    """
+    assert prices.to_scaled('0.06182', 8) == prices.to_scaled(0.06182, 8) == 6182000
+    assert prices.to_scaled('-1.50', 2) == -150 and prices.format_scaled(-150, 2) == '-1.5'
+    assert prices.format_scaled(8000, 8) == '0.00008' and prices.from_scaled(8000, 8) == 0.00008
+
+    with pytest.raises(ValueError):
+        prices.to_scaled('0.001', 2)
+
+def test_btc_quoted_spread_is_not_rounded_to_zero():
+    """
+    Tests that the spread of a market quoted in BTC keeps its decimals
+    """
+    spread: dict = services.get_ticker_spread('eth-btc', make_ticker('ETH-BTC', 0.06182, 0.0619, 'BTC'))
+
+    assert spread['spread'] == 0.00008 and spread['spread_exact'] == '0.00008'
+
+def test_float_spread_is_exact():
+    """
+    Tests that the spread doesn't carry float representation errors
+    """
+    spread: dict = services.get_ticker_spread('btc-usdc', make_ticker('BTC-USDC', 16500.01, 16682.3724, 'USDC'))
+
+    assert 16682.3724 - 16500.01 != 182.3624 and spread['spread'] == 182.3624 and spread['spread_exact'] == '182.3624'
+
+def test_string_spread_is_exact():
+    """
+    Tests that the spread of a ticker with the decimal strings of Buda is computed from the strings
+    """
+    ticker: schemas.Ticker = make_ticker('ETH-BTC', 0.06182, 0.06190001, 'BTC')._replace(
+        exact_prices={'max_bid': '0.06182', 'min_ask': '0.06190001'}
+    )
+    spread: dict = services.get_ticker_spread('eth-btc', ticker)
+
+    assert spread['bid'] == 0.06182 and spread['spread_exact'] == '0.00008001'
+
+def test_more_decimals_than_precision():
+    """
+    Tests that prices with more decimals than the precision of the currency widen it instead of failing
+    """
+    ticker: schemas.Ticker = make_ticker('ETH-CLP', 1.5, 1.50001, 'CLP')._replace(
+        exact_prices={'max_bid': '1.5', 'min_ask': '1.500010'}
+    )
+    spread: dict = services.get_ticker_spread('eth-clp', ticker)
+
+    assert prices.widen_precision(2, '1.5', '1.500010', 1.25) == 5
+    assert spread['spread_exact'] == '0.00001' and spread['spread'] == 0.00001
+
+def test_batch_scaled_spreads():
+    """
+    Tests that the vectorised spreads of a batch match the spread of every ticker
+    """
+    tickers: list = [
+        make_ticker('BTC-CLP', 14873120.0, 14896315.0, 'CLP'),
+        make_ticker('ETH-BTC', 0.06182, 0.0619, 'BTC')
+    ] * 3
+    batch = TickerBatch.from_tickers(tickers, timestamp=0)
+
+    assert list(batch.scaled_spreads()) == [2319500, 8000] * 3
+    assert list(batch.scaled_spreads()) == [
+        prices.scaled_spread(ticker.min_ask[0], ticker.max_bid[0], prices.get_price_precision(ticker.max_bid[1]))
+        for ticker in tickers
+    ]
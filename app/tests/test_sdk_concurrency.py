@@ -0,0 +1,136 @@
+import json
+import time
+import asyncio
+import random
+import threading
+import pytest
+import requests
+import api.services as services
+
+from concurrent.futures import ThreadPoolExecutor
+from api.circuit_breaker import reset_circuit_breakers
+from buda import buda
+
+
+class FakeBudaAdapter(requests.adapters.BaseAdapter):
+    """
+    requests transport answering the ticker endpoint with the market of the url, after a random delay so
+    responses of concurrent requests arrive out of order
+    """
+
+    def send(self, request, **kwargs):
+        time.sleep(random.uniform(0, 0.005))
+        market_id: str = request.url.split('/markets/')[1].split('/')[0].upper()
+        currency, market = market_id.split('-')
+        response = requests.Response()
+        response.status_code = 200
+        response.url = request.url
+        response.request = request
+        response.headers['Content-Type'] = 'application/json'
+        response._content = json.dumps({
+            'ticker': {
+                'market_id': market_id,
+                'last_price': ['1.0', market],
+                'max_bid': ['1.0', market],
+                'min_ask': ['2.0', market],
+                'price_variation_24h': '0.0',
+                'price_variation_7d': '0.0',
+                'volume': ['1.0', currency]
+            }
+        }).encode()
+        return response
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def client() -> buda.Buda:
+    """
+    A single Buda client answered by the fake transport
+    """
+    reset_circuit_breakers()
+    client = buda.Buda()
+    client._rest_session.mount('https://', FakeBudaAdapter())
+    yield client
+    reset_circuit_breakers()
+
+def test_concurrent_requests(client):
+    """
+    Tests that a client shared by hundreds of threads returns every thread the ticker it asked for
+    """
+    markets: list = [(f'c{index}', 'clp') for index in range(1000)]
+
+    with ThreadPoolExecutor(max_workers=200) as executor:
+        tickers: list = list(executor.map(lambda market: client.get_ticker(*market), markets))
+
+    assert [ticker.market_id for ticker in tickers] == [f'C{index}-CLP' for index in range(1000)]
+
+def test_request_result_is_per_call(client):
+    """
+    Tests that json_request returns the response of its own request and the last response is per thread
+    """
+    barrier = threading.Barrier(50)
+    errors: list = []
+
+    def request(index: int) -> None:
+        barrier.wait()
+        result = client.json_request(method='get', url=f'markets/c{index}-clp/ticker')
+        if result.data['ticker']['market_id'] != f'C{index}-CLP' or not result.response.url.endswith(f'c{index}-clp/ticker'):
+            errors.append(index)
+        if client.get_last_response() is not result.response:
+            errors.append(index)
+
+    threads: list = [threading.Thread(target=request, args=(index,)) for index in range(50)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+
+def test_last_response_is_per_task(client):
+    """
+    Tests that asyncio tasks running in the same thread don't see the last response of each other
+    """
+    async def request(index: int) -> bool:
+        client.json_request(method='get', url=f'markets/c{index}-clp/ticker')
+        await asyncio.sleep(0.01)
+        return client.get_last_response().url.endswith(f'c{index}-clp/ticker')
+
+    async def main() -> list:
+        return await asyncio.gather(*(request(index) for index in range(10)))
+
+    assert asyncio.run(main()) == [True] * 10
+
+def test_ticker_keeps_exact_prices(client):
+    """
+    Tests that the ticker keeps the float prices and the decimal strings of Buda, and its spread is computed exactly
+    from the strings
+    """
+    ticker = client.get_ticker('eth', 'btc')
+    spread: dict = services.get_ticker_spread('eth-btc', ticker)
+
+    assert ticker.max_bid == [1.0, 'BTC'] and ticker.min_ask == [2.0, 'BTC']
+    assert ticker.exact_prices['max_bid'] == '1.0' and ticker.exact_prices['min_ask'] == '2.0'
+    assert spread['bid'] == 1.0 and spread['spread_exact'] == '1'
+
+def test_data_is_not_modified(client):
+    """
+    Tests that the data of the caller is not modified by the optional data
+    """
+    data: dict = {'amount': 1}
+    client.json_endpoint(method='get', url='markets/btc-clp/ticker', data=data, optional_data={'price': 10})
+
+    assert data == {'amount': 1}
+
+def test_shared_client():
+    """
+    Tests that the process uses a single client
+    """
+    clients: set = set()
+    with ThreadPoolExecutor(max_workers=20) as executor:
+        for client in executor.map(lambda _: buda.get_client(), range(100)):
+            clients.add(id(client))
+
+    assert len(clients) == 1
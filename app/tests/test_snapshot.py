@@ -0,0 +1,68 @@
+import pytest
+import api.services as services
+
+from api import snapshot
+from buda import schemas
+from cache.backends import get_cache
+
+
+@pytest.fixture
+def get_ticker() -> schemas.Ticker:
+    return schemas.Ticker(
+        last_price=[100.0, 'CLP'],
+        market_id='BTC-CLP',
+        max_bid=[90.0, 'CLP'],
+        min_ask=[110.0, 'CLP'],
+        price_variation_24h='0.01',
+        price_variation_7d='0.02',
+        volume=[1.5, 'BTC']
+    )
+
+@pytest.fixture
+def clean_cache():
+    get_cache().clear()
+    yield
+    get_cache().clear()
+
+@pytest.fixture
+def snapshot_path(tmp_path) -> str:
+    return str(tmp_path / 'snapshot.json')
+
+def test_write_and_read_snapshot(snapshot_path, get_ticker):
+    """
+    Tests that a written snapshot is read back with the same markets and tickers
+    """
+    snapshot.write_snapshot(snapshot_path, ['btc-clp'], {'btc-clp': get_ticker})
+    reader = snapshot.SnapshotReader(snapshot_path, max_age=10)
+
+    assert reader.get_markets() == ['btc-clp'] and reader.get_ticker('btc-clp') == get_ticker
+
+def test_stale_snapshot_is_ignored(snapshot_path, get_ticker):
+    """
+    Tests that a snapshot older than max_age is not used
+    """
+    snapshot.write_snapshot(snapshot_path, ['btc-clp'], {'btc-clp': get_ticker})
+    reader = snapshot.SnapshotReader(snapshot_path, max_age=-1)
+
+    assert reader.read() is None and reader.get_markets() is None
+
+def test_single_fetcher_lock(snapshot_path):
+    """
+    Tests that only one process at a time can be the designated fetcher
+    """
+    lock_file = snapshot.acquire_fetcher_lock(snapshot_path)
+    assert lock_file is not None and snapshot.acquire_fetcher_lock(snapshot_path) is None
+
+    lock_file.close()
+    assert snapshot.acquire_fetcher_lock(snapshot_path) is not None
+
+def test_services_read_from_snapshot(monkeypatch, clean_cache, snapshot_path, get_ticker):
+    """
+    Tests that the services use the snapshot instead of calling Buda when it is configured
+    """
+    snapshot.write_snapshot(snapshot_path, ['btc-clp'], {'btc-clp': get_ticker})
+    monkeypatch.setattr(services, 'snapshot_reader', snapshot.SnapshotReader(snapshot_path, max_age=10))
+
+    spread: dict = services.get_market_spread(currency='btc', market='clp')
+
+    assert spread == {'bid': 90.0, 'ask': 110.0, 'spread': 20.0, 'spread_exact': '20', 'market': 'btc-clp'}
@@ -0,0 +1,163 @@
+import json
+import time
+import pytest
+import api.services as services
+
+from api.spread_feed import VersionedSpreads
+from fastapi.testclient import TestClient
+from main import app
+
+client = TestClient(app)
+
+
+def spreads(**values) -> list:
+    return [{'market': market_id.replace('_', '-'), 'spread': spread} for market_id, spread in values.items()]
+
+def changes(feed: VersionedSpreads, since=None) -> dict:
+    return json.loads(feed.changes_since(since))
+
+def test_sequence():
+    """
+    Tests that only updates that change a market increment the sequence
+    """
+    feed = VersionedSpreads()
+
+    assert feed.update(spreads(btc_clp=1.0, eth_clp=2.0)) == 1
+    assert feed.update(spreads(btc_clp=1.0, eth_clp=2.0)) == 1
+    assert feed.update(spreads(btc_clp=1.5, eth_clp=2.0)) == 2
+
+def test_changes_since():
+    """
+    Tests that a client only gets the markets changed or removed after its sequence
+    """
+    feed = VersionedSpreads()
+    feed.update(spreads(btc_clp=1.0, eth_clp=2.0, ltc_clp=3.0))
+    feed.update(spreads(btc_clp=1.5, eth_clp=2.0, ltc_clp=3.0))
+    feed.update(spreads(btc_clp=1.5, eth_clp=2.5))
+
+    assert changes(feed, 1) == {
+        'sequence': 3, 'full': False, 'removed': ['ltc-clp'],
+        'spreads': [{'market': 'btc-clp', 'spread': 1.5}, {'market': 'eth-clp', 'spread': 2.5}]
+    }
+    assert changes(feed, 2)['spreads'] == [{'market': 'eth-clp', 'spread': 2.5}]
+    assert changes(feed, 3) == {'sequence': 3, 'full': False, 'removed': [], 'spreads': []}
+
+def test_removed_market_added_again():
+    """
+    Tests that a market removed and added again between two polls is sent as changed
+    """
+    feed = VersionedSpreads()
+    feed.update(spreads(btc_clp=1.0, eth_clp=2.0))
+    feed.update(spreads(btc_clp=1.0))
+    feed.update(spreads(btc_clp=1.0, eth_clp=2.0))
+
+    assert changes(feed, 1) == {'sequence': 3, 'full': False, 'removed': [], 'spreads': [{'market': 'eth-clp', 'spread': 2.0}]}
+
+def test_incomplete_update_keeps_markets():
+    """
+    Tests that markets missing from an incomplete update, i.e. failed fetches, are not removed
+    """
+    feed = VersionedSpreads()
+    feed.update(spreads(btc_clp=1.0, eth_clp=2.0))
+    feed.update(spreads(btc_clp=1.5), complete=False)
+
+    assert changes(feed, 1)['removed'] == [] and len(changes(feed)['spreads']) == 2
+
+@pytest.mark.parametrize('since', [None, 0, 10])
+def test_full_resync(since):
+    """
+    Tests that clients without a sequence, too far behind or with an unknown sequence get every market
+    """
+    feed = VersionedSpreads(max_deltas=2)
+    for spread in range(1, 5):
+        feed.update(spreads(btc_clp=float(spread), eth_clp=2.0))
+
+    data: dict = changes(feed, since)
+    assert data['full'] is True and data['sequence'] == 4 and len(data['spreads']) == 2
+    assert changes(feed, 2)['full'] is False
+
+def test_shared_sequence():
+    """
+    Tests that feeds updated with the versions of a shared snapshot answer clients of each other
+    """
+    first, second = VersionedSpreads(start=10), VersionedSpreads(start=99)
+    for feed in (first, second):
+        feed.update(spreads(btc_clp=1.0, eth_clp=2.0), sequence=1000)
+    first.update(spreads(btc_clp=1.5, eth_clp=2.0), sequence=2000)
+    for feed in (first, second):
+        feed.update(spreads(btc_clp=1.5, eth_clp=2.5), sequence=3000)
+
+    assert changes(first, 2000)['spreads'] == [{'market': 'eth-clp', 'spread': 2.5}]
+    # The second feed didn't see version 2000, so it also sends the markets changed between 1000 and 2000
+    assert changes(second, 2000) == {
+        'sequence': 3000, 'full': False, 'removed': [],
+        'spreads': [{'market': 'btc-clp', 'spread': 1.5}, {'market': 'eth-clp', 'spread': 2.5}]
+    }
+    assert changes(second, 1000)['full'] is False and changes(second, 999)['full'] is True
+    assert second.update(spreads(btc_clp=9.0), sequence=3000) == 3000 and len(changes(second)['spreads']) == 2
+
+def test_spreads_endpoint(monkeypatch):
+    """
+    Tests polling the endpoint with the sequence of the previous response
+    """
+    values: dict = {'btc-clp': 1.0, 'eth-clp': 2.0}
+    monkeypatch.setattr(services, 'spread_feed', VersionedSpreads())
+    monkeypatch.setattr(services, '_spread_feed_refreshed_at', float('-inf'))
+    monkeypatch.setattr(services.settings, 'SPREAD_CACHE_TTL', 0)
+    monkeypatch.setattr(
+        services, 'iter_all_markets_spread',
+        lambda: iter([{'market': market_id, 'spread': spread} for market_id, spread in values.items()])
+    )
+
+    first: dict = client.get('/spreads/', params={'since': 0}).json()
+    values['eth-clp'] = 3.0
+    second: dict = client.get('/spreads/', params={'since': first['sequence']}).json()
+
+    assert len(first['spreads']) == 2
+    assert second['sequence'] == 2 and second['spreads'] == [{'market': 'eth-clp', 'spread': 3.0}]
+    assert client.get('/spreads/', params={'since': -1}).status_code == 422
+
+def test_stale_age_is_not_a_change(monkeypatch):
+    """
+    Tests that a stale market doesn't count as changed on every refresh because its age grows
+    """
+    ages: list = [1.0, 2.0, 3.0]
+    monkeypatch.setattr(services, 'spread_feed', VersionedSpreads())
+    monkeypatch.setattr(services, 'snapshot_reader', None)
+    monkeypatch.setattr(services.settings, 'SPREAD_CACHE_TTL', 0)
+    monkeypatch.setattr(
+        services, 'iter_all_markets_spread',
+        lambda: iter([{'market': 'btc-clp', 'spread': 1.0, 'stale': True, 'age': ages.pop(0)}])
+    )
+
+    sequences: list = [services.refresh_spread_feed() for _ in range(3)]
+
+    assert sequences == [1, 1, 1]
+    assert changes(services.spread_feed)['spreads'] == [{'market': 'btc-clp', 'spread': 1.0, 'stale': True}]
+
+def test_snapshot_feed_does_not_wait_for_refresh(monkeypatch):
+    """
+    Tests that the spreads are versioned by the shared snapshot, and callers don't wait for a running refresh
+    """
+    class Reader:
+        def read(self):
+            return {'fetched_at': 1700000000.5, 'tickers': {'btc-clp': make_ticker()}}
+
+    def make_ticker():
+        return services.buda.schemas.Ticker(
+            last_price=['100.0', 'CLP'], market_id='BTC-CLP', max_bid=['99.0', 'CLP'], min_ask=['100.0', 'CLP'],
+            price_variation_24h='0.0', price_variation_7d='0.0', volume=['1.0', 'BTC']
+        )
+
+    monkeypatch.setattr(services, 'spread_feed', VersionedSpreads())
+    monkeypatch.setattr(services, 'snapshot_reader', Reader())
+    monkeypatch.setattr(services, '_spread_feed_refreshed_at', float('-inf'))
+
+    assert services.refresh_spread_feed() == 1700000000500
+    assert changes(services.spread_feed)['spreads'][0]['market'] == 'btc-clp'
+
+    monkeypatch.setattr(services, '_spread_feed_refreshed_at', time.monotonic() - 3600)
+    with services._spread_feed_lock:
+        started_at: float = time.monotonic()
+        assert services.refresh_spread_feed() == 1700000000500
+    assert time.monotonic() - started_at < 1
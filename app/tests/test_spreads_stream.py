@@ -0,0 +1,92 @@
+import json
+import threading
+import pytest
+import requests
+import api.services as services
+
+from types import SimpleNamespace
+from fastapi.testclient import TestClient
+from main import app
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def slow_markets(monkeypatch) -> SimpleNamespace:
+    """
+    Replaces Buda with 4 markets that answer when their event in released is set, one of them failing.
+    max_in_flight is the maximum number of markets fetched at the same time
+    """
+    markets = SimpleNamespace(
+        released={market_id: threading.Event() for market_id in ('btc-clp', 'eth-clp', 'ltc-clp', 'bch-clp')},
+        in_flight=0,
+        max_in_flight=0
+    )
+    lock = threading.Lock()
+
+    def get_market_spread(currency, market, disable_check=False):
+        with lock:
+            markets.in_flight += 1
+            markets.max_in_flight = max(markets.max_in_flight, markets.in_flight)
+        try:
+            markets.released[f'{currency}-{market}'].wait(timeout=5)
+            if currency == 'bch':
+                raise ConnectionError('Buda is not answering')
+            return {'market': f'{currency}-{market}', 'spread': 1.0}
+        finally:
+            with lock:
+                markets.in_flight -= 1
+
+    monkeypatch.setattr(services, 'get_all_markets', lambda: list(markets.released))
+    monkeypatch.setattr(services, 'get_market_spread', get_market_spread)
+    return markets
+
+def test_spreads_in_completion_order(slow_markets):
+    """
+    Tests that markets are yielded as they are fetched and a failed market yields an error record
+    """
+    spreads = services.iter_all_markets_spread(concurrency=4)
+    records: list = []
+    for market_id in ('eth-clp', 'bch-clp', 'ltc-clp', 'btc-clp'):
+        slow_markets.released[market_id].set()
+        records.append(next(spreads))
+
+    assert [record['market'] for record in records] == ['eth-clp', 'bch-clp', 'ltc-clp', 'btc-clp']
+    assert 'error' in records[1] and all('spread' in records[index] for index in (0, 2, 3))
+    assert next(spreads, None) is None
+
+def test_bounded_concurrency(slow_markets):
+    """
+    Tests that every market is fetched when there are more markets than concurrent fetches
+    """
+    for event in slow_markets.released.values():
+        event.set()
+    records: list = list(services.iter_all_markets_spread(concurrency=1))
+
+    assert [record['market'] for record in records] == list(slow_markets.released)
+    assert slow_markets.max_in_flight == 1
+
+def test_stream_endpoint(slow_markets):
+    """
+    Tests the ndjson and sse formats of the endpoint
+    """
+    for event in slow_markets.released.values():
+        event.set()
+    ndjson = client.get('/spreads/stream/')
+    sse = client.get('/spreads/stream/', params={'format': 'sse'})
+
+    assert ndjson.status_code == 200 and len([json.loads(line) for line in ndjson.text.splitlines()]) == 4
+    assert sse.headers['content-type'].startswith('text/event-stream')
+    assert len([event for event in sse.text.split('\n\n') if event.startswith('data: ')]) == 4
+
+def test_stream_without_markets(monkeypatch):
+    """
+    Tests that the endpoint answers 503 before streaming when the markets of Buda can't be fetched
+    """
+    def get_all_markets():
+        raise requests.ConnectionError('Buda is not answering')
+
+    monkeypatch.setattr(services, 'get_all_markets', get_all_markets)
+    response = client.get('/spreads/stream/')
+
+    assert response.status_code == 503
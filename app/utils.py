@@ -1,3 +1,11 @@
+import hmac
+import json
+
+from datetime import datetime
+from typing import Any, Iterable, Iterator, Optional
+from fastapi import Header, HTTPException
+
+import settings
 from database import SessionLocal
 
 # Dependency
@@ -7,3 +15,41 @@ def get_db():
         yield db
     finally:
         db.close()
+
+def require_admin(authorization: Optional[str] = Header(None)) -> None:
+    """
+    Dependency of the admin endpoints: the request must have the header `Authorization: Bearer <BUDA_ADMIN_TOKEN>`.
+    Without an admin token in the settings, the admin endpoints are disabled.
+    """
+    if settings.ADMIN_TOKEN is None:
+        raise HTTPException(
+            status_code=403,
+            detail='Admin endpoints are disabled, set BUDA_ADMIN_TOKEN or use manage.py'
+        )
+    scheme, _, token = (authorization or '').partition(' ')
+    if scheme.lower() != 'bearer' or not hmac.compare_digest(token.encode(), settings.ADMIN_TOKEN.encode()):
+        raise HTTPException(
+            status_code=401,
+            detail='Invalid admin token',
+            headers={'WWW-Authenticate': 'Bearer'}
+        )
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+
+def ndjson_lines(rows: Iterable[Any]) -> Iterator[str]:
+    """
+    Encodes every row as a line of newline delimited json, for streaming responses
+    """
+    for row in rows:
+        yield json.dumps(row, default=_json_default) + '\n'
+
+def sse_events(rows: Iterable[Any]) -> Iterator[str]:
+    """
+    Encodes every row as a server-sent event with a json data field, for streaming responses
+    """
+    for row in rows:
+        yield f'data: {json.dumps(row, default=_json_default)}\n\n'